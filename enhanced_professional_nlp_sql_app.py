@@ -11,12 +11,43 @@ from datetime import datetime
 import re
 from enhanced_aws_login import AWSPortalClient
 import numpy as np
+from pandas.api.types import union_categoricals
+from pandas.tseries.api import guess_datetime_format
 import tempfile
 import os
 import pickle
+import copy
 import uuid
-from typing import Dict, List, Any, Optional
+import hashlib
+import threading
+import weakref
+import bisect
+import shutil
+import gzip
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Optional, Tuple
 import time
+import sys
+import warnings
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
 
 # Page configuration
 st.set_page_config(
@@ -305,37 +336,310 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Content-Addressed Table Store
+class TableStore:
+    """Writes each distinct table once as a compressed Parquet file named by its content hash"""
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root_dir, f"{digest}.{extension}")
+
+    def _write_atomic(self, path: str, write):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put_table(self, df: pd.DataFrame) -> str:
+        """Store a table unless identical content is already stored; returns its digest"""
+        digest = get_table_fingerprint(df)
+        for extension in ('parquet', 'pkl'):
+            if os.path.exists(self._path(digest, extension)):
+                self._touch(self._path(digest, extension))
+                return digest
+
+        if pq is not None:
+            try:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                self._write_atomic(self._path(digest, 'parquet'),
+                                   lambda path: pq.write_table(table, path, compression='zstd'))
+                return digest
+            except (pa.ArrowException, TypeError, ValueError):
+                # Mixed-type object columns cannot be stored as Parquet; pickle them instead
+                pass
+
+        self._write_atomic(self._path(digest, 'pkl'), lambda path: df.to_pickle(path))
+        return digest
+
+    def get_table(self, digest: str) -> pd.DataFrame:
+        parquet_path = self._path(digest, 'parquet')
+        if pq is not None and os.path.exists(parquet_path):
+            self._touch(parquet_path)
+            return pq.read_table(parquet_path, memory_map=True).to_pandas()
+        pickle_path = self._path(digest, 'pkl')
+        self._touch(pickle_path)
+        return pd.read_pickle(pickle_path)
+
+    def has_table(self, digest: str) -> bool:
+        return any(os.path.exists(self._path(digest, extension)) for extension in ('parquet', 'pkl'))
+
+    def get_schema(self, digest: str) -> Tuple[int, pd.DataFrame]:
+        """Row count and a zero-row frame with the stored table's columns, read from Parquet metadata"""
+        parquet_path = self._path(digest, 'parquet')
+        if pq is not None and os.path.exists(parquet_path):
+            parquet_file = pq.ParquetFile(parquet_path)
+            return parquet_file.metadata.num_rows, parquet_file.schema_arrow.empty_table().to_pandas()
+        df = self.get_table(digest)
+        return len(df), df.iloc[:0]
+
+    def _touch(self, path: str):
+        """Mark a stored file as in use so stale-file removal keeps it"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def remove_stale(self, max_age_seconds: float, keep_digests) -> int:
+        """Delete stored files unused for max_age_seconds whose digest is not in keep_digests"""
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for entry in os.scandir(self.root_dir):
+            digest = entry.name.split('.', 1)[0]
+            try:
+                if entry.is_file() and digest not in keep_digests and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def put_file(self, data: bytes, filename: str) -> str:
+        """Store raw upload bytes once per distinct content; returns the stored path"""
+        digest = hashlib.sha1(data).hexdigest()
+        extension = os.path.splitext(filename)[1].lstrip('.') or 'bin'
+        path = self._path(digest, extension)
+        if not os.path.exists(path):
+            def write(tmp_path):
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+            self._write_atomic(path, write)
+        return path
+
+class LazyTableDict(dict):
+    """
+    Table name -> DataFrame mapping that reads each table from the store on first access.
+    Loaded tables can be spilled back to the store and are read again on their next access.
+    """
+    def __init__(self, table_store: TableStore, digests: Dict[str, str]):
+        super().__init__(digests)
+        self._table_store = table_store
+        self._loaded = set()
+        self._digests = dict(digests)
+        self.last_access = {}
+        self.lock = threading.RLock()
+
+    def __getitem__(self, table_name):
+        with self.lock:
+            value = super().__getitem__(table_name)
+            if table_name not in self._loaded:
+                value = self._table_store.get_table(value)
+                super().__setitem__(table_name, value)
+                self._loaded.add(table_name)
+            self.last_access[table_name] = time.time()
+            return value
+
+    def __setitem__(self, table_name, df):
+        with self.lock:
+            super().__setitem__(table_name, df)
+            self._loaded.add(table_name)
+            self._digests.pop(table_name, None)
+            self.last_access[table_name] = time.time()
+
+    def __delitem__(self, table_name):
+        with self.lock:
+            super().__delitem__(table_name)
+            self._loaded.discard(table_name)
+            self._digests.pop(table_name, None)
+            self.last_access.pop(table_name, None)
+
+    def clear(self):
+        with self.lock:
+            super().clear()
+            self._loaded.clear()
+            self._digests.clear()
+            self.last_access.clear()
+
+    def get(self, table_name, default=None):
+        return self[table_name] if table_name in self else default
+
+    def values(self):
+        return [self[table_name] for table_name in self]
+
+    def items(self):
+        return [(table_name, self[table_name]) for table_name in self]
+
+    def set_stored(self, table_name: str, digest: str):
+        """Point a table at a stored digest without loading it; a loaded table of that content is kept"""
+        with self.lock:
+            if table_name in self and self.fingerprint(table_name) == digest:
+                return
+            super().__setitem__(table_name, digest)
+            self._loaded.discard(table_name)
+            self._digests[table_name] = digest
+
+    def loaded_tables(self) -> Dict[str, pd.DataFrame]:
+        """Tables currently held in memory, without loading any"""
+        with self.lock:
+            return {table_name: super(LazyTableDict, self).__getitem__(table_name) for table_name in self._loaded}
+
+    def stored_digests(self) -> List[str]:
+        with self.lock:
+            return list(self._digests.values())
+
+    def fingerprint(self, table_name: str) -> str:
+        """Content fingerprint of a table without loading it; a stored table's digest is its fingerprint"""
+        with self.lock:
+            digest = self._digests.get(table_name)
+            if digest is not None:
+                return digest
+            return get_table_fingerprint(super().__getitem__(table_name))
+
+    def schema(self, table_name: str) -> Tuple[int, pd.DataFrame]:
+        """Row count and a zero-row frame with the table's columns and dtypes, without loading it"""
+        with self.lock:
+            if table_name in self._loaded:
+                df = super().__getitem__(table_name)
+                return len(df), df.iloc[:0]
+            return self._table_store.get_schema(super().__getitem__(table_name))
+
+    def spill(self, table_name: str) -> Optional[str]:
+        """
+        Write a loaded table to the store, once per content, and drop the in-memory copy.
+        Returns the stored digest, or None when the table was not loaded.
+        """
+        with self.lock:
+            if table_name not in self._loaded:
+                return None
+            digest = self._digests.get(table_name)
+            if digest is None:
+                digest = self._table_store.put_table(super().__getitem__(table_name))
+                self._digests[table_name] = digest
+            super().__setitem__(table_name, digest)
+            self._loaded.discard(table_name)
+            return digest
+
 # Enhanced Session State Management with Persistence
 class SessionManager:
+    """
+    Persists session state under temp_dir. DataFrames go to the content-addressed TableStore;
+    everything else is appended to a JSON-lines log instead of re-pickling whole values.
+    """
+    LOG_COMPACTION_THRESHOLD = 500
+
     def __init__(self):
         self.session_id = self._get_or_create_session_id()
         self.temp_dir = tempfile.mkdtemp(prefix=f"nlp_sql_{self.session_id}_")
+        self.table_store = TableStore(os.environ.get(
+            'NLP_SQL_TABLE_STORE_DIR', os.path.join(tempfile.gettempdir(), 'nlp_sql_table_store')
+        ))
+        self.log_path = os.path.join(self.temp_dir, 'session_log.jsonl')
+        self.lock = threading.Lock()
+        self._records = {}
+        self._log_length = 0
 
     def _get_or_create_session_id(self):
         if 'session_id' not in st.session_state:
             st.session_state.session_id = str(uuid.uuid4())
         return st.session_state.session_id
 
-    def save_session_data(self, key: str, data: Any):
-        """Save data to temporary storage"""
+    def _to_record(self, data: Any) -> Dict[str, Any]:
+        """Describe a value as a log record, storing any DataFrames in the table store"""
+        if isinstance(data, pd.DataFrame):
+            return {'type': 'table', 'value': self.table_store.put_table(data)}
+        if isinstance(data, dict) and data and all(isinstance(v, pd.DataFrame) for v in data.values()):
+            return {'type': 'tables', 'value': {name: self.table_store.put_table(df) for name, df in data.items()}}
         try:
-            file_path = os.path.join(self.temp_dir, f"{key}.pkl")
+            # Round-trip so the record is a snapshot, not an alias of the live session value
+            return {'type': 'json', 'value': json.loads(json.dumps(data))}
+        except TypeError:
+            # Values JSON cannot represent are pickled next to the log
+            file_path = os.path.join(self.temp_dir, f"{uuid.uuid4().hex}.pkl")
             with open(file_path, 'wb') as f:
                 pickle.dump(data, f)
+            return {'type': 'pickle', 'value': file_path}
+
+    def _from_record(self, record: Dict[str, Any]):
+        if record['type'] == 'table':
+            return self.table_store.get_table(record['value'])
+        if record['type'] == 'tables':
+            return LazyTableDict(self.table_store, record['value'])
+        if record['type'] == 'pickle':
+            with open(record['value'], 'rb') as f:
+                return pickle.load(f)
+        return copy.deepcopy(record['value'])
+
+    def _append_log(self, entry: Dict[str, Any]):
+        with self.lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._log_length += 1
+            if entry['op'] == 'set':
+                self._records[entry['key']] = entry['record']
+            else:
+                record = self._records.setdefault(entry['key'], {'type': 'json', 'value': []})
+                record['value'].append(entry['item'])
+
+            if self._log_length > self.LOG_COMPACTION_THRESHOLD:
+                self._compact_log()
+
+    def _compact_log(self):
+        """Rewrite the log as one record per key so replay stays short"""
+        tmp_path = f"{self.log_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for key, record in self._records.items():
+                f.write(json.dumps({'op': 'set', 'key': key, 'record': record}) + '\n')
+        os.replace(tmp_path, self.log_path)
+        self._log_length = len(self._records)
+
+    def referenced_digests(self) -> set:
+        """Table store digests that saved records still point to"""
+        with self.lock:
+            digests = set()
+            for record in self._records.values():
+                if record['type'] == 'table':
+                    digests.add(record['value'])
+                elif record['type'] == 'tables':
+                    digests.update(record['value'].values())
+            return digests
+
+    def save_session_data(self, key: str, data: Any):
+        """Save data to temporary storage"""
+        try:
+            self._append_log({'op': 'set', 'key': key, 'record': self._to_record(data)})
             st.session_state[key] = data
         except Exception as e:
             st.error(f"Error saving session data: {str(e)}")
 
+    def append_session_data(self, key: str, item: Any):
+        """Record one item appended to a list already held in session state"""
+        try:
+            self._append_log({'op': 'append', 'key': key, 'item': item})
+        except Exception as e:
+            st.error(f"Error saving session data: {str(e)}")
+
     def load_session_data(self, key: str, default=None):
         """Load data from temporary storage"""
         try:
             if key in st.session_state:
                 return st.session_state[key]
 
-            file_path = os.path.join(self.temp_dir, f"{key}.pkl")
-            if os.path.exists(file_path):
-                with open(file_path, 'rb') as f:
-                    data = pickle.load(f)
+            if key in self._records:
+                data = self._from_record(self._records[key])
                 st.session_state[key] = data
                 return data
         except Exception as e:
@@ -346,10 +650,7 @@ class SessionManager:
     def save_uploaded_file(self, uploaded_file, filename: str):
         """Save uploaded file to temporary storage"""
         try:
-            file_path = os.path.join(self.temp_dir, filename)
-            with open(file_path, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
-            return file_path
+            return self.table_store.put_file(uploaded_file.getvalue(), filename)
         except Exception as e:
             st.error(f"Error saving uploaded file: {str(e)}")
             return None
@@ -359,6 +660,239 @@ class SessionManager:
 def get_session_manager():
     return SessionManager()
 
+# Memory-Budgeted Table Manager
+TABLE_MEMORY_BUDGET_MB = int(os.environ.get('NLP_SQL_TABLE_MEMORY_MB', 2048))
+SESSION_IDLE_MINUTES = int(os.environ.get('NLP_SQL_SESSION_IDLE_MINUTES', 30))
+SESSION_EXPIRE_HOURS = int(os.environ.get('NLP_SQL_SESSION_EXPIRE_HOURS', 24))
+TEMP_SWEEP_SECONDS = 300
+
+def current_session_id() -> str:
+    """This browser session's id; every session gets its own"""
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    return st.session_state.session_id
+
+class TableManager:
+    """
+    Process-wide accounting of the tables, results and in-memory engine databases every session
+    holds. Beyond the budget, the least recently used tables of any session are spilled to the
+    TableStore and read back on their next access; caches holding a spilled table drop it too, so
+    the memory is freed. An engine's database is released the same way and reloaded by its next query.
+    A background sweep spills idle sessions whole, forgets expired ones and deletes temp dirs and
+    stored tables nothing has used since.
+    """
+    def __init__(self, table_store: TableStore, max_bytes: int, idle_seconds: float, expire_seconds: float,
+                 protected_dirs: List[str], referenced_digests, caches=(), sweep_seconds: float = TEMP_SWEEP_SECONDS):
+        self.table_store = table_store
+        self.caches = list(caches)
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self.protected_dirs = {os.path.abspath(path) for path in protected_dirs}
+        self.referenced_digests = referenced_digests
+        self.sessions = {}
+        self.expired = set()
+        self.frame_sizes = {}
+        self.stats = {'spilled_tables': 0, 'idle_sessions': 0, 'expired_sessions': 0, 'removed_dirs': 0, 'removed_files': 0}
+        self.lock = threading.RLock()
+        self._stop = threading.Event()
+        self._sweeper = threading.Thread(target=self._sweep_loop, args=(sweep_seconds,), name='table-manager-sweep', daemon=True)
+        self._sweeper.start()
+
+    def _session(self, session_id: str) -> Dict[str, Any]:
+        return self.sessions.setdefault(session_id, {
+            'tables': None, 'result': None, 'engine': None, 'dirs': set(), 'uploads': set(), 'last_seen': time.time(), 'idle': False
+        })
+
+    def frame_bytes(self, df: pd.DataFrame) -> int:
+        """Deep memory size, measured once per DataFrame object"""
+        key = id(df)
+        entry = self.frame_sizes.get(key)
+        if entry is not None and entry[0]() is df:
+            return entry[1]
+        size = int(df.memory_usage(deep=True).sum())
+        self.frame_sizes[key] = (weakref.ref(df, lambda _ref, key=key: self.frame_sizes.pop(key, None)), size)
+        return size
+
+    def attach(self, session_id: str, tables: Dict[str, pd.DataFrame]) -> LazyTableDict:
+        """Register a session's tables, wrapping a plain dict so its tables can be spilled; returns the managed mapping"""
+        if getattr(tables, 'spill', None) is None:
+            managed = LazyTableDict(self.table_store, {})
+            for table_name, df in tables.items():
+                managed[table_name] = df
+            tables = managed
+        with self.lock:
+            session = self._session(session_id)
+            session['tables'] = tables
+        self.enforce_budget()
+        return tables
+
+    def touch(self, session_id: str) -> bool:
+        """Mark a session active; True when it had expired and its tables and temp dirs are gone"""
+        with self.lock:
+            session = self._session(session_id)
+            session['last_seen'] = time.time()
+            session['idle'] = False
+            if session_id in self.expired:
+                self.expired.discard(session_id)
+                return True
+            return False
+
+    def track_result(self, session_id: str, result: Optional[pd.DataFrame]):
+        """Count a session's query result towards the budget without keeping it alive"""
+        with self.lock:
+            self._session(session_id)['result'] = weakref.ref(result) if result is not None else None
+
+    def track_engine(self, session_id: str, engine):
+        """Count the copies of tables a session's engine keeps in memory, without keeping the engine alive"""
+        with self.lock:
+            self._session(session_id)['engine'] = weakref.ref(engine)
+
+    def _engine(self, session: Dict[str, Any]):
+        return session['engine']() if session['engine'] is not None else None
+
+    def track_upload(self, session_id: str, digest: str):
+        """Keep this upload's stored file while the session lives"""
+        with self.lock:
+            self._session(session_id)['uploads'].add(digest)
+
+    def track_dir(self, session_id: str, path: str):
+        """Delete this directory when the session expires"""
+        with self.lock:
+            self._session(session_id)['dirs'].add(os.path.abspath(path))
+
+    def protect(self, path: str):
+        """Never sweep this directory; it belongs to the running process"""
+        with self.lock:
+            self.protected_dirs.add(os.path.abspath(path))
+
+    def session_bytes(self, session_id: str) -> int:
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                return 0
+            frames = list(session['tables'].loaded_tables().values()) if session['tables'] is not None else []
+            result = session['result']() if session['result'] is not None else None
+            if result is not None and all(result is not df for df in frames):
+                frames.append(result)
+            engine_bytes = getattr(self._engine(session), 'memory_bytes', 0)
+        return sum(self.frame_bytes(df) for df in frames) + engine_bytes
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            session_ids = list(self.sessions)
+        return sum(self.session_bytes(session_id) for session_id in session_ids)
+
+    def _spill(self, tables: LazyTableDict, table_name: str):
+        df = tables.loaded_tables().get(table_name)
+        digest = tables.spill(table_name)
+        if digest is None:
+            return
+        for cache in self.caches:
+            cache.release_table(df, digest)
+        self.stats['spilled_tables'] += 1
+
+    def enforce_budget(self):
+        """Spill least recently used tables, across all sessions, until usage is within budget"""
+        with self.lock:
+            total = self.total_bytes()
+            if total <= self.max_bytes:
+                return
+            candidates = []
+            for session in self.sessions.values():
+                engine = self._engine(session)
+                if getattr(engine, 'memory_bytes', 0):
+                    candidates.append((engine.last_used, None, engine, 0))
+                tables = session['tables']
+                if tables is None:
+                    continue
+                for table_name, df in tables.loaded_tables().items():
+                    candidates.append((tables.last_access.get(table_name, 0.0), table_name, tables, self.frame_bytes(df)))
+            candidates.sort(key=lambda candidate: candidate[0])
+
+            for _, table_name, owner, size in candidates:
+                if total <= self.max_bytes:
+                    break
+                if table_name is None:
+                    total -= owner.release_tables()
+                    continue
+                self._spill(owner, table_name)
+                total -= size
+
+    def sweep(self):
+        """Spill idle sessions, forget expired ones, and delete temp dirs and stored tables left behind"""
+        now = time.time()
+        with self.lock:
+            for session_id, session in list(self.sessions.items()):
+                idle_for = now - session['last_seen']
+                if idle_for > self.expire_seconds:
+                    for path in session['dirs']:
+                        shutil.rmtree(path, ignore_errors=True)
+                        self.stats['removed_dirs'] += 1
+                    # An expired session starts over when it returns, so its tables are dropped, not spilled
+                    if session['tables'] is not None:
+                        session['tables'].clear()
+                    del self.sessions[session_id]
+                    self.expired.add(session_id)
+                    self.stats['expired_sessions'] += 1
+                elif idle_for > self.idle_seconds and not session['idle']:
+                    for table_name in list(session['tables'].loaded_tables() if session['tables'] is not None else []):
+                        self._spill(session['tables'], table_name)
+                    engine = self._engine(session)
+                    if getattr(engine, 'memory_bytes', 0):
+                        engine.release_tables()
+                    session['idle'] = True
+                    self.stats['idle_sessions'] += 1
+
+            live_dirs = set(self.protected_dirs)
+            keep_digests = set(self.referenced_digests())
+            for session in self.sessions.values():
+                live_dirs.update(session['dirs'])
+                # Raw uploads are stored under the hash of their bytes; Parquet views in DiskEngine read them in place
+                keep_digests.update(session['uploads'])
+                if session['tables'] is not None:
+                    keep_digests.update(session['tables'].stored_digests())
+
+        # Other processes' and forgotten sessions' dirs, untouched for the expiry period
+        temp_root = tempfile.gettempdir()
+        store_root = os.path.abspath(self.table_store.root_dir)
+        for entry in os.scandir(temp_root):
+            path = os.path.abspath(entry.path)
+            if not entry.name.startswith('nlp_sql_') or path in live_dirs or path == store_root:
+                continue
+            try:
+                if not entry.is_dir(follow_symlinks=False):
+                    continue
+                last_modified = max([entry.stat().st_mtime] + [child.stat().st_mtime for child in os.scandir(path)])
+            except OSError:
+                continue
+            if now - last_modified > self.expire_seconds:
+                shutil.rmtree(path, ignore_errors=True)
+                self.stats['removed_dirs'] += 1
+
+        self.stats['removed_files'] += self.table_store.remove_stale(self.expire_seconds, keep_digests)
+
+    def _sweep_loop(self, sweep_seconds: float):
+        while not self._stop.wait(sweep_seconds):
+            try:
+                self.sweep()
+            except Exception:
+                # A failed sweep is retried on the next interval
+                pass
+
+@st.cache_resource
+def get_table_manager():
+    session_manager = get_session_manager()
+    return TableManager(
+        session_manager.table_store,
+        max_bytes=TABLE_MEMORY_BUDGET_MB * 1024 * 1024,
+        idle_seconds=SESSION_IDLE_MINUTES * 60,
+        expire_seconds=SESSION_EXPIRE_HOURS * 3600,
+        protected_dirs=[session_manager.temp_dir],
+        referenced_digests=session_manager.referenced_digests,
+        caches=[get_upload_cache(), get_result_cache()],
+    )
+
 # Enhanced initialization with persistence
 def initialize_session_state():
     session_manager = get_session_manager()
@@ -372,6 +906,7 @@ def initialize_session_state():
         'uploaded_file_paths': {},
         'join_conditions': [],
         'sql_query': "",
+        'sql_engine_name': 'SQLite',
         'query_result': None,
         'current_stage': 1,
         'visualization_settings': {
@@ -390,6 +925,19 @@ def initialize_session_state():
             loaded_value = session_manager.load_session_data(key, default_value)
             st.session_state[key] = loaded_value
 
+    # Account this session's tables and result against the process-wide memory budget
+    table_manager = get_table_manager()
+    session_id = current_session_id()
+    if table_manager.touch(session_id):
+        close_sql_engine()
+        discard_out_of_core_tables()
+        st.session_state.uploaded_files = {}
+        st.session_state.query_result = None
+        st.session_state.current_stage = 1
+        st.session_state.session_expired = True
+    st.session_state.uploaded_files = table_manager.attach(session_id, st.session_state.uploaded_files)
+    table_manager.track_result(session_id, st.session_state.query_result)
+
 # Enhanced AWS Authentication
 def authenticate_aws(username, password, account_id, region):
     try:
@@ -414,8 +962,174 @@ def authenticate_aws(username, password, account_id, region):
         st.error(f"Authentication failed: {str(e)}")
         return False
 
+# Generated SQL Cache (shared on local disk by all sessions of this deployment)
+def normalize_question(question: str) -> str:
+    """Case-fold a question and collapse its whitespace, keeping every other character"""
+    return ' '.join(question.casefold().split())
+
+# Filler words that do not change which SQL a question asks for; negations and comparisons are kept
+QUESTION_STOPWORDS = frozenset({
+    'a', 'an', 'the', 'please', 'me', 'us', 'show', 'display', 'list', 'give', 'get', 'find', 'tell',
+    'return', 'what', 'which', 'is', 'are', 'was', 'were', 'do', 'does', 'can', 'could', 'would',
+    'you', 'i', 'all', 'of', 'for'
+})
+
+def question_tokens(normalized: str) -> set:
+    """
+    Words and operator runs of a normalized question, compared for near-duplicate matches.
+    Filler words and sentence punctuation are dropped.
+    """
+    return {
+        token for token in re.findall(r'\w+|[^\w\s]+', normalized)
+        if token not in QUESTION_STOPWORDS and token.strip('?.,!;:\'"')
+    }
+
+class SQLGenerationCache:
+    """SQLite-backed cache of generated SQL with a TTL and an entry cap"""
+    # Bumped whenever cache keys are built differently; older entries are dropped on open
+    KEY_VERSION = 2
+
+    def __init__(self, db_path: str, ttl_seconds: int = 24 * 3600, max_entries: int = 1000,
+                 similarity_threshold: float = 0.85):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    cache_key TEXT PRIMARY KEY,
+                    context_key TEXT NOT NULL,
+                    question TEXT NOT NULL,
+                    sql_query TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_generations_context ON generations (context_key)")
+            if conn.execute("PRAGMA user_version").fetchone()[0] < self.KEY_VERSION:
+                conn.execute("DELETE FROM generations")
+                conn.execute(f"PRAGMA user_version = {self.KEY_VERSION}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def build_context_key(*context_parts: str) -> str:
+        """Hash of everything besides the question that shapes the generated SQL"""
+        return hashlib.sha256('\x00'.join(context_parts).encode('utf-8')).hexdigest()
+
+    def get(self, question: str, context_key: str, allow_similar: bool = False) -> Optional[str]:
+        """Cached SQL for an identical question, or for a near-duplicate one when allowed"""
+        normalized = normalize_question(question)
+        cache_key = self.build_context_key(context_key, normalized)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM generations WHERE created_at < ?", (now - self.ttl_seconds,))
+            row = conn.execute("SELECT cache_key, sql_query FROM generations WHERE cache_key = ?",
+                               (cache_key,)).fetchone()
+
+            if row is None and allow_similar:
+                tokens = question_tokens(normalized)
+                # Wording may differ, but numbers and operators such as > and < must agree
+                literals = {token for token in tokens if not token.isalpha()}
+                best_score = 0.0
+                for candidate_key, candidate_question, candidate_sql in conn.execute(
+                        "SELECT cache_key, question, sql_query FROM generations WHERE context_key = ?",
+                        (context_key,)):
+                    candidate_tokens = question_tokens(candidate_question)
+                    if {token for token in candidate_tokens if not token.isalpha()} != literals:
+                        continue
+                    union = tokens | candidate_tokens
+                    score = len(tokens & candidate_tokens) / len(union) if union else 0.0
+                    if score >= self.similarity_threshold and score > best_score:
+                        best_score = score
+                        row = (candidate_key, candidate_sql)
+
+            if row is None:
+                return None
+            conn.execute("UPDATE generations SET last_used = ? WHERE cache_key = ?", (now, row[0]))
+            return row[1]
+
+    def put(self, question: str, context_key: str, sql_query: str):
+        normalized = normalize_question(question)
+        cache_key = self.build_context_key(context_key, normalized)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?)",
+                         (cache_key, context_key, normalized, sql_query, now, now))
+            conn.execute("""
+                DELETE FROM generations WHERE cache_key IN (
+                    SELECT cache_key FROM generations ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+@st.cache_resource
+def get_generation_cache():
+    cache_dir = os.environ.get('NLP_SQL_CACHE_DIR', tempfile.gettempdir())
+    os.makedirs(cache_dir, exist_ok=True)
+    return SQLGenerationCache(os.path.join(cache_dir, 'nlp_sql_generation_cache.db'))
+
+# Streaming SQL Generation
+class StreamingSQLExtractor:
+    """Strips markdown code fences from streamed model output as chunks arrive"""
+    FENCE_PATTERN = re.compile(r'```(?:sql)?')
+    PARTIAL_FENCE_PATTERN = re.compile(r'(?:`{1,3}|```s|```sq)$')
+
+    def __init__(self):
+        self.sql = ''
+        self._pending = ''
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk of model output and return the SQL extracted so far"""
+        text = self._pending + chunk
+        # Hold back a fence that may be split across chunks, e.g. "``" + "`sql"
+        partial = self.PARTIAL_FENCE_PATTERN.search(text)
+        if partial:
+            text, self._pending = text[:partial.start()], text[partial.start():]
+        else:
+            self._pending = ''
+        self.sql += self.FENCE_PATTERN.sub('', text)
+        return self.sql.lstrip()
+
+    def finish(self) -> str:
+        """Flush any held-back text and return the final SQL"""
+        self.sql += self.FENCE_PATTERN.sub('', self._pending)
+        self._pending = ''
+        return self.sql.strip()
+
+def stream_converse_text(bedrock_client, model_id: str, messages: List[Dict], on_text=None, **converse_kwargs):
+    """Call converse_stream, passing each text delta to on_text; returns the full text and timing metrics"""
+    start_time = time.perf_counter()
+    first_token_time = None
+    full_text = ''
+
+    response = bedrock_client.converse_stream(modelId=model_id, messages=messages, **converse_kwargs)
+    for event in response['stream']:
+        delta = event.get('contentBlockDelta', {}).get('delta', {})
+        if 'text' not in delta:
+            continue
+        if first_token_time is None:
+            first_token_time = time.perf_counter()
+        full_text += delta['text']
+        if on_text is not None:
+            on_text(delta['text'])
+
+    end_time = time.perf_counter()
+    metrics = {
+        'time_to_first_token': (first_token_time or end_time) - start_time,
+        'total_latency': end_time - start_time
+    }
+    return full_text, metrics
+
 # Enhanced SQL Generation
-def generate_sql_with_bedrock(natural_language_query, table_schemas, join_conditions, bedrock_client):
+def generate_sql_with_bedrock(natural_language_query, table_schemas, join_conditions, bedrock_client, sql_dialect='SQLite', allow_similar_cached=False, on_partial_sql=None):
     try:
         # Create a comprehensive prompt
         tables_info = ""
@@ -427,7 +1141,7 @@ def generate_sql_with_bedrock(natural_language_query, table_schemas, join_condit
         if join_conditions:
             joins_info = "\nJoin Conditions:\n"
             for i, join in enumerate(join_conditions):
-                joins_info += f"{i+1}. {join['left_table']}.{join['left_column']} {join['join_type']} {join['right_table']}.{join['right_column']}\n"
+                joins_info += f"{i+1}. {join['left_table']}.{join['left_column']} {join['join_type']} {join['right_table']}.{join['right_column']}{describe_join_safeguard(join)}\n"
 
         prompt = f"""
 You are an expert SQL developer. Generate a precise SQL query based on the following information:
@@ -438,7 +1152,7 @@ You are an expert SQL developer. Generate a precise SQL query based on the follo
 Natural Language Query: {natural_language_query}
 
 Instructions:
-1. Generate only valid SQL syntax
+1. Generate only valid {sql_dialect} SQL syntax
 2. Use appropriate WHERE clauses, JOINs, GROUP BY, ORDER BY as needed
 3. Follow the specified join conditions
 4. Use table aliases for better readability
@@ -451,17 +1165,46 @@ SQL Query:
         message = [{"role": "user", "content": [{"text": prompt}]}]
         model_id = 'anthropic.claude-3-sonnet-20240620-v1:0'
 
-        response = bedrock_client.converse(modelId=model_id, messages=message)
-        output_text = response['output']['message']
-        sql_query = ''
-        for content in output_text['content']:
-            sql_query += content['text']
+        # Reuse SQL generated earlier for the same question, schemas and joins
+        generation_cache = get_generation_cache()
+        context_key = generation_cache.build_context_key(model_id, sql_dialect, tables_info, joins_info)
+        cached_sql = generation_cache.get(natural_language_query, context_key, allow_similar=allow_similar_cached)
+
+        if cached_sql:
+            sql_query = cached_sql
+            st.info("⚡ Reused SQL generated earlier for this question and schema")
+            st.session_state.last_generation_metrics = None
+        elif on_partial_sql is not None:
+            # Stream tokens and clean code fences incrementally
+            extractor = StreamingSQLExtractor()
+            _, metrics = stream_converse_text(
+                bedrock_client, model_id, message,
+                on_text=lambda chunk: on_partial_sql(extractor.feed(chunk))
+            )
+            sql_query = extractor.finish()
+            st.session_state.last_generation_metrics = metrics
+        else:
+            start_time = time.perf_counter()
+            response = bedrock_client.converse(modelId=model_id, messages=message)
+            total_latency = time.perf_counter() - start_time
+            st.session_state.last_generation_metrics = {
+                'time_to_first_token': total_latency,
+                'total_latency': total_latency
+            }
+
+            output_text = response['output']['message']
+            sql_query = ''
+            for content in output_text['content']:
+                sql_query += content['text']
+
+            # Clean up the SQL query
+            sql_query = sql_query.strip()
+            sql_query = re.sub(r'```sql', '', sql_query)
+            sql_query = re.sub(r'```', '', sql_query)
+            sql_query = sql_query.strip()
 
-        # Clean up the SQL query
-        sql_query = sql_query.strip()
-        sql_query = re.sub(r'```sql', '', sql_query)
-        sql_query = re.sub(r'```', '', sql_query)
-        sql_query = sql_query.strip()
+        if sql_query and not cached_sql:
+            generation_cache.put(natural_language_query, context_key, sql_query)
 
         # Save to query history
         if sql_query:
@@ -476,119 +1219,1242 @@ SQL Query:
 
             # Save to session
             session_manager = get_session_manager()
-            session_manager.save_session_data('query_history', st.session_state.query_history)
+            session_manager.append_session_data('query_history', query_entry)
 
         return sql_query
     except Exception as e:
         st.error(f"Error generating SQL: {str(e)}")
         return None
 
-# Enhanced SQL Execution
-def execute_sql_query(sql_query, dataframes_dict):
+# Persistent Per-Session SQL Engine
+def compute_table_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a table's columns, dtypes and values"""
+    hasher = hashlib.sha1(str(list(zip(df.columns, df.dtypes.astype(str)))).encode('utf-8'))
     try:
-        conn = sqlite3.connect(':memory:')
-
-        for table_name, df in dataframes_dict.items():
-            df.to_sql(table_name, conn, index=False, if_exists='replace')
-
-        result = pd.read_sql_query(sql_query, conn)
-        conn.close()
+        hashes = pd.util.hash_pandas_object(df, index=False)
+    except TypeError:
+        # Lists, arrays and structs (DuckDB LIST/STRUCT results) are unhashable; those columns are hashed by their text
+        hashable = df.copy(deep=False)
+        for position in range(hashable.shape[1]):
+            column = hashable.iloc[:, position]
+            try:
+                pd.util.hash_pandas_object(column, index=False)
+            except TypeError:
+                hashable.isetitem(position, column.astype(str))
+        hashes = pd.util.hash_pandas_object(hashable, index=False)
+    hasher.update(hashes.values.tobytes())
+    return hasher.hexdigest()
 
-        return result
-    except Exception as e:
-        st.error(f"Error executing SQL query: {str(e)}")
-        return None
+@st.cache_resource
+def get_fingerprint_memo():
+    """Process-wide memo of table fingerprints keyed by DataFrame identity"""
+    return {}
+
+def get_table_fingerprint(df: pd.DataFrame) -> str:
+    """Fingerprint a table once per DataFrame object; entries drop when the frame is freed"""
+    memo = get_fingerprint_memo()
+    key = id(df)
+    entry = memo.get(key)
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+
+    fingerprint = compute_table_fingerprint(df)
+    memo[key] = (weakref.ref(df, lambda _ref, key=key: memo.pop(key, None)), fingerprint)
+    return fingerprint
+
+def table_fingerprint(tables: Dict[str, pd.DataFrame], table_name: str) -> str:
+    """Fingerprint of one table in a mapping; spilled tables of a session mapping are not loaded"""
+    fingerprint = getattr(tables, 'fingerprint', None)
+    return fingerprint(table_name) if fingerprint is not None else get_table_fingerprint(tables[table_name])
+
+def widen_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    df with narrow integer and float columns cast back to 64 bits, so SQL arithmetic on them
+    neither overflows nor loses precision. Returns df itself when nothing needs widening.
+    """
+    widened = None
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series) and series.dtype.itemsize < 8:
+            wide_dtype = 'Int64' if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else np.int64
+        elif pd.api.types.is_float_dtype(series) and series.dtype.itemsize < 8:
+            wide_dtype = 'Float64' if isinstance(series.dtype, pd.api.extensions.ExtensionDtype) else np.float64
+        else:
+            continue
+        if widened is None:
+            widened = df.copy(deep=False)
+        widened.isetitem(i, series.astype(wide_dtype))
+    return df if widened is None else widened
+
+class SQLiteEngine:
+    """Long-lived SQLite connection that keeps uploaded tables loaded between queries"""
+    name = 'SQLite'
+    dialect = 'SQLite'
+    normalizes_column_names = False
 
-# Dynamic Advanced Visualization Engine
-def create_dynamic_visualizations(data, query_description, user_preferences=None):
-    """Create multiple dynamic and interactive visualizations"""
-    if data is None or data.empty:
-        return None
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.lock = threading.Lock()
+        self.table_fingerprints = {}
+        # Size of the in-memory database, read by the table manager without taking the lock
+        self.memory_bytes = 0
+        self.last_used = time.time()
+        # Close the connection when the owning session is garbage collected
+        self._finalizer = weakref.finalize(self, self.conn.close)
+
+    def sync_tables(self, dataframes_dict: Dict[str, pd.DataFrame]):
+        """Load new or changed tables and drop tables that are no longer uploaded"""
+        for table_name in list(self.table_fingerprints):
+            if table_name not in dataframes_dict:
+                self.conn.execute('DROP TABLE IF EXISTS "{}"'.format(table_name.replace('"', '""')))
+                self.table_fingerprints.pop(table_name, None)
+
+        # Compared by fingerprint, so a table spilled by the table manager is not read back; the database keeps its own copy
+        for table_name in dataframes_dict:
+            fingerprint = table_fingerprint(dataframes_dict, table_name)
+            if self.table_fingerprints.get(table_name) != fingerprint:
+                was_loaded = not isinstance(dataframes_dict, LazyTableDict) or table_name in dataframes_dict.loaded_tables()
+                widen_numeric_columns(dataframes_dict[table_name]).to_sql(table_name, self.conn, index=False, if_exists='replace')
+                self.table_fingerprints[table_name] = fingerprint
+                if not was_loaded:
+                    # Read back only to reload the database after release_tables; the stored copy is kept
+                    dataframes_dict.spill(table_name)
+        page_count = self.conn.execute('PRAGMA page_count').fetchone()[0]
+        page_size = self.conn.execute('PRAGMA page_size').fetchone()[0]
+        self.memory_bytes = page_count * page_size
+
+    def execute(self, sql_query: str, dataframes_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Run a query after making sure every uploaded table is loaded"""
+        with self.lock:
+            self.last_used = time.time()
+            self.sync_tables(dataframes_dict)
+            return pd.read_sql_query(sql_query, self.conn)
+
+    def release_tables(self) -> int:
+        """
+        Free the in-memory database for the table manager; the next query loads its tables again.
+        Returns the bytes freed, 0 when a query holds the connection.
+        """
+        if not self.lock.acquire(blocking=False):
+            return 0
+        try:
+            freed = self.memory_bytes
+            self._finalizer()
+            self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+            self._finalizer = weakref.finalize(self, self.conn.close)
+            self.table_fingerprints = {}
+            self.memory_bytes = 0
+            return freed
+        finally:
+            self.lock.release()
+
+    def close(self):
+        """Release the connection and all loaded tables"""
+        self._finalizer()
+        self.table_fingerprints = {}
+        self.memory_bytes = 0
+
+class DuckDBEngine:
+    """Columnar DuckDB connection that scans the session's DataFrames in place"""
+    name = 'DuckDB'
+    dialect = 'DuckDB'
+    # Unaliased expressions are named by their canonical form, whatever their spacing or keyword case
+    normalizes_column_names = True
 
-    charts = []
-    numeric_cols = data.select_dtypes(include=[np.number]).columns.tolist()
-    categorical_cols = data.select_dtypes(include=['object', 'category']).columns.tolist()
-    datetime_cols = []
+    def __init__(self):
+        self.conn = duckdb.connect(':memory:')
+        self.lock = threading.Lock()
+        self.table_frames = {}
+        self._finalizer = weakref.finalize(self, self.conn.close)
+
+    def sync_tables(self, dataframes_dict: Dict[str, pd.DataFrame]):
+        """Register uploaded DataFrames as views; registration does not copy the data"""
+        for table_name in list(self.table_frames):
+            if table_name not in dataframes_dict:
+                self.conn.unregister(table_name)
+                self.table_frames.pop(table_name, None)
 
-    # Detect datetime columns
-    for col in data.columns:
-        if pd.api.types.is_datetime64_any_dtype(data[col]) or 'date' in col.lower() or 'time' in col.lower():
+        for table_name, df in dataframes_dict.items():
+            if self.table_frames.get(table_name) is not df:
+                # DuckDB keeps narrow types, so INT8 arithmetic would overflow where pandas' would not
+                self.conn.register(table_name, widen_numeric_columns(df))
+                self.table_frames[table_name] = df
+
+    def execute(self, sql_query: str, dataframes_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        """Run a query with DuckDB's vectorized executor"""
+        with self.lock:
+            # Only the tables the query mentions are registered, so spilled tables it skips stay on disk
+            self.sync_tables({
+                table_name: dataframes_dict[table_name] for table_name in referenced_tables(sql_query, dataframes_dict)
+            })
+            return self.conn.execute(sql_query).df()
+
+    def close(self):
+        """Release the connection and all registered tables"""
+        self._finalizer()
+        self.table_frames = {}
+
+# Paginated Result Cursors
+RESULT_PREVIEW_ROWS = 50000
+
+def quote_identifier(name: str) -> str:
+    return '"{}"'.format(name.replace('"', '""'))
+
+def escape_like(term: str) -> str:
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class SearchIndex:
+    """
+    Substring index over a result, built a column at a time on first search. Each column is
+    factorized and only its distinct values are lowercased and joined into one string, so a
+    search scans distinct values in C and maps the hits back to rows through the codes.
+    """
+    SEPARATOR = '\x00'
+
+    def __init__(self, frame: pd.DataFrame, max_cached_searches: int = 16):
+        self.frame = frame
+        self.column_entries = {}
+        self.masks = OrderedDict()
+        self.max_cached_searches = max_cached_searches
+
+    def column_entry(self, column: str) -> Tuple[np.ndarray, str, List[int]]:
+        entry = self.column_entries.get(column)
+        if entry is None:
+            series = self.frame[column]
             try:
-                data[col] = pd.to_datetime(data[col])
-                datetime_cols.append(col)
-            except:
-                pass
+                codes, uniques = pd.factorize(series)
+            except TypeError:
+                # Lists, arrays and structs (DuckDB LIST/STRUCT results) are unhashable; match on their text
+                codes, uniques = pd.factorize(series.astype(str))
+                codes[series.isna().to_numpy()] = -1
+            texts = [str(value).lower().replace(self.SEPARATOR, ' ') for value in uniques]
+            # starts[i] is where value i begins in the joined text; the last entry closes the final value
+            starts = np.cumsum([1] + [len(text) + 1 for text in texts]).tolist()
+            text = self.SEPARATOR + self.SEPARATOR.join(texts) + self.SEPARATOR
+            entry = (codes, text, starts)
+            self.column_entries[column] = entry
+        return entry
+
+    def column_mask(self, column: str, term: str) -> np.ndarray:
+        codes, text, starts = self.column_entry(column)
+        # One extra slot keeps missing values (code -1) unmatched
+        matched = np.zeros(len(starts), dtype=bool)
+        position = text.find(term)
+        while position != -1:
+            value = bisect.bisect_right(starts, position) - 1
+            matched[value] = True
+            position = text.find(term, starts[value + 1])
+        return matched[codes]
+
+    def search(self, term: str, column: Optional[str] = None) -> np.ndarray:
+        """Row mask of case-insensitive substring matches in one column or any column"""
+        term = term.lower().replace(self.SEPARATOR, ' ')
+        key = (term, column)
+        if key in self.masks:
+            self.masks.move_to_end(key)
+            return self.masks[key]
+
+        columns = [column] if column else list(self.frame.columns)
+        mask = np.zeros(len(self.frame), dtype=bool)
+        for col in columns:
+            mask |= self.column_mask(col, term)
+        self.masks[key] = mask
+        while len(self.masks) > self.max_cached_searches:
+            self.masks.popitem(last=False)
+        return mask
+
+class FrameResult:
+    """
+    Cursor over a result an in-memory engine already returned. Sort orders are computed once
+    as row positions and searches go through a SearchIndex kept with the result, so a page is
+    a single take of the requested rows.
+    """
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self.preview = frame
+        self.orders = {}
+        self.search_index = SearchIndex(frame)
+
+    def positions(self, sort_by: Optional[str] = None, ascending: bool = True, search: Optional[str] = None, search_column: Optional[str] = None) -> Optional[np.ndarray]:
+        """Row positions in display order, or None for every row in stored order"""
+        order = None
+        if sort_by:
+            order = self.orders.get((sort_by, ascending))
+            if order is None:
+                ordered = self.frame[sort_by].reset_index(drop=True).sort_values(ascending=ascending, kind='stable')
+                order = ordered.index.to_numpy()
+                self.orders[(sort_by, ascending)] = order
+        if search:
+            mask = self.search_index.search(search, search_column)
+            order = np.flatnonzero(mask) if order is None else order[mask[order]]
+        return order
+
+    def count(self, search: Optional[str] = None, search_column: Optional[str] = None) -> int:
+        if not search:
+            return len(self.frame)
+        return int(self.search_index.search(search, search_column).sum())
+
+    def page(self, offset: int, limit: int, sort_by: Optional[str] = None, ascending: bool = True, search: Optional[str] = None, search_column: Optional[str] = None) -> pd.DataFrame:
+        order = self.positions(sort_by, ascending, search, search_column)
+        if order is None:
+            return self.frame.iloc[offset:offset + limit]
+        return self.frame.take(order[offset:offset + limit])
+
+    def head(self, limit: int) -> pd.DataFrame:
+        return self.frame.head(limit)
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.frame
+
+    def result_key(self) -> str:
+        return get_table_fingerprint(self.frame)
+
+    def iter_chunks(self, chunk_rows: int, columns: Optional[List[str]] = None, limit: Optional[int] = None):
+        """Consecutive row slices; slicing does not copy the result"""
+        frame = self.frame[columns] if columns else self.frame
+        if limit is not None:
+            frame = frame.iloc[:limit]
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+
+    def arrow_schema(self, columns: Optional[List[str]] = None):
+        return pa.Schema.from_pandas(self.frame[columns] if columns else self.frame, preserve_index=False)
+
+    def iter_record_batches(self, chunk_rows: int, columns: Optional[List[str]] = None, limit: Optional[int] = None):
+        """Arrow record batches under one schema, so chunks with all-missing columns keep their types"""
+        schema = self.arrow_schema(columns)
+        for chunk in self.iter_chunks(chunk_rows, columns, limit):
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+class TableResult:
+    """
+    Cursor over a result table inside an engine's database. Sorting, searching and counting run
+    in the database and only the requested page is read back.
+    """
+    def __init__(self, engine, table_name: str):
+        self.engine = engine
+        self.table_name = table_name
+        self.preview = None
+        self.counts = {}
+
+    def where_clause(self, search: Optional[str], search_column: Optional[str] = None) -> str:
+        """Case-insensitive substring match on one column's or any column's text form"""
+        if not search:
+            return ''
+        pattern = "'%{}%'".format(escape_like(search.lower()).replace("'", "''"))
+        conditions = [
+            f"lower(CAST({quote_identifier(col)} AS VARCHAR)) LIKE {pattern} ESCAPE '\\'"
+            for col in ([search_column] if search_column else self.columns())
+        ]
+        return ' WHERE ' + ' OR '.join(conditions)
+
+    def columns(self) -> List[str]:
+        if self.preview is not None:
+            return list(self.preview.columns)
+        return list(self.engine.read(f"SELECT * FROM {quote_identifier(self.table_name)} LIMIT 0").columns)
+
+    def count(self, search: Optional[str] = None, search_column: Optional[str] = None) -> int:
+        """Total rows, counted on first use"""
+        key = (search, search_column) if search else None
+        if key not in self.counts:
+            query = f"SELECT COUNT(*) AS n FROM {quote_identifier(self.table_name)}{self.where_clause(search, search_column)}"
+            self.counts[key] = int(self.engine.read(query)['n'].iloc[0])
+        return self.counts[key]
+
+    def page(self, offset: int, limit: int, sort_by: Optional[str] = None, ascending: bool = True, search: Optional[str] = None, search_column: Optional[str] = None) -> pd.DataFrame:
+        query = f"SELECT * FROM {quote_identifier(self.table_name)}{self.where_clause(search, search_column)}"
+        if sort_by:
+            # rowid breaks ties so consecutive pages neither repeat nor skip rows
+            direction = 'ASC' if ascending else 'DESC'
+            query += f" ORDER BY {quote_identifier(sort_by)} {direction} NULLS LAST, rowid"
+        return self.engine.read(f"{query} LIMIT {int(limit)} OFFSET {int(offset)}")
+
+    def head(self, limit: int) -> pd.DataFrame:
+        return self.page(0, limit)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Every row; only exports should need this"""
+        return self.engine.read(f"SELECT * FROM {quote_identifier(self.table_name)}")
+
+    def result_key(self) -> str:
+        """Result tables are named per execution, so the name identifies the result"""
+        return self.table_name
+
+    def select_query(self, columns: Optional[List[str]] = None, limit: Optional[int] = None) -> str:
+        selected = ', '.join(quote_identifier(col) for col in columns) if columns else '*'
+        query = f"SELECT {selected} FROM {quote_identifier(self.table_name)}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return query
+
+    def iter_chunks(self, chunk_rows: int, columns: Optional[List[str]] = None, limit: Optional[int] = None):
+        """Stream rows out of the database in DataFrames of at most chunk_rows"""
+        query = self.select_query(columns, limit)
+        with self.engine.lock:
+            if duckdb is not None:
+                for batch in self.engine.conn.execute(query).fetch_record_batch(chunk_rows):
+                    yield batch.to_pandas()
+            else:
+                yield from pd.read_sql_query(query, self.engine.conn, chunksize=chunk_rows)
+
+    def arrow_schema(self, columns: Optional[List[str]] = None):
+        if duckdb is not None:
+            with self.engine.lock:
+                return self.engine.conn.execute(self.select_query(columns, 0)).to_arrow_table().schema
+        # SQLite keeps no column types of its own; the preview's types stand in
+        return pa.Schema.from_pandas(self.preview[columns] if columns else self.preview, preserve_index=False)
+
+    def iter_record_batches(self, chunk_rows: int, columns: Optional[List[str]] = None, limit: Optional[int] = None):
+        """Arrow record batches straight from DuckDB, or converted from SQLite chunks"""
+        if duckdb is not None:
+            with self.engine.lock:
+                yield from self.engine.conn.execute(self.select_query(columns, limit)).fetch_record_batch(chunk_rows)
+            return
+        schema = self.arrow_schema(columns)
+        for chunk in self.iter_chunks(chunk_rows, columns, limit):
+            yield pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False)
+
+# Out-of-Core Execution
+MEMORY_BUDGET_MB = int(os.environ.get('NLP_SQL_MEMORY_BUDGET_MB', 1024))
+OUT_OF_CORE_PREVIEW_ROWS = 10000
+
+def get_out_of_core_dir() -> str:
+    """This session's directory for its on-disk database and spill files"""
+    path = st.session_state.get('out_of_core_dir')
+    if path is None or not os.path.isdir(path):
+        path = tempfile.mkdtemp(prefix='nlp_sql_ooc_')
+        st.session_state.out_of_core_dir = path
+        get_table_manager().track_dir(current_session_id(), path)
+    return path
+
+def discard_out_of_core_tables():
+    """Delete this session's on-disk tables and results"""
+    for key in ('disk_tables', 'disk_table_previews', 'query_cursor'):
+        st.session_state.pop(key, None)
+    path = st.session_state.pop('out_of_core_dir', None)
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+
+class DiskEngine:
+    """
+    Out-of-core backend: tables live in a database file in the session's directory and queries
+    spill to disk beyond MEMORY_BUDGET_MB. DuckDB is used when installed, SQLite otherwise.
+    """
+    name = 'Disk (out-of-core)'
+    dialect = 'DuckDB' if duckdb is not None else 'SQLite'
+    out_of_core = True
 
-    # Get user preferences
-    viz_settings = st.session_state.get('visualization_settings', {})
-    color_scheme = viz_settings.get('color_schemes', ['plotly'])[0]
+    def __init__(self):
+        directory = get_out_of_core_dir()
+        self.lock = threading.Lock()
+        self.table_fingerprints = {}
+        self.result_table = None
+        if duckdb is not None:
+            self.conn = duckdb.connect(os.path.join(directory, 'tables.duckdb'))
+            self.conn.execute(f"SET memory_limit = '{MEMORY_BUDGET_MB}MB'")
+            self.conn.execute("SET temp_directory = '{}'".format(os.path.join(directory, 'spill').replace("'", "''")))
+        else:
+            self.conn = sqlite3.connect(os.path.join(directory, 'tables.sqlite'), check_same_thread=False)
+            # Bound the page cache by the budget and keep sorts and temporary b-trees in files
+            self.conn.execute(f"PRAGMA cache_size = -{MEMORY_BUDGET_MB * 1024}")
+            self.conn.execute("PRAGMA temp_store = FILE")
+        self._finalizer = weakref.finalize(self, self.conn.close)
+
+    def read(self, sql_query: str) -> pd.DataFrame:
+        if duckdb is not None:
+            return self.conn.execute(sql_query).df()
+        return pd.read_sql_query(sql_query, self.conn)
+
+    def read_chunks(self, sql_query: str, chunk_rows: int):
+        """Stream a query's rows in DataFrames of at most chunk_rows"""
+        with self.lock:
+            if duckdb is not None:
+                for batch in self.conn.execute(sql_query).fetch_record_batch(chunk_rows):
+                    yield batch.to_pandas()
+            else:
+                yield from pd.read_sql_query(sql_query, self.conn, chunksize=chunk_rows)
+
+    def drop_relation(self, table_name: str):
+        """Drop a table or a view of that name, whichever exists"""
+        if duckdb is not None:
+            kinds = self.conn.execute(
+                "SELECT table_type FROM information_schema.tables WHERE table_name = ?", [table_name]
+            ).fetchall()
+            for (kind,) in kinds:
+                self.conn.execute("DROP {} IF EXISTS {}".format('VIEW' if kind == 'VIEW' else 'TABLE', quote_identifier(table_name)))
+        else:
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(table_name)}")
+
+    def ingest_file(self, table_name: str, file_path: str):
+        """
+        Load an uploaded file straight into the database without building a DataFrame of it.
+        Parquet is attached as a DuckDB view over the file, so each query reads only the
+        columns and row groups its projection and filters need.
+        """
+        file_format = upload_format(file_path)
+        quoted_path = file_path.replace("'", "''")
+        with self.lock:
+            self.drop_relation(table_name)
+            if duckdb is not None and file_format == 'parquet':
+                self.conn.execute("CREATE VIEW {} AS SELECT * FROM read_parquet('{}')".format(
+                    quote_identifier(table_name), quoted_path
+                ))
+            elif duckdb is not None and file_format == 'arrow':
+                # DuckDB scans the memory-mapped IPC data batch by batch, in the file or the stream layout
+                ipc_reader = open_arrow_ipc(pa.memory_map(file_path))
+                if isinstance(ipc_reader, pa.ipc.RecordBatchFileReader):
+                    file_reader = ipc_reader
+                    ipc_reader = pa.RecordBatchReader.from_batches(
+                        file_reader.schema, (file_reader.get_batch(i) for i in range(file_reader.num_record_batches))
+                    )
+                self.conn.register('ipc_upload', ipc_reader)
+                try:
+                    self.conn.execute(f"CREATE TABLE {quote_identifier(table_name)} AS SELECT * FROM ipc_upload")
+                finally:
+                    self.conn.unregister('ipc_upload')
+            elif duckdb is not None:
+                self.conn.execute("CREATE TABLE {} AS SELECT * FROM read_csv_auto('{}')".format(
+                    quote_identifier(table_name), quoted_path
+                ))
+            else:
+                if file_format == 'csv':
+                    chunks = pd.read_csv(file_path, chunksize=CSV_CHUNK_ROWS)
+                else:
+                    chunks = (batch.to_pandas() for batch in iter_arrow_batches(pa.memory_map(file_path), file_format))
+                for chunk in chunks:
+                    chunk.to_sql(table_name, self.conn, index=False, if_exists='append')
+                self.conn.commit()
+            self.table_fingerprints.pop(table_name, None)
+
+    def table_rows(self, table_name: str) -> int:
+        with self.lock:
+            return int(self.read(f"SELECT COUNT(*) AS n FROM {quote_identifier(table_name)}")['n'].iloc[0])
+
+    def sync_tables(self, dataframes_dict: Dict[str, pd.DataFrame]):
+        """Write in-memory tables to disk; tables ingested from files are already there"""
+        disk_tables = st.session_state.get('disk_tables', {})
+        for table_name in dataframes_dict:
+            if table_name in disk_tables:
+                continue
+            fingerprint = table_fingerprint(dataframes_dict, table_name)
+            if self.table_fingerprints.get(table_name) == fingerprint:
+                continue
+            df = dataframes_dict[table_name]
+            if duckdb is not None:
+                self.drop_relation(table_name)
+                self.conn.register('incoming_table', widen_numeric_columns(df))
+                self.conn.execute(f"CREATE TABLE {quote_identifier(table_name)} AS SELECT * FROM incoming_table")
+                self.conn.unregister('incoming_table')
+            else:
+                widen_numeric_columns(df).to_sql(table_name, self.conn, index=False, if_exists='replace')
+            self.table_fingerprints[table_name] = fingerprint
+
+    def execute_to_disk(self, sql_query: str, dataframes_dict: Dict[str, pd.DataFrame]) -> TableResult:
+        """Run a query into a result table on disk, replacing the previous result"""
+        with self.lock:
+            self.sync_tables(dataframes_dict)
+            if self.result_table is not None:
+                self.conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(self.result_table)}")
+            self.result_table = f"query_result_{uuid.uuid4().hex[:12]}"
+            self.conn.execute(f"CREATE TABLE {quote_identifier(self.result_table)} AS {sql_query.strip().rstrip(';')}")
+            return TableResult(self, self.result_table)
+
+    def execute(self, sql_query: str, dataframes_dict: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+        with self.lock:
+            self.sync_tables(dataframes_dict)
+            return self.read(sql_query)
+
+    def close(self):
+        """Close the connection; the database file stays until the analysis is discarded"""
+        self._finalizer()
+        self.table_fingerprints = {}
+
+# Available execution backends, keyed by the name shown in the UI
+SQL_ENGINES = {SQLiteEngine.name: SQLiteEngine}
+if duckdb is not None:
+    SQL_ENGINES[DuckDBEngine.name] = DuckDBEngine
+SQL_ENGINES[DiskEngine.name] = DiskEngine
+
+def get_sql_engine():
+    """Return this session's SQL engine for the selected backend, creating it on first use"""
+    engine_name = st.session_state.get('sql_engine_name', SQLiteEngine.name)
+    engine_class = SQL_ENGINES.get(engine_name, SQLiteEngine)
+
+    # Compare by name: classes are redefined on every script rerun, so isinstance would never match
+    engine = st.session_state.get('sql_engine')
+    if engine is None or engine.name != engine_class.name:
+        if engine is not None:
+            engine.close()
+        engine = engine_class()
+        st.session_state.sql_engine = engine
+        get_table_manager().track_engine(current_session_id(), engine)
+    return engine
+
+def get_sql_dialect() -> str:
+    """SQL dialect of the selected execution backend"""
+    engine_name = st.session_state.get('sql_engine_name', SQLiteEngine.name)
+    return SQL_ENGINES.get(engine_name, SQLiteEngine).dialect
+
+def close_sql_engine():
+    """Close this session's SQL engine if one is open"""
+    engine = st.session_state.pop('sql_engine', None)
+    if engine is not None:
+        engine.close()
+
+# Query Result Cache
+SQL_KEYWORDS = frozenset("""
+    select from where group by order having limit offset join inner left right full outer cross on using as
+    and or not in is null like ilike between case when then else end distinct union all intersect except
+    with asc desc nulls first last cast exists true false over partition
+""".split())
+
+# Quoted literals and identifiers, comments, words and numbers, whitespace, then any other single character
+SQL_TOKEN_PATTERN = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|`[^`]*`|--[^\n]*|/\*.*?\*/|[\w$]+|\s+|.""", re.DOTALL
+)
+# Words that end a SELECT list at its own nesting depth
+SELECT_LIST_END = frozenset({
+    'from', 'where', 'group', 'having', 'window', 'order', 'limit', 'offset', 'union', 'intersect', 'except'
+})
+
+def sql_token_kind(token: str) -> str:
+    if token[0] in '\'"`':
+        return 'quoted'
+    if token.isspace() or token.startswith('--') or token.startswith('/*'):
+        return 'space'
+    if token[0].isalnum() or token[0] in '_$':
+        return 'word'
+    return 'symbol'
+
+def normalize_select_item(tokens: List[str], top_level: bool) -> str:
+    """
+    One SELECT list item for an engine that names expression columns by their exact text. An
+    aliased expression is named by its alias and, in the outermost query, a column reference by
+    its source column, so both are normalized; any other expression is kept as written.
+    """
+    significant = [token for token in tokens if sql_token_kind(token) != 'space']
+    # Subqueries and CTEs name a column reference as written, and SELECT * passes that name on
+    if top_level and re.fullmatch(r'(?:[\w$]+ \. )*(?:[\w$]+|\*)', ' '.join(significant)):
+        return normalize_sql(''.join(tokens), verbatim_select_lists=True)
+    as_positions = [i for i, token in enumerate(tokens) if token.lower() == 'as']
+    if as_positions:
+        position = as_positions[-1]
+        alias = [token for token in tokens[position + 1:] if sql_token_kind(token) != 'space']
+        expression = tokens[:position]
+        if len(alias) == 1 and sql_token_kind(alias[0]) in ('word', 'quoted') and expression.count('(') == expression.count(')'):
+            return normalize_sql(''.join(expression), verbatim_select_lists=True) + ' as ' + alias[0]
+    return ''.join(tokens).strip()
+
+def normalize_select_list(tokens: List[str], top_level: bool) -> str:
+    items, item, depth = [], [], 0
+    for token in tokens:
+        depth += token == '('
+        depth -= token == ')'
+        if token == ',' and depth == 0:
+            items.append(item)
+            item = []
+        else:
+            item.append(token)
+    items.append(item)
+    prefix = ''
+    leading = next((i for i, token in enumerate(items[0]) if sql_token_kind(token) != 'space'), None)
+    if leading is not None and items[0][leading].lower() in ('distinct', 'all'):
+        prefix = items[0][leading].lower() + ' '
+        items[0] = items[0][leading + 1:]
+    return prefix + ','.join(normalize_select_item(item, top_level) for item in items)
+
+def normalize_sql(sql_query: str, verbatim_select_lists: bool = False) -> str:
+    """
+    Collapse whitespace and lowercase keywords and function names outside of quoted literals and
+    identifiers; comments are dropped. Other words keep their case, and so does any word after AS:
+    engines return aliases as written. With verbatim_select_lists, for engines such as SQLite that
+    name expression columns by their exact text, every other word outside quotes is lowercased,
+    since unquoted identifiers are case-insensitive, and SELECT list items go through
+    normalize_select_item.
+    """
+    tokens = SQL_TOKEN_PATTERN.findall(sql_query.strip().rstrip(';'))
+    normalized = []
+    # Whether the last emitted token was a word, and whether whitespace followed it
+    after_word, pending_space = False, False
+    previous_word = ''
+    depth = 0
+    # Nesting depth and tokens of the SELECT list being collected, if any
+    select_depth, select_tokens = None, []
+
+    def emit(text: str, is_word: bool):
+        nonlocal after_word, pending_space
+        # Whitespace only separates words; around symbols it does not change the query
+        if pending_space and after_word and is_word:
+            normalized.append(' ')
+        normalized.append(text)
+        after_word, pending_space = is_word, False
+
+    for i, token in enumerate(tokens):
+        kind = sql_token_kind(token)
+        if select_depth is not None:
+            if not (depth == select_depth and ((kind == 'word' and token.lower() in SELECT_LIST_END) or token in (')', ';'))):
+                depth += token == '('
+                depth -= token == ')'
+                select_tokens.append(token)
+                continue
+            pending_space = True
+            emit(normalize_select_list(select_tokens, select_depth == 0), True)
+            pending_space = True
+            select_depth, select_tokens = None, []
+
+        if kind == 'space':
+            pending_space = True
+        elif kind == 'quoted':
+            emit(token, True)
+            previous_word = ''
+        elif kind == 'word':
+            following = next((t for t in tokens[i + 1:] if sql_token_kind(t) != 'space'), '')
+            lowered = token.lower()
+            if verbatim_select_lists or (previous_word != 'as' and (lowered in SQL_KEYWORDS or following == '(')):
+                token = lowered
+            emit(token, True)
+            previous_word = lowered
+            if verbatim_select_lists and lowered == 'select':
+                select_depth = depth
+        else:
+            depth += token == '('
+            depth -= token == ')'
+            emit(token, False)
+            previous_word = ''
+    if select_depth is not None:
+        pending_space = True
+        emit(normalize_select_list(select_tokens, select_depth == 0), True)
+    return ''.join(normalized)
+
+def referenced_tables(sql_query: str, dataframes_dict: Dict[str, pd.DataFrame]) -> List[str]:
+    """Names of the tables a query mentions, in sorted order, found without loading any table"""
+    lowered_sql = sql_query.lower()
+    return [
+        table_name for table_name in sorted(dataframes_dict)
+        if re.search(rf'(?<![\w$]){re.escape(table_name.lower())}(?![\w$])', lowered_sql)
+    ]
+
+def build_result_cache_key(sql_query: str, dataframes_dict: Dict[str, pd.DataFrame], engine) -> str:
+    """Cache key from the SQL, the engine and the content of every referenced table"""
+    # SQLite names unaliased expression columns by their exact text, so its SELECT lists are kept as written
+    sql_key = normalize_sql(sql_query, verbatim_select_lists=not getattr(engine, 'normalizes_column_names', False))
+    hasher = hashlib.sha1(f"{engine.name}\n{sql_key}".encode('utf-8'))
+    for table_name in referenced_tables(sql_query, dataframes_dict):
+        hasher.update(f"\n{table_name}:{table_fingerprint(dataframes_dict, table_name)}".encode('utf-8'))
+    return hasher.hexdigest()
+
+class QueryResultCache:
+    """Bounded LRU cache of query results shared by all sessions"""
+    def __init__(self, max_entries: int = 32, max_bytes: int = 512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, result: pd.DataFrame, table_versions=()):
+        """Cache a result along with the versions of the tables it was computed from"""
+        size = int(result.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (result, size, frozenset(table_versions))
+            self.total_bytes += size
+            while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+
+    def release_table(self, df: pd.DataFrame, table_digest: str):
+        """Drop results computed from a table the table manager spilled"""
+        with self.lock:
+            for key, (_, size, table_versions) in list(self.entries.items()):
+                if table_digest in table_versions:
+                    del self.entries[key]
+                    self.total_bytes -= size
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
 
-    # 1. Enhanced Bar Chart with animations
-    if len(categorical_cols) >= 1 and len(numeric_cols) >= 1:
-        fig_bar = px.bar(
-            data,
-            x=categorical_cols[0],
-            y=numeric_cols[0],
-            title=f"📊 Interactive Bar Chart: {categorical_cols[0]} vs {numeric_cols[0]}",
-            color=categorical_cols[0] if len(data) < 50 else None,
-            color_discrete_sequence=px.colors.qualitative.Set3,
-            hover_data=numeric_cols[:3] if len(numeric_cols) > 1 else None
-        )
+@st.cache_resource
+def get_result_cache():
+    return QueryResultCache()
+
+# Streamed Result Exports
+EXPORT_CHUNK_ROWS = 100000
+EXPORT_CACHE_MB = int(os.environ.get('NLP_SQL_EXPORT_CACHE_MB', 1024))
+EXCEL_MAX_ROWS = 1048575
+
+# gzip applies to the text formats; Parquet and Arrow IPC compress their column buffers with zstd
+EXPORT_FORMATS = {
+    'csv': {'extension': '.csv', 'mime': 'text/csv', 'gzip': True},
+    'xlsx': {'extension': '.xlsx', 'mime': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'gzip': False},
+    'json': {'extension': '.json', 'mime': 'application/json', 'gzip': True},
+    'parquet': {'extension': '.parquet', 'mime': 'application/vnd.apache.parquet', 'gzip': False},
+    'arrow': {'extension': '.arrow', 'mime': 'application/vnd.apache.arrow.file', 'gzip': False},
+}
+
+def open_export_text(file_path: str, compress: bool):
+    if compress:
+        return gzip.open(file_path, 'wt', compresslevel=6, encoding='utf-8', newline='')
+    return open(file_path, 'w', encoding='utf-8', newline='')
+
+def write_csv_export(cursor, file_path: str, compress: bool, columns: Optional[List[str]], limit: Optional[int]):
+    with open_export_text(file_path, compress) as export_file:
+        for i, chunk in enumerate(cursor.iter_chunks(EXPORT_CHUNK_ROWS, columns, limit)):
+            chunk.to_csv(export_file, header=i == 0, index=False)
+
+def write_json_export(cursor, file_path: str, compress: bool, columns: Optional[List[str]], limit: Optional[int]):
+    """A JSON array of records, written a chunk of records at a time"""
+    with open_export_text(file_path, compress) as export_file:
+        export_file.write('[')
+        first = True
+        for chunk in cursor.iter_chunks(EXPORT_CHUNK_ROWS, columns, limit):
+            # Dates as the same text the CSV export writes, not epoch milliseconds
+            date_columns = chunk.select_dtypes(include=['datetime', 'datetimetz']).columns
+            if len(date_columns):
+                chunk = chunk.astype({col: str for col in date_columns})
+            records = chunk.to_json(orient='records', indent=2)[1:-1].strip('\n')
+            if records:
+                export_file.write(('\n' if first else ',\n') + records)
+                first = False
+        export_file.write('\n]')
+
+def write_excel_export(cursor, file_path: str, compress: bool, columns: Optional[List[str]], limit: Optional[int]):
+    """
+    Workbook written row by row with openpyxl's write-only mode, plus a summary sheet.
+    Sheets stop at Excel's row limit.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet('Query_Results')
+    limit = EXCEL_MAX_ROWS if limit is None else min(limit, EXCEL_MAX_ROWS)
+    for i, chunk in enumerate(cursor.iter_chunks(EXPORT_CHUNK_ROWS, columns, limit)):
+        if i == 0:
+            sheet.append([str(col) for col in chunk.columns])
+        cells = chunk.astype(object).where(chunk.notna(), None)
+        for position in np.flatnonzero((chunk.dtypes == object).to_numpy()):
+            column = cells.iloc[:, position]
+            if column.map(lambda value: isinstance(value, (list, dict, np.ndarray))).any():
+                # Cells hold scalars, so lists and structs are written as their text
+                cells.isetitem(position, column.map(lambda value: value if value is None else str(value)))
+        for row in cells.itertuples(index=False, name=None):
+            sheet.append(row)
+
+    # Add summary sheet if numeric data exists; disk-backed results summarize their preview
+    summary_source = getattr(cursor, 'frame', cursor.preview)
+    numeric_data = summary_source[columns] if columns else summary_source
+    numeric_data = numeric_data.select_dtypes(include=[np.number])
+    if not numeric_data.empty:
+        summary = numeric_data.describe()
+        summary_sheet = workbook.create_sheet('Summary_Statistics')
+        summary_sheet.append([''] + [str(col) for col in summary.columns])
+        for stat, values in summary.iterrows():
+            summary_sheet.append([stat] + [None if pd.isna(value) else float(value) for value in values])
+    workbook.save(file_path)
+
+def write_parquet_export(cursor, file_path: str, compress: bool, columns: Optional[List[str]], limit: Optional[int]):
+    """Parquet written a row group per chunk, so readers can skip row groups by their statistics"""
+    with pq.ParquetWriter(file_path, cursor.arrow_schema(columns), compression='zstd') as writer:
+        for batch in cursor.iter_record_batches(EXPORT_CHUNK_ROWS, columns, limit):
+            writer.write_table(pa.Table.from_batches([batch]))
+
+def write_arrow_export(cursor, file_path: str, compress: bool, columns: Optional[List[str]], limit: Optional[int]):
+    """Arrow IPC file (Feather v2), readable memory-mapped without a parse step"""
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_file(file_path, cursor.arrow_schema(columns), options=options) as writer:
+        for batch in cursor.iter_record_batches(EXPORT_CHUNK_ROWS, columns, limit):
+            writer.write_batch(batch)
+
+EXPORT_WRITERS = {
+    'csv': write_csv_export, 'xlsx': write_excel_export, 'json': write_json_export,
+    'parquet': write_parquet_export, 'arrow': write_arrow_export,
+}
+
+class ExportCache:
+    """Process-wide LRU of generated export files, keyed by result and export options; evicted files are deleted"""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.directory = tempfile.mkdtemp(prefix='nlp_sql_exports_')
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get_or_write(self, key: Tuple, write) -> str:
+        """Path of the export for key, calling write(path) to generate it on a miss"""
+        with self.lock:
+            if key in self.entries and os.path.exists(self.entries[key][0]):
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+
+        file_path = os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest())
+        partial_path = f"{file_path}.{uuid.uuid4().hex}.partial"
+        try:
+            write(partial_path)
+            os.replace(partial_path, file_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        size = os.path.getsize(file_path)
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[1]
+            self.entries[key] = (file_path, size)
+            self.total_bytes += size
+            while len(self.entries) > 1 and self.total_bytes > self.max_bytes:
+                _, (evicted_path, evicted_size) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                if os.path.exists(evicted_path):
+                    os.remove(evicted_path)
+        return file_path
 
-        fig_bar.update_layout(
-            title_font_size=16,
-            title_x=0.5,
-            showlegend=len(data) < 20,
-            hovermode='x unified',
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif")
+@st.cache_resource
+def get_export_cache():
+    export_cache = ExportCache(EXPORT_CACHE_MB * 1024 * 1024)
+    get_table_manager().protect(export_cache.directory)
+    return export_cache
+
+def export_file_name(export_format: str, compress: bool, prefix: str = 'query_results') -> str:
+    extension = EXPORT_FORMATS[export_format]['extension']
+    if compress and EXPORT_FORMATS[export_format]['gzip']:
+        extension += '.gz'
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}"
+
+def export_generator(cursor, export_format: str, compress: bool = False, columns: Optional[List[str]] = None, limit: Optional[int] = None):
+    """
+    Zero-argument callable for st.download_button that writes the export on click. It runs
+    outside the script run, so the cache is resolved here; the result key, which may hash the
+    whole result, is computed only on click.
+    """
+    export_cache = get_export_cache()
+    compress = compress and EXPORT_FORMATS[export_format]['gzip']
+
+    def generate():
+        key = (cursor.result_key(), export_format, compress, tuple(columns) if columns else None, limit)
+        file_path = export_cache.get_or_write(
+            key, lambda path: EXPORT_WRITERS[export_format](cursor, path, compress, columns, limit)
         )
+        with open(file_path, 'rb') as export_file:
+            return export_file.read()
+
+    return generate
+
+# Enhanced SQL Execution
+def get_result_cursor(result_data: pd.DataFrame):
+    """The cursor behind the displayed result; results restored from a saved session get a fresh one"""
+    cursor = st.session_state.get('query_cursor')
+    if cursor is None or cursor.preview is not result_data:
+        cursor = FrameResult(result_data)
+        st.session_state.query_cursor = cursor
+    return cursor
 
-        fig_bar.update_traces(
-            hovertemplate='<b>%{x}</b><br>%{y:,.0f}<extra></extra>',
-            marker_line_width=1,
-            marker_line_color='white'
+def execute_sql_query(sql_query, dataframes_dict):
+    try:
+        engine = get_sql_engine()
+        if getattr(engine, 'out_of_core', False):
+            # The full result stays on disk; the session holds a bounded preview and a cursor for paging
+            cursor = engine.execute_to_disk(sql_query, dataframes_dict)
+            cursor.preview = cursor.head(RESULT_PREVIEW_ROWS)
+            st.session_state.query_cursor = cursor
+            st.session_state.setdefault('memory_compaction', {}).pop('result', None)
+            return cursor.preview
+
+        result_cache = get_result_cache()
+        cache_key = build_result_cache_key(sql_query, dataframes_dict, engine)
+
+        result = result_cache.get(cache_key)
+        if result is None:
+            raw_result = engine.execute(sql_query, dataframes_dict)
+            # Results are displayed and exported, not queried again, so dates are parsed and integers narrowed here only
+            result = compact_dataframe(raw_result, parse_dates=True, narrow_integers=True)
+            record_compaction(result, int(raw_result.memory_usage(deep=True).sum()))
+            del raw_result
+            result_cache.put(cache_key, result, [
+                table_fingerprint(dataframes_dict, table_name) for table_name in referenced_tables(sql_query, dataframes_dict)
+            ])
+        st.session_state.query_cursor = FrameResult(result)
+        st.session_state.setdefault('memory_compaction', {})['result'] = get_compaction(result)
+        return result
+    except Exception as e:
+        st.error(f"Error executing SQL query: {str(e)}")
+        return None
+
+# Chart Data Preparation
+CHART_POINT_LIMIT = int(os.environ.get('NLP_SQL_CHART_POINT_LIMIT', 5000))
+WEBGL_POINT_THRESHOLD = 1000
+SCATTER_DENSITY_BINS = 120
+
+def as_float_array(series: pd.Series) -> np.ndarray:
+    """Numeric or datetime values as floats, with missing values as NaN"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        values = series.to_numpy(dtype='datetime64[ns]')
+        return np.where(np.isnat(values), np.nan, values.astype(np.int64).astype(float))
+    return series.to_numpy(dtype=float, na_value=np.nan)
+
+def scatter_trace_class(points: int):
+    """WebGL traces above WEBGL_POINT_THRESHOLD points; SVG traces stay sharper for small charts"""
+    return go.Scattergl if points > WEBGL_POINT_THRESHOLD else go.Scatter
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keep the first and last points and, from each bucket
+    in between, the point forming the largest triangle with the previous pick and the next
+    bucket's average. x must be sorted.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Next-bucket averages do not depend on earlier picks, so they are computed up front
+    next_edges = np.append(edges[1:], n)
+    next_x = np.add.reduceat(x, next_edges[:-1]) / np.diff(np.append(next_edges[:-1], n))
+    next_y = np.add.reduceat(y, next_edges[:-1]) / np.diff(np.append(next_edges[:-1], n))
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        area = np.abs(
+            (x[previous] - next_x[i]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y[i] - y[previous])
         )
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+def downsample_series(x: pd.Series, y: pd.Series, limit: int = CHART_POINT_LIMIT) -> Tuple[pd.Series, pd.Series, int]:
+    """Points of a line chart reduced to at most limit by LTTB, and how many were dropped"""
+    x_values, y_values = as_float_array(x), as_float_array(y)
+    keep = ~(np.isnan(x_values) | np.isnan(y_values))
+    positions = np.flatnonzero(keep)
+    positions = positions[np.argsort(x_values[positions], kind='stable')]
+    selected = positions[lttb_indices(x_values[positions], y_values[positions], limit)]
+    return x.iloc[selected], y.iloc[selected], len(x) - len(selected)
+
+def box_statistics(values: pd.Series, groups: Optional[pd.Series] = None) -> pd.DataFrame:
+    """
+    Quartiles, Tukey fences and outlier counts per group, computed in pandas so a box plot
+    needs five numbers per box instead of every row
+    """
+    frame = pd.DataFrame({'value': as_float_array(values)})
+    frame['group'] = groups.to_numpy() if groups is not None else values.name
+    frame = frame.dropna()
+    if frame.empty:
+        return pd.DataFrame(columns=['q1', 'median', 'q3', 'lowerfence', 'upperfence', 'mean', 'outliers'])
+    grouped = frame.groupby('group', sort=False, observed=True)['value']
+
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    iqr = stats['q3'] - stats['q1']
+    low, high = stats['q1'] - 1.5 * iqr, stats['q3'] + 1.5 * iqr
+    inside = frame['value'].between(frame['group'].map(low), frame['group'].map(high))
+    stats['lowerfence'] = frame[inside].groupby('group', sort=False, observed=True)['value'].min()
+    stats['upperfence'] = frame[inside].groupby('group', sort=False, observed=True)['value'].max()
+    stats['mean'] = grouped.mean()
+    stats['outliers'] = (~inside).groupby(frame['group'], sort=False, observed=True).sum()
+    return stats
+
+def precomputed_box(stats: pd.DataFrame, name: str, color: Optional[str] = None, horizontal: bool = False) -> go.Box:
+    """Box trace drawn from box_statistics output; outliers are counted, not plotted"""
+    positions = {('y' if horizontal else 'x'): [str(group) for group in stats.index]}
+    return go.Box(
+        q1=stats['q1'].tolist(), median=stats['median'].tolist(), q3=stats['q3'].tolist(),
+        lowerfence=stats['lowerfence'].tolist(), upperfence=stats['upperfence'].tolist(),
+        mean=stats['mean'].tolist(), name=name, marker_color=color,
+        orientation='h' if horizontal else 'v', boxpoints=False, **positions
+    )
+
+def summarized_box_figure(values: pd.Series, groups: Optional[pd.Series] = None) -> Tuple[go.Figure, int]:
+    """Box plot with one precomputed box per group, and the number of outliers left out of it"""
+    box_stats = box_statistics(values, groups)
+    fig_box = go.Figure()
+    palette = px.colors.qualitative.Set3
+    for i, (group, group_stats) in enumerate(box_stats.groupby(level=0, sort=False)):
+        fig_box.add_trace(precomputed_box(group_stats, str(group), palette[i % len(palette)]))
+    return fig_box, int(box_stats['outliers'].sum())
+
+def binned_histogram_figure(values: pd.Series, bins: int = 30) -> go.Figure:
+    """Histogram binned by np.histogram under a precomputed marginal box, so it sends one bar per bin"""
+    float_values = as_float_array(values)
+    counts, edges = np.histogram(float_values[np.isfinite(float_values)], bins=bins)
+    fig_hist = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    fig_hist.add_trace(precomputed_box(box_statistics(values), str(values.name), '#667eea', horizontal=True), row=1, col=1)
+    fig_hist.add_trace(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+        marker_color='#667eea', name=str(values.name),
+        hovertemplate='%{x:,.2f}<br>Count: %{y:,}<extra></extra>'
+    ), row=2, col=1)
+    return fig_hist
+
+def downsampling_note(shown: int, total: int, method: str) -> str:
+    """Subtitle reporting how much of the result a prepared chart draws"""
+    return f"<br><sup>{method}: {shown:,} of {total:,} points drawn, {total - shown:,} dropped</sup>"
 
-        charts.append(("📊 Interactive Bar Chart", fig_bar))
-
-    # 2. Advanced Line Chart with multiple series
-    if len(numeric_cols) >= 2:
-        fig_line = go.Figure()
-
-        for i, col in enumerate(numeric_cols[:3]):  # Limit to 3 series
-            fig_line.add_trace(go.Scatter(
-                x=data.index if not datetime_cols else data[datetime_cols[0]],
-                y=data[col],
-                mode='lines+markers',
-                name=col,
-                line=dict(width=3),
-                marker=dict(size=6),
-                hovertemplate=f'<b>{col}</b><br>Value: %{{y:,.2f}}<extra></extra>'
+# Dynamic Advanced Visualization Engine
+def prepare_chart_data(data: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
+    """
+    Group a result's columns by inferred semantic type for charting, parsing date text on a copy
+    so the result itself is never modified
+    """
+    semantic_types = get_semantic_types(data)
+    columns = {
+        'numeric': columns_of_type(semantic_types, 'numeric'),
+        'categorical': columns_of_type(semantic_types, 'categorical'),
+        'datetime': columns_of_type(semantic_types, 'datetime')
+    }
+    converted = {col: parse_date_text(data[col], fmt) for col, fmt in semantic_types['datetime_formats'].items()}
+    return data.assign(**converted) if converted else data, columns
+
+def build_bar_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Bar chart of the first numeric column per category"""
+    numeric_cols = columns['numeric']
+    categorical_cols = columns['categorical']
+    large = len(data) > CHART_POINT_LIMIT
+
+    bar_title = f"📊 Interactive Bar Chart: {categorical_cols[0]} vs {numeric_cols[0]}"
+    if large:
+        # Stacked per-row bars draw the group sum, so one bar per category looks the same
+        bar_data = data.groupby(categorical_cols[0], sort=False, observed=True)[numeric_cols[0]].sum().reset_index()
+        bar_title += downsampling_note(len(bar_data), len(data), "Summed per category")
+    else:
+        bar_data = data
+    fig_bar = px.bar(
+        bar_data,
+        x=categorical_cols[0],
+        y=numeric_cols[0],
+        title=bar_title,
+        color=categorical_cols[0] if len(bar_data) < 50 else None,
+        color_discrete_sequence=px.colors.qualitative.Set3,
+        hover_data=numeric_cols[:3] if len(numeric_cols) > 1 and not large else None
+    )
+
+    fig_bar.update_layout(
+        title_font_size=16,
+        title_x=0.5,
+        showlegend=len(bar_data) < 20,
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif")
+    )
+
+    fig_bar.update_traces(
+        hovertemplate='<b>%{x}</b><br>%{y:,.0f}<extra></extra>',
+        marker_line_width=1,
+        marker_line_color='white'
+    )
+
+    return fig_bar
+
+def build_line_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Line chart of up to three numeric series"""
+    numeric_cols = columns['numeric']
+    datetime_cols = columns['datetime']
+    large = len(data) > CHART_POINT_LIMIT
+
+    fig_line = go.Figure()
+    line_x = pd.Series(data.index, index=data.index) if not datetime_cols else data[datetime_cols[0]]
+    line_title = f"📈 Multi-Series Line Chart"
+    line_dropped = 0
+
+    for i, col in enumerate(numeric_cols[:3]):  # Limit to 3 series
+        x_values, y_values = line_x, data[col]
+        if large:
+            x_values, y_values, dropped = downsample_series(line_x, data[col])
+            line_dropped += dropped
+        fig_line.add_trace(scatter_trace_class(len(y_values))(
+            x=x_values,
+            y=y_values,
+            mode='lines+markers' if not large else 'lines',
+            name=col,
+            line=dict(width=3),
+            marker=dict(size=6),
+            hovertemplate=f'<b>{col}</b><br>Value: %{{y:,.2f}}<extra></extra>'
+        ))
+
+    if large:
+        series_count = len(numeric_cols[:3])
+        line_title += downsampling_note(len(data) * series_count - line_dropped, len(data) * series_count, "LTTB downsampled")
+
+    fig_line.update_layout(
+        title=line_title,
+        title_x=0.5,
+        title_font_size=16,
+        hovermode='x unified',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif"),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        )
+    )
+
+    return fig_line
+
+def build_scatter_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Scatter plot of the first two numeric columns with a regression line"""
+    numeric_cols = columns['numeric']
+    categorical_cols = columns['categorical']
+    large = len(data) > CHART_POINT_LIMIT
+
+    if large:
+        # Density grid of counts with a least-squares line fitted on every point
+        x_values, y_values = as_float_array(data[numeric_cols[0]]), as_float_array(data[numeric_cols[1]])
+        finite = np.isfinite(x_values) & np.isfinite(y_values)
+        x_values, y_values = x_values[finite], y_values[finite]
+        counts, x_edges, y_edges = np.histogram2d(x_values, y_values, bins=SCATTER_DENSITY_BINS)
+        occupied = int((counts > 0).sum())
+        fig_scatter = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.where(counts > 0, counts, np.nan).T,
+            colorscale='Viridis',
+            colorbar=dict(title="Points"),
+            hovertemplate=f'{numeric_cols[0]}: %{{x:,.2f}}<br>{numeric_cols[1]}: %{{y:,.2f}}<br>Points: %{{z:,}}<extra></extra>'
+        ))
+        if options.get('trendline', True) and len(x_values) > 10 and np.ptp(x_values) > 0:
+            slope, intercept = np.polyfit(x_values, y_values, 1)
+            fig_scatter.add_trace(go.Scatter(
+                x=x_edges[[0, -1]], y=intercept + slope * x_edges[[0, -1]],
+                mode='lines', name="OLS trendline", line=dict(color='#e45756', width=2)
             ))
-
-        fig_line.update_layout(
-            title=f"📈 Multi-Series Line Chart",
+        fig_scatter.update_layout(
+            title=f"🔍 Advanced Scatter Plot: {numeric_cols[0]} vs {numeric_cols[1]}"
+                  + downsampling_note(occupied, len(data), "Density-binned"),
+            xaxis_title=numeric_cols[0],
+            yaxis_title=numeric_cols[1],
             title_x=0.5,
             title_font_size=16,
-            hovermode='x unified',
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif"),
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
-            )
+            font=dict(family="Inter, sans-serif")
         )
 
-        charts.append(("📈 Multi-Series Line Chart", fig_line))
-
-    # 3. Enhanced Scatter Plot with regression line
-    if len(numeric_cols) >= 2:
+        return fig_scatter
+    else:
         fig_scatter = px.scatter(
             data,
             x=numeric_cols[0],
@@ -597,8 +2463,9 @@ def create_dynamic_visualizations(data, query_description, user_preferences=None
             color=categorical_cols[0] if categorical_cols else None,
             size=numeric_cols[2] if len(numeric_cols) > 2 else None,
             hover_data=categorical_cols[:2] if categorical_cols else None,
-            trendline="ols" if len(data) > 10 else None,
-            color_discrete_sequence=px.colors.qualitative.Set3
+            trendline="ols" if options.get('trendline', True) and len(data) > 10 else None,
+            color_discrete_sequence=px.colors.qualitative.Set3,
+            render_mode='webgl' if len(data) > WEBGL_POINT_THRESHOLD else 'auto'
         )
 
         fig_scatter.update_layout(
@@ -609,115 +2476,1313 @@ def create_dynamic_visualizations(data, query_description, user_preferences=None
             font=dict(family="Inter, sans-serif")
         )
 
-        charts.append(("🔍 Advanced Scatter Plot", fig_scatter))
+        return fig_scatter
+
+def build_pie_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Pie chart of the first categorical column"""
+    categorical_cols = columns['categorical']
+
+    value_counts, overcount = top_values(data[categorical_cols[0]])
+    pie_title = f"🥧 Interactive Pie Chart: {categorical_cols[0]} Distribution"
+    if overcount is not None:
+        pie_title += f"<br><sup>Space-Saving estimates: each count may be over by up to {overcount:,}</sup>"
+    fig_pie = px.pie(
+        values=value_counts.values,
+        names=value_counts.index,
+        title=pie_title,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+
+    fig_pie.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
+    )
+
+    fig_pie.update_layout(
+        title_x=0.5,
+        title_font_size=16,
+        font=dict(family="Inter, sans-serif")
+    )
+
+    return fig_pie
+
+def build_box_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Box plot of the first numeric column per category"""
+    numeric_cols = columns['numeric']
+    categorical_cols = columns['categorical']
+
+    groups = data[categorical_cols[0]] if categorical_cols else None
+    fig_box, outliers = summarized_box_figure(data[numeric_cols[0]], groups)
+    fig_box.update_layout(
+        title=f"📦 Distribution Analysis: {numeric_cols[0]}<br><sup>Precomputed quartiles; {outliers:,} outliers not drawn</sup>",
+        yaxis_title=numeric_cols[0],
+        showlegend=bool(categorical_cols),
+        title_x=0.5,
+        title_font_size=16,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif")
+    )
+
+    return fig_box
+
+def build_histogram_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Histogram of the first numeric column with a marginal box"""
+    numeric_cols = columns['numeric']
+
+    fig_hist = binned_histogram_figure(data[numeric_cols[0]], options.get('bins', 30))
+    fig_hist.update_layout(
+        title=f"📊 Histogram: {numeric_cols[0]} Distribution<br><sup>Binned in NumPy from {len(data):,} rows</sup>",
+        showlegend=False,
+        bargap=0,
+        title_x=0.5,
+        title_font_size=16,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif")
+    )
+
+    return fig_hist
+
+def build_correlation_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Correlation heatmap of the numeric columns"""
+    numeric_cols = columns['numeric']
+
+    corr_matrix = data[numeric_cols].corr()
+
+    fig_heatmap = px.imshow(
+        corr_matrix,
+        title="🔥 Correlation Heatmap",
+        color_continuous_scale="RdBu",
+        aspect="auto",
+        text_auto=True
+    )
+
+    fig_heatmap.update_layout(
+        title_x=0.5,
+        title_font_size=16,
+        font=dict(family="Inter, sans-serif")
+    )
+
+    return fig_heatmap
+
+def build_time_series_chart(data: pd.DataFrame, columns: Dict[str, List[str]], options: Dict[str, Any]) -> go.Figure:
+    """Time series of the first numeric column"""
+    numeric_cols = columns['numeric']
+    datetime_cols = columns['datetime']
+    large = len(data) > CHART_POINT_LIMIT
+
+    time_title = f"⏰ Time Series: {numeric_cols[0]} over {datetime_cols[0]}"
+    if large:
+        time_x, time_y, dropped = downsample_series(data[datetime_cols[0]], data[numeric_cols[0]])
+        time_data = pd.DataFrame({datetime_cols[0]: time_x, numeric_cols[0]: time_y})
+        time_title += downsampling_note(len(time_data), len(data), "LTTB downsampled")
+    else:
+        time_data = data
+    fig_time = px.line(
+        time_data,
+        x=datetime_cols[0],
+        y=numeric_cols[0],
+        title=time_title,
+        markers=not large,
+        render_mode='webgl' if len(time_data) > WEBGL_POINT_THRESHOLD else 'auto'
+    )
+
+    fig_time.update_layout(
+        title_x=0.5,
+        title_font_size=16,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family="Inter, sans-serif")
+    )
+
+    return fig_time
+
+# Charts in display order: name, whether the result's columns support it, and its builder
+CHART_TYPES = [
+    ("📊 Interactive Bar Chart", lambda columns: columns['categorical'] and columns['numeric'], build_bar_chart),
+    ("📈 Multi-Series Line Chart", lambda columns: len(columns['numeric']) >= 2, build_line_chart),
+    ("🔍 Advanced Scatter Plot", lambda columns: len(columns['numeric']) >= 2, build_scatter_chart),
+    ("🥧 Interactive Pie Chart", lambda columns: columns['categorical'], build_pie_chart),
+    ("📦 Distribution Analysis", lambda columns: columns['numeric'], build_box_chart),
+    ("📊 Histogram Analysis", lambda columns: columns['numeric'], build_histogram_chart),
+    ("🔥 Correlation Heatmap", lambda columns: len(columns['numeric']) >= 2, build_correlation_chart),
+    ("⏰ Time Series Analysis", lambda columns: columns['datetime'] and columns['numeric'], build_time_series_chart),
+]
 
-    # 4. Interactive Pie Chart
-    if len(categorical_cols) >= 1:
-        value_counts = data[categorical_cols[0]].value_counts().head(10)
-        fig_pie = px.pie(
-            values=value_counts.values,
-            names=value_counts.index,
-            title=f"🥧 Interactive Pie Chart: {categorical_cols[0]} Distribution",
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
-
-        fig_pie.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>Count: %{value}<br>Percentage: %{percent}<extra></extra>'
-        )
+@st.cache_resource
+def get_figure_cache():
+    """Process-wide LRU of prepared chart data and built figures, keyed by result fingerprint"""
+    return ProfileCache(max_entries=64)
 
-        fig_pie.update_layout(
-            title_x=0.5,
-            title_font_size=16,
-            font=dict(family="Inter, sans-serif")
-        )
+def get_chart_data(data: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, List[str]]]:
+    return get_figure_cache().get_or_compute((get_table_fingerprint(data), 'chart_data'), lambda: prepare_chart_data(data))
 
-        charts.append(("🥧 Interactive Pie Chart", fig_pie))
+def available_charts(data: pd.DataFrame) -> List[str]:
+    """Names of the charts that suit a result, without building any of them"""
+    if data is None or data.empty:
+        return []
+    _, columns = get_chart_data(data)
+    return [name for name, supported, _ in CHART_TYPES if supported(columns)]
+
+def get_chart_figure(data: pd.DataFrame, chart_name: str, options: Optional[Dict[str, Any]] = None) -> go.Figure:
+    """
+    One chart for a result, built on first request. The key holds only that chart's own options,
+    so changing one chart's settings leaves the other cached figures in place.
+    """
+    options = options or {}
+    key = (get_table_fingerprint(data), f"chart:{chart_name}", tuple(sorted(options.items())))
+
+    def build():
+        chart_data, columns = get_chart_data(data)
+        builder = next(builder for name, _, builder in CHART_TYPES if name == chart_name)
+        return builder(chart_data, columns, options)
+
+    return get_figure_cache().get_or_compute(key, build)
+
+# Probabilistic Sketches
+SKETCH_ROW_THRESHOLD = int(os.environ.get('NLP_SQL_SKETCH_ROW_THRESHOLD', 200000))
+SKETCH_CHUNK_ROWS = 1000000
+
+def iter_value_hashes(series: pd.Series):
+    """Yield 64-bit hashes of a column's non-null values, one chunk at a time"""
+    non_null = series.dropna()
+    for start in range(0, len(non_null), SKETCH_CHUNK_ROWS):
+        chunk = non_null.iloc[start:start + SKETCH_CHUNK_ROWS]
+        yield pd.util.hash_pandas_object(chunk, index=False, categorize=False).to_numpy()
+
+class HyperLogLog:
+    """Mergeable distinct-count sketch with 2**precision one-byte registers"""
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def error_bound(self) -> float:
+        """Relative error at ~95% confidence (two standard errors)"""
+        return 2 * 1.04 / np.sqrt(self.m)
+
+    def add(self, hashes: np.ndarray):
+        suffix_bits = 64 - self.precision
+        buckets = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffixes = hashes & np.uint64((1 << suffix_bits) - 1)
+        # Suffixes fit a float64 mantissa exactly, so frexp's exponent is their bit length
+        ranks = (suffix_bits + 1 - np.frexp(suffixes.astype(np.float64))[1]).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def merge(self, other: 'HyperLogLog'):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate at small cardinalities
+            return int(round(self.m * np.log(self.m / zeros)))
+        return int(round(raw))
+
+class SpaceSaving:
+    """
+    Heavy-hitter summary of at most `capacity` counters. Each chunk is counted exactly, cut to its
+    top counters and merged as a Space-Saving summary (Agarwal et al.), so every value more
+    frequent than total/capacity is kept and no count is over by more than error_bound.
+    """
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.values = None
+        # Upper bound on the count of any value without a counter
+        self.floor = 0
+        self.total = 0
+
+    @property
+    def error_bound(self) -> int:
+        """Maximum overcount of any count; at most total / capacity"""
+        return int(self.floor)
+
+    def add(self, values: pd.Series):
+        """Count a chunk of non-null values"""
+        codes, uniques = pd.factorize(values)
+        counts = np.bincount(codes, minlength=len(uniques)).astype(np.int64)
+        uniques = np.asarray(uniques)
+        floor = 0
+        if len(uniques) > self.capacity:
+            # The chunk's own summary; only its kept values are hashed
+            order = np.argpartition(-counts, self.capacity)
+            floor = int(counts[order[self.capacity]])
+            order = order[:self.capacity]
+            counts, uniques = counts[order], uniques[order]
+        if self.values is None:
+            # Kept values share the column's dtype
+            self.values = uniques[:0]
+        self.total += len(values)
+        hashes = pd.util.hash_pandas_object(pd.Series(uniques, dtype=values.dtype), index=False, categorize=False).to_numpy()
+        self._merge(hashes, counts, uniques, floor)
+
+    def _merge(self, hashes: np.ndarray, counts: np.ndarray, values: np.ndarray, floor: int):
+        n_kept = len(self.hashes)
+        merged, first, inverse = np.unique(np.concatenate([self.hashes, hashes]), return_index=True, return_inverse=True)
+        merged_counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]), minlength=len(merged)).astype(np.int64)
+        # A value missing from one summary occurred there at most that summary's floor times
+        in_kept = np.bincount(inverse[:n_kept], minlength=len(merged)) > 0
+        in_added = np.bincount(inverse[n_kept:], minlength=len(merged)) > 0
+        merged_counts += np.where(in_kept, 0, self.floor) + np.where(in_added, 0, floor)
+        merged_values = np.concatenate([self.values, values])[first]
+        self.floor += floor
+        if len(merged) > self.capacity:
+            order = np.argpartition(-merged_counts, self.capacity)
+            self.floor = max(self.floor, int(merged_counts[order[self.capacity]]))
+            order = order[:self.capacity]
+            merged, merged_counts, merged_values = merged[order], merged_counts[order], merged_values[order]
+        self.hashes, self.counts, self.values = merged, merged_counts, merged_values
+
+    def top(self, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Values and counts of the k largest counters, largest first"""
+        order = np.argsort(-self.counts, kind='stable')[:k]
+        return self.values[order], self.counts[order]
+
+def sketchable(series: pd.Series) -> bool:
+    """Categoricals count exactly through their codes and Arrow strings through Arrow's hash kernels, faster than hashing"""
+    return not isinstance(series.dtype, pd.CategoricalDtype) and getattr(series.dtype, 'storage', None) != 'pyarrow'
+
+def should_sketch(series: pd.Series) -> bool:
+    return len(series) > SKETCH_ROW_THRESHOLD and sketchable(series)
+
+def approx_distinct(series: pd.Series) -> Tuple[int, float]:
+    """HyperLogLog distinct count of a column and its relative error bound"""
+    sketch = HyperLogLog()
+    for hashes in iter_value_hashes(series):
+        sketch.add(hashes)
+    return sketch.estimate(), sketch.error_bound
+
+def approx_top_k(series: pd.Series, k: int = 10) -> Tuple[pd.Series, Optional[int]]:
+    """
+    Most frequent values of a column with Space-Saving counts and their maximum overcount.
+    When that overcount could reorder the k-th value and the next one, as on flat columns,
+    the counts are taken exactly and the bound is None.
+    """
+    sketch = SpaceSaving()
+    non_null = series.dropna()
+    for start in range(0, len(non_null), SKETCH_CHUNK_ROWS):
+        sketch.add(non_null.iloc[start:start + SKETCH_CHUNK_ROWS])
+    values, counts = sketch.top(k + 1)
+    if sketch.error_bound:
+        next_count = counts[k] if len(counts) > k else sketch.error_bound
+        if len(counts) < k or counts[k - 1] - sketch.error_bound < next_count:
+            return series.value_counts().head(k), None
+    top = pd.Series(counts[:k], index=pd.Index(values[:k], name=series.name), name='count')
+    return top, sketch.error_bound
+
+def top_values(series: pd.Series, k: int = 10) -> Tuple[pd.Series, Optional[int]]:
+    """value_counts().head(k), sketched past the row threshold; the bound is None when exact"""
+    if should_sketch(series):
+        return approx_top_k(series, k)
+    return series.value_counts().head(k), None
+
+def distinct_counts(df: pd.DataFrame) -> Tuple[List[int], Optional[float]]:
+    """nunique() per column, sketched past the row threshold; the bound is None when exact"""
+    counts, bound = [], None
+    for col in df.columns:
+        if should_sketch(df[col]):
+            count, bound = approx_distinct(df[col])
+            counts.append(count)
+        else:
+            counts.append(int(df[col].nunique()))
+    return counts, bound
+
+# Join Key Discovery
+JOIN_SKETCH_SIZE = 256
+JOIN_MIN_SCORE = 0.5
+# A column at least this unique is treated as a key; two such columns are rarely a real join
+JOIN_UNIQUE_THRESHOLD = 0.95
+JOIN_ONE_TO_ONE_PENALTY = 0.5
+
+def disk_table_engine(*table_names: str):
+    """This session's out-of-core engine when any of the tables lives in its database, else None"""
+    engine = st.session_state.get('sql_engine')
+    disk_tables = st.session_state.get('disk_tables', {})
+    if getattr(engine, 'out_of_core', False) and any(name in disk_tables for name in table_names):
+        return engine
+    return None
+
+def table_version(dataframes_dict: Dict[str, pd.DataFrame], table_name: str) -> str:
+    """The ingested file's digest for a table on disk, whose frame is only a preview; the fingerprint otherwise"""
+    return st.session_state.get('disk_tables', {}).get(table_name) or table_fingerprint(dataframes_dict, table_name)
+
+def join_key_values(series: pd.Series) -> Optional[Tuple[str, pd.Series]]:
+    """Normalize a column for cross-table matching as ('int' | 'str', values); None if it cannot be a key"""
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+        return None
+    if pd.api.types.is_integer_dtype(series):
+        return 'int', series.dropna().astype('int64')
+    if pd.api.types.is_float_dtype(series):
+        non_null = series.dropna()
+        # Integer ids read as float because of missing values
+        if len(non_null) and (non_null % 1 == 0).all():
+            return 'int', non_null.astype('int64')
+        return None
+    return 'str', series.dropna().astype(str)
+
+def bottom_k_hashes(values: pd.Series, k: int = JOIN_SKETCH_SIZE) -> np.ndarray:
+    """The k smallest distinct value hashes (a KMV / bottom-k MinHash sketch), sorted"""
+    kept = np.empty(0, dtype=np.uint64)
+    for hashes in iter_value_hashes(values):
+        if len(kept) == k:
+            hashes = hashes[hashes < kept[-1]]
+        if len(hashes) > 4 * k:
+            # The 4k smallest hashes hold the k smallest distinct ones unless values repeat heavily
+            smallest = np.unique(np.partition(hashes, 4 * k)[:4 * k])
+            hashes = smallest if len(smallest) >= k else np.unique(hashes)
+        kept = np.unique(np.concatenate([kept, hashes]))[:k]
+    return kept
+
+def kmv_distinct(sketch: np.ndarray, k: int = JOIN_SKETCH_SIZE) -> float:
+    if len(sketch) < k:
+        return float(len(sketch))
+    return (k - 1) / (float(sketch[-1]) / 2.0 ** 64)
+
+def fingerprint_join_columns(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """Bottom-k sketch, distinct estimate and uniqueness of every column that could be a join key"""
+    fingerprints = {}
+    for col in df.columns:
+        normalized = join_key_values(df[col])
+        if normalized is None:
+            continue
+        kind, values = normalized
+        if len(values) == 0:
+            continue
+        sketch = bottom_k_hashes(values)
+        # Exact counts are cheap on small tables and avoid KMV noise on their keys
+        distinct = float(values.nunique()) if len(values) <= SKETCH_ROW_THRESHOLD else kmv_distinct(sketch)
+        fingerprints[col] = {
+            'kind': kind,
+            'sketch': sketch,
+            'distinct': distinct,
+            'uniqueness': min(distinct / len(values), 1.0)
+        }
+    return fingerprints
+
+def fingerprint_disk_join_columns(engine, table_name: str, preview: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    fingerprint_join_columns for a table in the out-of-core database. The engine counts each
+    column's values and streams its distinct values, which are sketched one chunk at a time, so
+    the fingerprint covers every row rather than the preview and distinct counts are exact.
+    """
+    candidates = [col for col in preview.columns if join_key_values(preview[col]) is not None]
+    if not candidates:
+        return {}
+    table = quote_identifier(table_name)
+    counts = engine.execute(
+        'SELECT {} FROM {}'.format(', '.join(f"COUNT({quote_identifier(col)}) AS n{i}" for i, col in enumerate(candidates)), table),
+        {}
+    )
+    fingerprints = {}
+    for i, col in enumerate(candidates):
+        value_count = int(counts[f'n{i}'].iloc[0])
+        if value_count == 0:
+            continue
+        column = quote_identifier(col)
+        kinds, sketch, distinct = set(), np.empty(0, dtype=np.uint64), 0
+        for chunk in engine.read_chunks(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL", SKETCH_CHUNK_ROWS):
+            normalized = join_key_values(chunk.iloc[:, 0])
+            if normalized is None:
+                kinds.add(None)
+                break
+            kind, values = normalized
+            kinds.add(kind)
+            distinct += len(values)
+            sketch = np.unique(np.concatenate([sketch, bottom_k_hashes(values)]))[:JOIN_SKETCH_SIZE]
+        # A column is a key candidate only if every chunk normalized to the same kind
+        if len(kinds) != 1 or None in kinds or distinct == 0:
+            continue
+        fingerprints[col] = {
+            'kind': kinds.pop(),
+            'sketch': sketch,
+            'distinct': float(distinct),
+            'uniqueness': min(distinct / value_count, 1.0)
+        }
+    return fingerprints
+
+def get_table_join_fingerprints(dataframes_dict: Dict[str, pd.DataFrame], table_name: str) -> Dict[str, Dict[str, Any]]:
+    """Join-key fingerprints of a table, taken in the engine over every row when the table is on disk"""
+    engine = disk_table_engine(table_name)
+    if engine is None:
+        compute = lambda: fingerprint_join_columns(dataframes_dict[table_name])
+    else:
+        compute = lambda: fingerprint_disk_join_columns(engine, table_name, dataframes_dict[table_name])
+    # Keyed by version, so a spilled table is read back only when its fingerprints are not cached
+    return get_profile_cache().get_or_compute((table_version(dataframes_dict, table_name), 'join_keys'), compute)
+
+def estimate_overlap(left: Dict[str, Any], right: Dict[str, Any], k: int = JOIN_SKETCH_SIZE) -> float:
+    """Estimated number of distinct values two fingerprinted columns share"""
+    union = np.union1d(left['sketch'], right['sketch'])[:k]
+    if len(union) == 0:
+        return 0.0
+    in_both = np.isin(union, left['sketch'], assume_unique=True) & np.isin(union, right['sketch'], assume_unique=True)
+    return float(in_both.sum() / len(union) * kmv_distinct(union, k))
+
+def suggest_join_keys(dataframes_dict: Dict[str, pd.DataFrame], limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Rank column pairs across tables as join keys. A pair scores by how much of the foreign-key side
+    is contained in the key side, times the key side's uniqueness. Pairs of two unique columns, such
+    as unrelated surrogate ids, are penalized; matching names, then a non-unique foreign-key side,
+    then the shared values break ties.
+    """
+    fingerprints = {table: get_table_join_fingerprints(dataframes_dict, table) for table in dataframes_dict}
+    tables = list(fingerprints)
+    suggestions = []
+    for i, left_table in enumerate(tables):
+        for right_table in tables[i + 1:]:
+            for left_col, left in fingerprints[left_table].items():
+                for right_col, right in fingerprints[right_table].items():
+                    if left['kind'] != right['kind']:
+                        continue
+                    # Two columns cannot share more values than either holds; the sketch can overshoot
+                    overlap = min(estimate_overlap(left, right), left['distinct'], right['distinct'])
+                    if overlap < 1:
+                        continue
+                    # Orient the pair so the right side is the (more) unique key
+                    if left['uniqueness'] > right['uniqueness']:
+                        fk_table, fk_col, fk, pk_table, pk_col, pk = right_table, right_col, right, left_table, left_col, left
+                    else:
+                        fk_table, fk_col, fk, pk_table, pk_col, pk = left_table, left_col, left, right_table, right_col, right
+                    containment = min(overlap / fk['distinct'], 1.0)
+                    score = containment * pk['uniqueness']
+                    one_to_one = fk['uniqueness'] >= JOIN_UNIQUE_THRESHOLD
+                    if one_to_one:
+                        score *= JOIN_ONE_TO_ONE_PENALTY
+                    if score < JOIN_MIN_SCORE:
+                        continue
+                    suggestions.append({
+                        'left_table': fk_table,
+                        'left_column': fk_col,
+                        'right_table': pk_table,
+                        'right_column': pk_col,
+                        'containment': containment,
+                        'key_uniqueness': pk['uniqueness'],
+                        'score': score,
+                        'names_match': str(fk_col).lower() == str(pk_col).lower(),
+                        'one_to_one': one_to_one,
+                        'shared_values': int(round(overlap))
+                    })
+    suggestions.sort(
+        key=lambda s: (round(s['score'], 1), s['names_match'], not s['one_to_one'], s['shared_values']), reverse=True
+    )
+    return suggestions[:limit]
+
+# Join Cardinality Estimation
+JOIN_ROW_WARNING = int(os.environ.get('NLP_SQL_JOIN_ROW_WARNING', 10000000))
+JOIN_SAFE_LIMIT = 10000
+
+def get_key_frequencies(df: pd.DataFrame, column: str) -> pd.Series:
+    """Cached row count per non-null value of one key column"""
+    return get_profile_cache().get_or_compute(
+        (get_table_fingerprint(df), f'key_frequencies:{column}'),
+        lambda: df[column].value_counts().astype('float64')
+    )
+
+def frame_join_statistics(left_df: pd.DataFrame, left_column: str, right_df: pd.DataFrame, right_column: str) -> Dict[str, Any]:
+    """Row, key and matched-pair counts of one equi-join from both sides' key frequencies"""
+    left_freq = get_key_frequencies(left_df, left_column)
+    right_freq = get_key_frequencies(right_df, right_column)
+    left_matched, right_matched = left_freq.align(right_freq, join='inner')
+    pair_rows = left_matched * right_matched
+    return {
+        'left_rows': len(left_df),
+        'right_rows': len(right_df),
+        'left_keys': len(left_freq),
+        'right_keys': len(right_freq),
+        'left_max': float(left_freq.max()) if len(left_freq) else 0.0,
+        'right_max': float(right_freq.max()) if len(right_freq) else 0.0,
+        'left_matched': float(left_matched.sum()),
+        'right_matched': float(right_matched.sum()),
+        'pair_rows': float(pair_rows.sum()),
+        'heaviest_key': pair_rows.idxmax() if len(pair_rows) else None,
+        'heaviest_key_rows': float(pair_rows.max()) if len(pair_rows) else 0.0
+    }
 
-    # 5. Box Plot for distribution analysis
-    if len(numeric_cols) >= 1:
-        fig_box = px.box(
-            data,
-            y=numeric_cols[0],
-            x=categorical_cols[0] if categorical_cols else None,
-            title=f"📦 Distribution Analysis: {numeric_cols[0]}",
-            color=categorical_cols[0] if categorical_cols else None,
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
+def key_type_family(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'number'
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 'datetime'
+    return 'text'
+
+def engine_join_statistics(engine, dataframes_dict: Dict[str, pd.DataFrame], left_table: str, left_column: str,
+                           right_table: str, right_column: str) -> Dict[str, Any]:
+    """
+    The same statistics grouped by key inside the engine's database, so tables ingested out of
+    core are counted in full rather than from their previews. Keys of different type families
+    never match, as in pandas, instead of failing DuckDB's comparison.
+    """
+    left, right = quote_identifier(left_table), quote_identifier(right_table)
+    left_key, right_key = quote_identifier(left_column), quote_identifier(right_column)
+    key_types = engine.execute(
+        f"SELECT l.{left_key} AS left_key, r.{right_key} AS right_key FROM {left} AS l, {right} AS r LIMIT 0",
+        dataframes_dict
+    ).dtypes
+    condition = 'l.k = r.k' if key_type_family(key_types['left_key']) == key_type_family(key_types['right_key']) else '1 = 0'
+    result = engine.execute(f"""
+        WITH l AS (SELECT {left_key} AS k, COUNT(*) AS n FROM {left} WHERE {left_key} IS NOT NULL GROUP BY {left_key}),
+             r AS (SELECT {right_key} AS k, COUNT(*) AS n FROM {right} WHERE {right_key} IS NOT NULL GROUP BY {right_key}),
+             m AS (SELECT l.k AS k, CAST(l.n AS DOUBLE) AS left_n, CAST(r.n AS DOUBLE) AS right_n,
+                          CAST(l.n AS DOUBLE) * r.n AS pair_n
+                   FROM l JOIN r ON {condition})
+        SELECT (SELECT COUNT(*) FROM {left}) AS left_rows,
+               (SELECT COUNT(*) FROM {right}) AS right_rows,
+               (SELECT COUNT(*) FROM l) AS left_keys,
+               (SELECT COUNT(*) FROM r) AS right_keys,
+               COALESCE((SELECT MAX(n) FROM l), 0) AS left_max,
+               COALESCE((SELECT MAX(n) FROM r), 0) AS right_max,
+               COALESCE((SELECT SUM(left_n) FROM m), 0) AS left_matched,
+               COALESCE((SELECT SUM(right_n) FROM m), 0) AS right_matched,
+               COALESCE((SELECT SUM(pair_n) FROM m), 0) AS pair_rows,
+               (SELECT k FROM m ORDER BY pair_n DESC LIMIT 1) AS heaviest_key,
+               COALESCE((SELECT MAX(pair_n) FROM m), 0) AS heaviest_key_rows
+    """, dataframes_dict)
+    # Read column by column: a row of mixed types would turn the heaviest key into a float
+    statistics = {name: float(result[name].iloc[0]) for name in result.columns if name != 'heaviest_key'}
+    for name in ('left_rows', 'right_rows', 'left_keys', 'right_keys'):
+        statistics[name] = int(statistics[name])
+    heaviest_key = result['heaviest_key'].iloc[0]
+    statistics['heaviest_key'] = None if pd.isna(heaviest_key) else heaviest_key
+    return statistics
+
+def get_join_statistics(dataframes_dict: Dict[str, pd.DataFrame], left_table: str, left_column: str,
+                        right_table: str, right_column: str) -> Dict[str, Any]:
+    """
+    Join statistics over every row: grouped in the engine when a table is on disk. Cached per
+    table version, so spilled tables are read back only when the statistics are not cached.
+    """
+    engine = disk_table_engine(left_table, right_table)
+    if engine is None:
+        compute = lambda: frame_join_statistics(dataframes_dict[left_table], left_column, dataframes_dict[right_table], right_column)
+    else:
+        compute = lambda: engine_join_statistics(engine, dataframes_dict, left_table, left_column, right_table, right_column)
+    versions = (table_version(dataframes_dict, left_table), table_version(dataframes_dict, right_table))
+    return get_profile_cache().get_or_compute((versions, f'join_statistics:{left_column}:{right_column}'), compute)
+
+def estimate_join(dataframes_dict: Dict[str, pd.DataFrame], left_table: str, left_column: str, right_table: str,
+                  right_column: str, join_type: str = 'INNER JOIN') -> Dict[str, Any]:
+    """Output rows of one equi-join, exact from both sides' key frequencies, and the side to pre-aggregate"""
+    statistics = get_join_statistics(dataframes_dict, left_table, left_column, right_table, right_column)
+    rows = statistics['pair_rows']
+    if join_type in ('LEFT JOIN', 'FULL OUTER JOIN'):
+        rows += statistics['left_rows'] - statistics['left_matched']
+    if join_type in ('RIGHT JOIN', 'FULL OUTER JOIN'):
+        rows += statistics['right_rows'] - statistics['right_matched']
+
+    # Aggregating the side with more rows per key removes most of the fan-out
+    left_multiplicity = statistics['left_rows'] / max(statistics['left_keys'], 1)
+    right_multiplicity = statistics['right_rows'] / max(statistics['right_keys'], 1)
+    return {
+        'rows': rows,
+        'left_rows': statistics['left_rows'],
+        'right_rows': statistics['right_rows'],
+        'many_to_many': bool(statistics['left_max'] > 1 and statistics['right_max'] > 1),
+        'heaviest_key': statistics['heaviest_key'],
+        'heaviest_key_rows': statistics['heaviest_key_rows'],
+        'aggregate_side': 'left' if left_multiplicity >= right_multiplicity else 'right'
+    }
 
-        fig_box.update_layout(
-            title_x=0.5,
-            title_font_size=16,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif")
+def estimate_join_chain(dataframes_dict: Dict[str, pd.DataFrame], join_conditions: List[Dict]) -> List[Dict[str, Any]]:
+    """
+    Estimate each configured join and the chain up to it. Joining a new table scales the running
+    total by that join's rows per row of the table already in the chain (independence assumption);
+    a join between two tables already in the chain scales it by the join's selectivity.
+    """
+    estimates = []
+    included = set()
+    chain_rows = None
+    for join in join_conditions:
+        left_table, right_table = join['left_table'], join['right_table']
+        if left_table not in dataframes_dict or right_table not in dataframes_dict:
+            continue
+        estimate = estimate_join(
+            dataframes_dict, left_table, join['left_column'], right_table, join['right_column'], join['join_type']
         )
 
-        charts.append(("📦 Distribution Analysis", fig_box))
+        if chain_rows is None:
+            chain_rows = estimate['rows']
+        elif left_table in included and right_table in included:
+            chain_rows *= estimate['rows'] / max(estimate['left_rows'] * estimate['right_rows'], 1)
+        elif left_table in included:
+            chain_rows *= estimate['rows'] / max(estimate['left_rows'], 1)
+        elif right_table in included:
+            chain_rows *= estimate['rows'] / max(estimate['right_rows'], 1)
+        else:
+            chain_rows *= estimate['rows']
+        included.update((left_table, right_table))
+
+        estimate['join'] = join
+        estimate['chain_rows'] = chain_rows
+        estimate['flagged'] = max(estimate['rows'], chain_rows) > JOIN_ROW_WARNING
+        estimates.append(estimate)
+    return estimates
+
+def describe_join_safeguard(join: Dict) -> str:
+    """Prompt note for a join the user chose to guard against row explosion"""
+    if join.get('safeguard') == 'aggregate':
+        table, column = (join['left_table'], join['left_column']) if join.get('aggregate_side') == 'left' else (join['right_table'], join['right_column'])
+        return f" (many-to-many: aggregate {table} by {column} in a subquery before joining)"
+    if join.get('safeguard') == 'limit':
+        return f" (very large: add LIMIT {JOIN_SAFE_LIMIT} to the final query)"
+    return ""
+
+def add_limit(sql_query: str, limit: int = JOIN_SAFE_LIMIT) -> str:
+    return f"{sql_query.strip().rstrip(';').rstrip()}\nLIMIT {limit}"
+
+def query_join_estimates(sql_query: str) -> List[Dict[str, Any]]:
+    """Estimates for the configured joins whose tables both appear in a query"""
+    referenced = set(re.findall(r'\w+', sql_query.lower()))
+    joins = [
+        j for j in st.session_state.join_conditions
+        if j['left_table'].lower() in referenced and j['right_table'].lower() in referenced
+    ]
+    return estimate_join_chain(st.session_state.uploaded_files, joins)
+
+# Table Profiling Engine
+PROFILE_MODES = {"Auto": 'auto', "Exact": 'exact', "Fast (sketched)": 'fast'}
+
+def profile_table(df: pd.DataFrame, mode: str = 'auto') -> Dict[str, Any]:
+    """
+    Compute every statistic the upload preview needs, each in one vectorized pass per column.
+    'exact' counts distinct values and duplicate rows exactly; 'fast' estimates distinct counts
+    with HyperLogLog and duplicates from row hashes. 'auto' picks 'fast' for large tables.
+    """
+    n_rows = len(df)
+    sketched = mode == 'fast' or (mode == 'auto' and n_rows > SKETCH_ROW_THRESHOLD)
+    distinct_error = None
+
+    null_counts, unique_counts, minimums, maximums, negative_cols = [], [], [], [], []
+    for col in df.columns:
+        series = df[col]
+        null_count = int(series.isna().sum())
+        null_counts.append(null_count)
+
+        col_min = col_max = None
+        is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        if null_count < n_rows and (is_numeric or pd.api.types.is_datetime64_any_dtype(series)):
+            col_min, col_max = series.min(), series.max()
+            # Negatives follow from the minimum; no separate scan
+            if is_numeric and col_min < 0:
+                negative_cols.append(col)
+        minimums.append(col_min)
+        maximums.append(col_max)
+
+        if sketched and sketchable(series):
+            estimate, distinct_error = approx_distinct(series)
+            upper = n_rows - null_count
+            if col_min is not None and pd.api.types.is_integer_dtype(series):
+                upper = min(upper, int(col_max) - int(col_min) + 1)
+            unique_counts.append(min(estimate, upper))
+        else:
+            unique_counts.append(int(series.nunique()))
+
+    if sketched:
+        duplicate_rows = int(pd.util.hash_pandas_object(df, index=False).duplicated().sum())
+    else:
+        duplicate_rows = int(df.duplicated().sum())
+
+    null_series = pd.Series(null_counts, index=df.columns)
+    total_cells = n_rows * len(df.columns)
+    semantic_types = get_semantic_types(df)['types']
+
+    quality_issues = []
+    missing_cols = null_series[null_series > 0].index.tolist()
+    if missing_cols:
+        quality_issues.append(f"Missing values in: {', '.join(map(str, missing_cols))}")
+    if duplicate_rows:
+        quality_issues.append(f"Duplicate rows{' (estimated)' if sketched else ''}: {duplicate_rows}")
+    for col in negative_cols:
+        quality_issues.append(f"Negative values in: {col}")
+
+    return {
+        'mode': 'fast' if sketched else 'exact',
+        'distinct_error': distinct_error,
+        'missing_pct': (null_series.sum() / total_cells) * 100 if total_cells else 0.0,
+        'schema': pd.DataFrame({
+            'Column': df.columns,
+            'Data Type': df.dtypes.astype(str).values,
+            'Semantic Type': [semantic_types.get(col, '') for col in df.columns],
+            'Non-Null Count': n_rows - null_series.values,
+            'Null Count': null_series.values,
+            'Null %': (null_series.values / n_rows * 100).round(2) if n_rows else 0.0,
+            'Unique Values (est.)' if distinct_error else 'Unique Values': unique_counts,
+            'Min': [str(v) if v is not None else '' for v in minimums],
+            'Max': [str(v) if v is not None else '' for v in maximums]
+        }),
+        'quality_issues': quality_issues
+    }
 
-    # 6. Histogram with KDE
-    if len(numeric_cols) >= 1:
-        fig_hist = px.histogram(
-            data,
-            x=numeric_cols[0],
-            title=f"📊 Histogram: {numeric_cols[0]} Distribution",
-            nbins=30,
-            marginal="box",
-            color_discrete_sequence=['#667eea']
-        )
+class ProfileCache:
+    """Process-wide LRU of per-table statistics keyed by (table version, kind of statistic)"""
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_compute(self, key: Tuple, compute) -> Any:
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        profile = compute()
+        with self.lock:
+            self.entries[key] = profile
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return profile
 
-        fig_hist.update_layout(
-            title_x=0.5,
-            title_font_size=16,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif")
-        )
+@st.cache_resource
+def get_profile_cache():
+    return ProfileCache()
+
+def get_table_profile(df, mode: str = 'auto', table_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Cached profile of one version of a table; the version defaults to its content fingerprint.
+    df may also be a function returning the table, called only when the profile is not cached.
+    """
+    load = df if callable(df) else lambda: df
+    return get_profile_cache().get_or_compute((table_version or get_table_fingerprint(load()), mode), lambda: profile_table(load(), mode))
+
+# Parse-Once Upload Cache
+class UploadCache:
+    """
+    Process-wide LRU of parsed uploads, keyed by file content hash. An upload whose table the
+    table manager spilled is returned as its stored digest, with no frame, so it is neither
+    re-parsed nor read back until a table is actually used.
+    """
+    MAX_SPILLED_ENTRIES = 256
+
+    def __init__(self, max_bytes: int, table_store: TableStore):
+        self.max_bytes = max_bytes
+        self.table_store = table_store
+        self.entries = OrderedDict()
+        self.spilled = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """The parse entry of an upload; a spilled one has df None and the table's stored 'table_digest'"""
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.entries.move_to_end(digest)
+                return entry
+            spilled = self.spilled.get(digest)
+            if spilled is None:
+                return None
+            if not self.table_store.has_table(spilled['table_digest']):
+                # The stored copy is gone; the upload is parsed again
+                del self.spilled[digest]
+                return None
+            self.spilled.move_to_end(digest)
+            return spilled
+
+    def release_table(self, df: pd.DataFrame, table_digest: str):
+        """Drop the entry holding a table the table manager spilled, remembering where it is stored"""
+        with self.lock:
+            for digest, entry in list(self.entries.items()):
+                if entry['df'] is df:
+                    del self.entries[digest]
+                    self.total_bytes -= entry['memory_bytes']
+                    self.spilled[digest] = dict(entry, df=None, table_digest=table_digest)
+            while len(self.spilled) > self.MAX_SPILLED_ENTRIES:
+                self.spilled.popitem(last=False)
+
+    def put(self, digest: str, entry: Dict[str, Any]):
+        with self.lock:
+            if digest in self.entries:
+                self.total_bytes -= self.entries.pop(digest)['memory_bytes']
+            self.entries[digest] = entry
+            self.total_bytes += entry['memory_bytes']
+            # Keep the newest entry even if it alone exceeds the cap
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted['memory_bytes']
 
-        charts.append(("📊 Histogram Analysis", fig_hist))
+@st.cache_resource
+def get_upload_cache():
+    return UploadCache(
+        max_bytes=int(os.environ.get('NLP_SQL_UPLOAD_CACHE_MB', '1024')) * 1024 * 1024,
+        table_store=get_session_manager().table_store
+    )
+
+# DataFrame Compaction
+ISO_DATE_FORMATS = [(r'\d{4}-\d{2}-\d{2}', '%Y-%m-%d'), (r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', '%Y-%m-%d %H:%M:%S')]
+DEFAULT_STRING_STORAGE = getattr(pd.Series(['']).dtype, 'storage', None)
+
+def is_text_dtype(series: pd.Series) -> bool:
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+def plain_memory_bytes(df: pd.DataFrame) -> int:
+    """
+    Memory the table would take as pd.read_csv leaves it: 64-bit numbers and the default string
+    dtype. Categorical columns are costed from their code counts without expanding them.
+    """
+    total = 0
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if isinstance(series.dtype, pd.CategoricalDtype) and is_text_dtype(pd.Series(series.cat.categories)):
+            categories = pd.Series(series.cat.categories, dtype=object)
+            if DEFAULT_STRING_STORAGE == 'pyarrow':
+                # pandas' Arrow strings are large_string: an 8-byte offset plus the UTF-8 bytes
+                sizes = 8 + categories.map(lambda value: len(str(value).encode('utf-8')))
+            else:
+                sizes = 8 + categories.map(sys.getsizeof)
+            codes = series.cat.codes.to_numpy()
+            counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+            total += int(counts @ sizes.to_numpy(dtype=np.int64)) + 8 * int((codes < 0).sum())
+        elif pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            total += 8 * len(series)
+        else:
+            total += int(series.memory_usage(index=False, deep=True))
+    return total
+
+def categorize_strings(series: pd.Series) -> Optional[pd.Series]:
+    """
+    Categorical version of a text column whose values repeat, or None. Categories are sorted, so
+    DuckDB, which scans categoricals as ENUMs ordered by category, still sorts them as text.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if series.cat.categories.is_monotonic_increasing:
+            return None
+        try:
+            return series.cat.reorder_categories(sorted(series.cat.categories))
+        except TypeError:
+            return None
+    if not is_text_dtype(series):
+        return None
+    non_null = series.count()
+    if not non_null or series.nunique() / non_null > CATEGORY_MAX_UNIQUE_RATIO:
+        return None
+    try:
+        return series.astype(pd.CategoricalDtype(sorted(series.dropna().unique())))
+    except TypeError:
+        # Mixed value types have no sort order; leave the column as it is
+        return None
 
-    # 7. Correlation Heatmap
-    if len(numeric_cols) >= 2:
-        corr_matrix = data[numeric_cols].corr()
+def parse_iso_dates(series: pd.Series) -> Optional[pd.Series]:
+    """
+    datetime64 version of a text column holding only ISO dates or only ISO date-times, or None.
+    Each distinct value is parsed once, and only text pandas renders back unchanged qualifies.
+    """
+    if not (is_text_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype)):
+        return None
+    sample = series.dropna().head(20).astype(str)
+    matches = [(pattern, fmt) for pattern, fmt in ISO_DATE_FORMATS if len(sample) and sample.str.fullmatch(pattern).all()]
+    if not matches:
+        return None
+    pattern, fmt = matches[0]
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    uniques = pd.Series(uniques, dtype=object)
+    if not uniques.map(lambda value: isinstance(value, str)).all() or not uniques.str.fullmatch(pattern).all():
+        return None
+    parsed = pd.to_datetime(uniques, format=fmt, errors='coerce')
+    if parsed.isna().any():
+        return None
+    if fmt != '%Y-%m-%d' and (parsed == parsed.dt.normalize()).all():
+        # Date-times that are all midnight would render as bare dates
+        return None
+    values = pd.api.extensions.take(parsed.to_numpy(), codes, allow_fill=True)
+    return pd.Series(values, index=series.index, name=series.name)
+
+def compact_dataframe(df: pd.DataFrame, parse_dates: bool = False, narrow_integers: bool = False) -> pd.DataFrame:
+    """
+    Shrink a table without changing its values: repeated strings become categoricals, with
+    narrow_integers integers take their smallest width and, with parse_dates, ISO date text
+    becomes datetime64. Numbers stay 64-bit by default, since SQL arithmetic on narrow types
+    overflows. Returns a new frame and leaves df as it is.
+    """
+    compacted = df.copy(deep=False)
+    for i in range(compacted.shape[1]):
+        series = compacted.iloc[:, i]
+        converted = parse_iso_dates(series) if parse_dates else None
+        if converted is None:
+            converted = categorize_strings(series)
+        if converted is not None:
+            compacted.isetitem(i, converted)
+    return downcast_numeric_columns(compacted) if narrow_integers else compacted
 
-        fig_heatmap = px.imshow(
-            corr_matrix,
-            title="🔥 Correlation Heatmap",
-            color_continuous_scale="RdBu",
-            aspect="auto",
-            text_auto=True
-        )
+@st.cache_resource
+def get_compaction_memo():
+    """Process-wide memo of each compacted table's size before compaction, keyed by DataFrame identity"""
+    return {}
+
+def record_compaction(df: pd.DataFrame, memory_before: int):
+    memo = get_compaction_memo()
+    key = id(df)
+    memo[key] = (weakref.ref(df, lambda _ref, key=key: memo.pop(key, None)), memory_before)
+
+def get_compaction(df: pd.DataFrame) -> Optional[Tuple[int, int]]:
+    """(bytes before, bytes after) for a table compacted in this process, or None"""
+    entry = get_compaction_memo().get(id(df))
+    if entry is None or entry[0]() is not df:
+        return None
+    return entry[1], get_table_manager().frame_bytes(df)
+
+# Semantic Type Inference
+SEMANTIC_TYPES = ['datetime', 'numeric', 'categorical', 'id', 'text']
+SEMANTIC_SAMPLE_ROWS = 1000
+# 'id', 'cust_id', 'order key' or camelCase 'customerId', but not 'paid'
+ID_COLUMN_PATTERN = re.compile(r'(^|[_\s])(?i:id|uuid|guid|key)$|[a-z](Id|ID)$')
+
+def date_format_candidates(sample: pd.Series) -> List[str]:
+    """
+    strptime formats, month-first guess first, that parse every value in a sample of text and
+    name at least a year and a month
+    """
+    candidates = []
+    with warnings.catch_warnings():
+        # pandas warns when a guessed format disagrees with dayfirst; both orders are tried
+        warnings.simplefilter('ignore', UserWarning)
+        for dayfirst in (False, True):
+            fmt = guess_datetime_format(sample.iloc[0], dayfirst=dayfirst)
+            if fmt is None or fmt in candidates:
+                continue
+            if not ('%Y' in fmt or '%y' in fmt) or not any(token in fmt for token in ('%m', '%b', '%B')):
+                continue
+            if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+                candidates.append(fmt)
+    return candidates
+
+def classify_column(series: pd.Series) -> Tuple[str, Optional[str]]:
+    """
+    Semantic type of one column, plus the format of date text. Text is classified from a sample
+    of its values; a date format found there is confirmed by one vectorized parse of every
+    distinct value.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime', None
+    if pd.api.types.is_bool_dtype(series):
+        return 'categorical', None
+    is_categorical = isinstance(series.dtype, pd.CategoricalDtype)
+    if pd.api.types.is_numeric_dtype(series) and not is_categorical:
+        if pd.api.types.is_integer_dtype(series) and ID_COLUMN_PATTERN.search(str(series.name)):
+            return 'id', None
+        return 'numeric', None
+    if not (is_categorical or is_text_dtype(series)):
+        return 'text', None
+
+    non_null = series.count()
+    if not non_null:
+        return 'categorical', None
+    values = pd.Series(series.cat.categories, dtype=object) if is_categorical else series.dropna()
+    sample = values.sample(SEMANTIC_SAMPLE_ROWS, random_state=0) if len(values) > SEMANTIC_SAMPLE_ROWS else values
+    if sample.map(lambda value: isinstance(value, str)).all():
+        candidates = date_format_candidates(sample.astype(object))
+        if candidates:
+            uniques = values if is_categorical else pd.Series(values.unique(), dtype=object)
+            for fmt in candidates:
+                if pd.to_datetime(uniques, format=fmt, errors='coerce').notna().all():
+                    return 'datetime', fmt
+
+    if ID_COLUMN_PATTERN.search(str(series.name)):
+        return 'id', None
+    distinct = series.nunique()
+    return ('categorical' if distinct / non_null <= CATEGORY_MAX_UNIQUE_RATIO else 'text'), None
+
+def parse_date_text(series: pd.Series, fmt: str) -> pd.Series:
+    """datetime64 column from date text, parsing each distinct value once"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=fmt, errors='coerce')
+    return pd.Series(pd.api.extensions.take(parsed.to_numpy(), codes, allow_fill=True), index=series.index, name=series.name)
+
+def infer_semantic_types(df: pd.DataFrame) -> Dict[str, Any]:
+    """Semantic type of every column, and the parse format of each column of date text"""
+    types, datetime_formats = {}, {}
+    for i, col in enumerate(df.columns):
+        semantic_type, fmt = classify_column(df.iloc[:, i])
+        types[col] = semantic_type
+        if fmt is not None:
+            datetime_formats[col] = fmt
+    return {'types': types, 'datetime_formats': datetime_formats}
+
+def get_semantic_types(df, table_version: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Semantic types of one version of a table or result, inferred once per process. df may also
+    be a function returning the table, called only when the types are not cached yet.
+    """
+    load = df if callable(df) else lambda: df
+    return get_profile_cache().get_or_compute(
+        (table_version or get_table_fingerprint(load()), 'semantic_types'), lambda: infer_semantic_types(load())
+    )
+
+def columns_of_type(semantic_types: Dict[str, Any], semantic_type: str) -> List[str]:
+    return [col for col, inferred in semantic_types['types'].items() if inferred == semantic_type]
+
+# Chunked, Parallel CSV Ingestion
+CSV_SAMPLE_ROWS = 10000
+CSV_CHUNK_ROWS = 250000
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+MAX_PARSE_WORKERS = 4
+
+def infer_csv_dtypes(data: bytes) -> Dict[str, str]:
+    """Choose explicit dtypes from a sample so chunks parse consistently and strings stay compact"""
+    sample = pd.read_csv(io.BytesIO(data), nrows=CSV_SAMPLE_ROWS)
+    dtypes = {}
+    for col in sample.columns:
+        series = sample[col]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            dtypes[col] = 'int64'
+        elif pd.api.types.is_float_dtype(series):
+            dtypes[col] = 'float64'
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            non_null = series.dropna()
+            if len(non_null) and non_null.nunique() / len(non_null) <= CATEGORY_MAX_UNIQUE_RATIO:
+                dtypes[col] = 'category'
+    return dtypes
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate parsed chunks column by column, merging per-chunk categories without going through object"""
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = {}
+    for col in chunks[0].columns:
+        if all(isinstance(chunk[col].dtype, pd.CategoricalDtype) for chunk in chunks):
+            columns[col] = pd.Series(union_categoricals([chunk[col] for chunk in chunks]), name=col)
+        else:
+            columns[col] = pd.concat([chunk[col] for chunk in chunks], ignore_index=True)
+    return pd.DataFrame(columns)
+
+def downcast_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink integer columns to the smallest width that holds every value"""
+    # Positional, so results with repeated column names are handled
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df.isetitem(i, pd.to_numeric(series, downcast='integer'))
+    return df
+
+def read_csv_chunked(data: bytes, progress_callback=None) -> pd.DataFrame:
+    """Parse CSV bytes in chunks with sampled dtypes, reporting the fraction of bytes consumed"""
+    def parse(dtypes):
+        buffer = io.BytesIO(data)
+        chunks = []
+        for chunk in pd.read_csv(buffer, dtype=dtypes, chunksize=CSV_CHUNK_ROWS):
+            chunks.append(chunk)
+            if progress_callback is not None:
+                progress_callback(min(buffer.tell() / max(len(data), 1), 1.0))
+        return chunks
 
-        fig_heatmap.update_layout(
-            title_x=0.5,
-            title_font_size=16,
-            font=dict(family="Inter, sans-serif")
-        )
+    try:
+        chunks = parse(infer_csv_dtypes(data))
+    except (ValueError, TypeError):
+        # A value beyond the sample does not fit its dtype (e.g. a blank in an integer column)
+        chunks = parse(None)
 
-        charts.append(("🔥 Correlation Heatmap", fig_heatmap))
+    df = concat_chunks(chunks) if chunks else pd.read_csv(io.BytesIO(data))
+    if progress_callback is not None:
+        progress_callback(1.0)
+    return df
 
-    # 8. Time Series Chart (if datetime columns exist)
-    if datetime_cols and len(numeric_cols) >= 1:
-        fig_time = px.line(
-            data,
-            x=datetime_cols[0],
-            y=numeric_cols[0],
-            title=f"⏰ Time Series: {numeric_cols[0]} over {datetime_cols[0]}",
-            markers=True
-        )
+# Columnar uploads: Parquet, and Arrow IPC in its file (Feather v2) or stream form
+UPLOAD_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
 
-        fig_time.update_layout(
-            title_x=0.5,
-            title_font_size=16,
-            plot_bgcolor='rgba(0,0,0,0)',
-            paper_bgcolor='rgba(0,0,0,0)',
-            font=dict(family="Inter, sans-serif")
-        )
+def upload_format(filename: str) -> str:
+    return UPLOAD_FORMATS.get(os.path.splitext(filename)[1].lower(), 'csv')
 
-        charts.append(("⏰ Time Series Analysis", fig_time))
+def open_arrow_ipc(source):
+    """Record batch reader for Arrow IPC data in either the file or the stream layout"""
+    try:
+        return pa.ipc.open_file(source)
+    except pa.ArrowInvalid:
+        source.seek(0)
+        return pa.ipc.open_stream(source)
+
+def iter_arrow_batches(source, file_format: str, batch_rows: int = CSV_CHUNK_ROWS):
+    """Record batches of a Parquet or Arrow IPC source, read a batch at a time"""
+    if file_format == 'parquet':
+        yield from pq.ParquetFile(source).iter_batches(batch_size=batch_rows)
+        return
+    reader = open_arrow_ipc(source)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        for i in range(reader.num_record_batches):
+            yield reader.get_batch(i)
+    else:
+        yield from reader
+
+def read_columnar(data: bytes, file_format: str, progress_callback=None) -> pd.DataFrame:
+    """Parquet or Arrow IPC bytes to a DataFrame; the files carry their own column types"""
+    if pa is None:
+        raise ImportError(f"pyarrow is required to read {file_format} files")
+    source = pa.BufferReader(data)
+    table = pq.read_table(source) if file_format == 'parquet' else open_arrow_ipc(source).read_all()
+    df = table.to_pandas(self_destruct=True)
+    if progress_callback is not None:
+        progress_callback(1.0)
+    return df
+
+def read_upload(filename: str, data: bytes, progress_callback=None) -> pd.DataFrame:
+    file_format = upload_format(filename)
+    if file_format == 'csv':
+        return read_csv_chunked(data, progress_callback)
+    return read_columnar(data, file_format, progress_callback)
+
+def read_upload_preview(file_path: str, rows: int) -> pd.DataFrame:
+    """First rows of a saved upload; columnar files are read one batch at a time until enough"""
+    file_format = upload_format(file_path)
+    if file_format == 'csv':
+        return pd.read_csv(file_path, nrows=rows)
+
+    batches = []
+    for batch in iter_arrow_batches(pa.memory_map(file_path), file_format, batch_rows=rows):
+        batches.append(batch)
+        if sum(len(b) for b in batches) >= rows:
+            break
+    if not batches:
+        source = pa.memory_map(file_path)
+        schema = pq.read_schema(source) if file_format == 'parquet' else open_arrow_ipc(source).schema
+        return schema.empty_table().to_pandas()
+    return pa.Table.from_batches(batches).slice(0, rows).to_pandas()
+
+def parse_upload_payloads(payloads: Dict[str, Tuple[str, bytes]]) -> Dict[str, Any]:
+    """Parse several files concurrently with a progress bar each; failures are returned, not raised"""
+    progress = {digest: 0.0 for digest in payloads}
+    progress_bars = {
+        digest: st.progress(0.0, text=f"📥 Parsing {filename}")
+        for digest, (filename, _) in payloads.items()
+    }
 
-    return charts
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(len(payloads), MAX_PARSE_WORKERS)) as executor:
+        futures = {
+            executor.submit(read_upload, filename, data,
+                            lambda fraction, digest=digest: progress.__setitem__(digest, fraction)): digest
+            for digest, (filename, data) in payloads.items()
+        }
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.2)
+            # Streamlit elements may only be updated from the script thread
+            for digest, progress_bar in progress_bars.items():
+                progress_bar.progress(progress[digest], text=f"📥 Parsing {payloads[digest][0]} ({progress[digest]:.0%})")
+
+        for future, digest in futures.items():
+            try:
+                results[digest] = future.result()
+            except Exception as e:
+                results[digest] = e
+
+    for progress_bar in progress_bars.values():
+        progress_bar.empty()
+    return results
+
+def load_uploaded_tables(uploaded_files, session_manager) -> Dict[str, Any]:
+    """Map each upload's file_id to its cached parse entry, or to the error it raised"""
+    # file_id is stable across reruns, so each upload is hashed only once per session
+    upload_digests = st.session_state.setdefault('upload_digests', {})
+    upload_cache = get_upload_cache()
+    table_manager = get_table_manager()
+
+    digests = {}
+    entries = {}
+    payloads = {}
+    for uploaded_file in uploaded_files:
+        digest = upload_digests.get(uploaded_file.file_id)
+        if digest is None:
+            digest = hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+            upload_digests[uploaded_file.file_id] = digest
+        digests[uploaded_file.file_id] = digest
+        table_manager.track_upload(current_session_id(), digest)
+
+        entry = upload_cache.get(digest)
+        if entry is not None:
+            entries[digest] = entry
+        elif digest not in payloads:
+            payloads[digest] = (uploaded_file.name, uploaded_file.getvalue())
+
+    if payloads:
+        parsed = parse_upload_payloads(payloads)
+        for uploaded_file in uploaded_files:
+            digest = digests[uploaded_file.file_id]
+            if digest not in parsed or digest in entries:
+                continue
+            if isinstance(parsed[digest], Exception):
+                entries[digest] = parsed[digest]
+                continue
+            df = compact_dataframe(parsed[digest])
+            memory_bytes = get_table_manager().frame_bytes(df)
+            # The preview rows and compaction outlive the frame when the table manager spills it
+            entry = {
+                'digest': digest,
+                'df': df,
+                'memory_bytes': memory_bytes,
+                'compaction': (plain_memory_bytes(parsed[digest]), memory_bytes),
+                'head': df.head(10),
+                'tail': df.tail(5),
+                'file_path': session_manager.save_uploaded_file(uploaded_file, uploaded_file.name)
+            }
+            upload_cache.put(digest, entry)
+            entries[digest] = entry
+
+    return {file_id: entries[digest] for file_id, digest in digests.items()}
+
+def upload_table_name(filename: str) -> str:
+    return os.path.splitext(filename)[0].replace(' ', '_').lower()
+
+def ingest_uploads_out_of_core(uploaded_files, session_manager) -> Dict[str, Any]:
+    """
+    Out-of-core counterpart of load_uploaded_tables: each file is loaded into this session's
+    on-disk database and only its first OUT_OF_CORE_PREVIEW_ROWS rows are parsed into pandas.
+    """
+    engine = get_sql_engine()
+    upload_digests = st.session_state.setdefault('upload_digests', {})
+    disk_tables = st.session_state.setdefault('disk_tables', {})
+    previews = st.session_state.setdefault('disk_table_previews', {})
+
+    entries = {}
+    for uploaded_file in uploaded_files:
+        try:
+            digest = upload_digests.get(uploaded_file.file_id)
+            if digest is None:
+                digest = hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+                upload_digests[uploaded_file.file_id] = digest
+            # The on-disk database may read this file in place, so the sweep must keep it
+            get_table_manager().track_upload(current_session_id(), digest)
+
+            entry = previews.get(digest)
+            if entry is None:
+                file_path = session_manager.save_uploaded_file(uploaded_file, uploaded_file.name)
+                df = read_upload_preview(file_path, OUT_OF_CORE_PREVIEW_ROWS)
+                entry = {
+                    'digest': digest,
+                    'df': df,
+                    'memory_bytes': int(df.memory_usage(deep=True).sum()),
+                    'file_path': file_path,
+                    'rows': None
+                }
+                previews[digest] = entry
+
+            table_name = upload_table_name(uploaded_file.name)
+            if disk_tables.get(table_name) != digest:
+                engine.ingest_file(table_name, entry['file_path'])
+                disk_tables[table_name] = digest
+                entry['rows'] = engine.table_rows(table_name)
+            entries[uploaded_file.file_id] = entry
+        except Exception as e:
+            entries[uploaded_file.file_id] = e
+    return entries
 
 # Progress tracking
 def display_progress_bar(current_stage):
@@ -750,16 +3815,17 @@ def display_professional_file_upload():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             uploaded_files = st.file_uploader(
-                "🔄 Choose CSV files to upload",
-                type=['csv'],
+                "🔄 Choose CSV, Parquet or Arrow files to upload",
+                type=[extension.lstrip('.') for extension in UPLOAD_FORMATS],
                 accept_multiple_files=True,
-                help="Upload multiple CSV files for analysis and joining. Supports large files up to 200MB each.",
+                help="Upload multiple CSV, Parquet or Arrow IPC (.arrow, .feather, .ipc) files for analysis and joining. Supports large files up to 200MB each. In out-of-core mode, queries over Parquet read only the columns and row groups they need.",
                 key="file_uploader_main"
             )
 
         if uploaded_files:
             session_manager = get_session_manager()
-            st.session_state.uploaded_files = {}
+            table_manager = get_table_manager()
+            st.session_state.uploaded_files = table_manager.attach(current_session_id(), {})
             st.session_state.uploaded_file_paths = {}
 
             # Display upload summary
@@ -785,74 +3851,95 @@ def display_professional_file_upload():
                 </div>
                 """, unsafe_allow_html=True)
 
+            profile_mode = PROFILE_MODES[st.selectbox(
+                "🔬 Profiling mode",
+                options=list(PROFILE_MODES.keys()),
+                key="profile_mode",
+                help=f"Exact scans every row. Fast estimates distinct values with HyperLogLog and duplicates from row hashes. Auto uses Fast above {SKETCH_ROW_THRESHOLD:,} rows."
+            )]
+
+            out_of_core = st.checkbox(
+                "💽 Out-of-core mode",
+                value=st.session_state.get('out_of_core', False),
+                key="out_of_core_checkbox",
+                help=f"Keeps tables in an on-disk database and parses only a {OUT_OF_CORE_PREVIEW_ROWS:,}-row preview into memory. Queries spill to disk beyond {MEMORY_BUDGET_MB:,} MB (NLP_SQL_MEMORY_BUDGET_MB)."
+            )
+            if out_of_core != st.session_state.get('out_of_core', False):
+                # Switching modes starts from a clean engine
+                close_sql_engine()
+                discard_out_of_core_tables()
+                st.session_state.sql_engine_name = DiskEngine.name if out_of_core else SQLiteEngine.name
+                st.session_state.out_of_core = out_of_core
+
+            if out_of_core:
+                upload_entries = ingest_uploads_out_of_core(uploaded_files, session_manager)
+            else:
+                # Parse new files concurrently; unchanged ones come from the upload cache
+                upload_entries = load_uploaded_tables(uploaded_files, session_manager)
+
             # Process each file
+            upload_digests = []
+            table_compaction = {}
             for uploaded_file in uploaded_files:
                 try:
-                    df = pd.read_csv(uploaded_file)
-                    table_name = uploaded_file.name.replace('.csv', '').replace(' ', '_').lower()
-
-                    # Save file and data
-                    st.session_state.uploaded_files[table_name] = df
-                    file_path = session_manager.save_uploaded_file(uploaded_file, uploaded_file.name)
-                    st.session_state.uploaded_file_paths[table_name] = file_path
-
-                    total_rows += len(df)
+                    upload_entry = upload_entries[uploaded_file.file_id]
+                    if isinstance(upload_entry, Exception):
+                        raise upload_entry
+                    df = upload_entry['df']
+                    table_name = upload_table_name(uploaded_file.name)
+                    tables = st.session_state.uploaded_files
+
+                    # Save file and data; a spilled upload goes in as its stored digest and is read only when used
+                    if df is None:
+                        tables.set_stored(table_name, upload_entry['table_digest'])
+                    else:
+                        tables[table_name] = df
+                    profile = get_table_profile(lambda: tables[table_name], profile_mode, table_version=upload_entry['digest'])
+                    row_count, schema_df = tables.schema(table_name)
+                    table_rows = upload_entry.get('rows') or row_count
+                    # Fingerprint key candidates now so the join builder only compares sketches
+                    get_table_join_fingerprints(tables, table_name)
+                    st.session_state.uploaded_file_paths[table_name] = upload_entry['file_path']
+                    if not out_of_core:
+                        table_compaction[table_name] = upload_entry['compaction']
+                    upload_digests.append((table_name, upload_entry['digest']))
+
+                    total_rows += table_rows
 
                     # Enhanced file preview
-                    with st.expander(f"📋 {uploaded_file.name} - {len(df):,} rows × {len(df.columns)} columns", expanded=False):
+                    with st.expander(f"📋 {uploaded_file.name} - {table_rows:,} rows × {len(schema_df.columns)} columns", expanded=False):
+                        if out_of_core:
+                            st.caption(f"💽 Stored on disk; preview and profile cover the first {row_count:,} rows")
 
                         # File statistics
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Rows", f"{len(df):,}")
+                            st.metric("Rows", f"{table_rows:,}")
                         with col2:
-                            st.metric("Columns", len(df.columns))
+                            st.metric("Columns", len(schema_df.columns))
                         with col3:
                             st.metric("Size", f"{uploaded_file.size / 1024:.1f} KB")
                         with col4:
-                            missing_pct = (df.isnull().sum().sum() / (len(df) * len(df.columns))) * 100
-                            st.metric("Missing %", f"{missing_pct:.1f}%")
+                            st.metric("Missing %", f"{profile['missing_pct']:.1f}%")
 
                         # Data types and quality
                         tab1, tab2, tab3 = st.tabs(["🔍 Preview", "📋 Schema", "⚠️ Quality"])
 
                         with tab1:
                             st.markdown("**First 10 rows:**")
-                            st.dataframe(df.head(10), use_container_width=True)
+                            st.dataframe(upload_entry['head'] if df is None else df.head(10), use_container_width=True)
 
                             st.markdown("**Last 5 rows:**")
-                            st.dataframe(df.tail(5), use_container_width=True)
+                            st.dataframe(upload_entry['tail'] if df is None else df.tail(5), use_container_width=True)
 
                         with tab2:
-                            schema_df = pd.DataFrame({
-                                'Column': df.columns,
-                                'Data Type': df.dtypes.astype(str),
-                                'Non-Null Count': df.count(),
-                                'Null Count': df.isnull().sum(),
-                                'Null %': (df.isnull().sum() / len(df) * 100).round(2),
-                                'Unique Values': df.nunique()
-                            })
-                            st.dataframe(schema_df, use_container_width=True)
+                            st.dataframe(profile['schema'], use_container_width=True)
+                            if profile['distinct_error']:
+                                st.caption(f"Distinct counts are HyperLogLog estimates, within ±{profile['distinct_error']:.1%} at 95% confidence")
 
                         with tab3:
                             # Data quality indicators
-                            quality_issues = []
-
-                            # Check for missing values
-                            missing_cols = df.columns[df.isnull().any()].tolist()
-                            if missing_cols:
-                                quality_issues.append(f"Missing values in: {', '.join(missing_cols)}")
-
-                            # Check for duplicate rows
-                            if df.duplicated().any():
-                                dup_count = df.duplicated().sum()
-                                quality_issues.append(f"Duplicate rows: {dup_count}")
-
-                            # Check for potential issues
-                            numeric_cols = df.select_dtypes(include=[np.number]).columns
-                            for col in numeric_cols:
-                                if (df[col] < 0).any():
-                                    quality_issues.append(f"Negative values in: {col}")
+                            quality_issues = profile['quality_issues']
 
                             if quality_issues:
                                 for issue in quality_issues:
@@ -873,7 +3960,8 @@ def display_professional_file_upload():
                 """, unsafe_allow_html=True)
 
             with cols[3]:
-                avg_cols = sum([len(df.columns) for df in st.session_state.uploaded_files.values()]) / len(st.session_state.uploaded_files)
+                tables = st.session_state.uploaded_files
+                avg_cols = sum([len(tables.schema(table_name)[1].columns) for table_name in tables]) / len(tables)
                 st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-value">{avg_cols:.0f}</div>
@@ -881,9 +3969,16 @@ def display_professional_file_upload():
                 </div>
                 """, unsafe_allow_html=True)
 
-            # Save session data
-            session_manager.save_session_data('uploaded_files', st.session_state.uploaded_files)
-            session_manager.save_session_data('uploaded_file_paths', st.session_state.uploaded_file_paths)
+            table_manager.enforce_budget()
+            st.session_state.setdefault('memory_compaction', {})['tables'] = {
+                table_name: compaction for table_name, compaction in table_compaction.items() if compaction is not None
+            }
+
+            # Save session data only when the set of uploads changed; disk-backed previews are not the tables
+            if not out_of_core and upload_digests != st.session_state.get('saved_upload_digests'):
+                session_manager.save_session_data('uploaded_files', st.session_state.uploaded_files)
+                session_manager.save_session_data('uploaded_file_paths', st.session_state.uploaded_file_paths)
+                st.session_state.saved_upload_digests = upload_digests
 
             if len(st.session_state.uploaded_files) >= 1:
                 st.success(f"✅ Successfully processed {len(st.session_state.uploaded_files)} file(s)!")
@@ -900,6 +3995,24 @@ def display_professional_file_upload():
     return len(st.session_state.uploaded_files) > 0
 
 # Enhanced Join Builder with Visual Interface
+def get_join_suggestions() -> List[Dict[str, Any]]:
+    """Ranked join-key suggestions for the uploaded tables, recomputed only when a table changes"""
+    tables = st.session_state.uploaded_files
+    # Fingerprints of spilled tables come from the store, so tables load only when they changed
+    versions = tuple(sorted((name, table_version(tables, name)) for name in tables))
+    cached = st.session_state.get('join_suggestions')
+    if cached is None or cached[0] != versions:
+        cached = (versions, suggest_join_keys(tables))
+        st.session_state.join_suggestions = cached
+    return cached[1]
+
+def apply_join_suggestion(suggestion: Dict[str, Any]):
+    """Pre-fill the join builder with a suggested key pair"""
+    st.session_state.left_table_select = suggestion['left_table']
+    st.session_state.left_column_select = suggestion['left_column']
+    st.session_state.right_table_select = suggestion['right_table']
+    st.session_state.right_column_select = suggestion['right_column']
+
 def display_advanced_join_builder():
     st.markdown("""
     <div class="professional-header fade-in-up">
@@ -932,20 +4045,48 @@ def display_advanced_join_builder():
         st.markdown("### 📊 Available Tables")
 
         table_cols = st.columns(len(st.session_state.uploaded_files))
-        for i, (table_name, df) in enumerate(st.session_state.uploaded_files.items()):
+        for i, table_name in enumerate(st.session_state.uploaded_files):
+            # Row counts and columns come from stored metadata, so spilled tables stay on disk
+            row_count, df = st.session_state.uploaded_files.schema(table_name)
             with table_cols[i]:
                 st.markdown(f"""
                 <div class="info-box">
                     <h4>📋 {table_name}</h4>
-                    <p><strong>Rows:</strong> {len(df):,}</p>
+                    <p><strong>Rows:</strong> {row_count:,}</p>
                     <p><strong>Columns:</strong> {len(df.columns)}</p>
                     <p><strong>Key Columns:</strong> {', '.join(df.columns[:3])}</p>
                 </div>
                 """, unsafe_allow_html=True)
 
+        # Suggested joins, skipping pairs that are already joined
+        joined = {
+            frozenset([(j['left_table'], j['left_column']), (j['right_table'], j['right_column'])])
+            for j in st.session_state.join_conditions
+        }
+        suggestions = [
+            s for s in get_join_suggestions()
+            if frozenset([(s['left_table'], s['left_column']), (s['right_table'], s['right_column'])]) not in joined
+        ]
+        if suggestions:
+            st.markdown("### 💡 Suggested Joins")
+            for i, suggestion in enumerate(suggestions[:5]):
+                col1, col2 = st.columns([5, 1])
+                with col1:
+                    st.markdown(
+                        f"<code>{suggestion['left_table']}.{suggestion['left_column']}</code> → "
+                        f"<code>{suggestion['right_table']}.{suggestion['right_column']}</code> · "
+                        f"{suggestion['containment']:.0%} of values found in the key · "
+                        f"key {suggestion['key_uniqueness']:.0%} unique",
+                        unsafe_allow_html=True
+                    )
+                with col2:
+                    st.button("Use", key=f"use_join_suggestion_{i}", on_click=apply_join_suggestion, args=(suggestion,))
+            st.caption("Estimated from MinHash fingerprints of each column's values")
+
         # Current joins display
         if st.session_state.join_conditions:
             st.markdown("### 🔗 Current Join Conditions")
+            join_estimates = estimate_join_chain(st.session_state.uploaded_files, st.session_state.join_conditions)
 
             for i, join in enumerate(st.session_state.join_conditions):
                 st.markdown(f"""
@@ -963,6 +4104,31 @@ def display_advanced_join_builder():
                 </div>
                 """, unsafe_allow_html=True)
 
+                if i < len(join_estimates):
+                    estimate = join_estimates[i]
+                    st.caption(f"≈ {estimate['rows']:,.0f} rows from this join · ≈ {estimate['chain_rows']:,.0f} rows through join {i+1}")
+                    if estimate['flagged'] and not join.get('safeguard'):
+                        kind = "a many-to-many key" if estimate['many_to_many'] else "this key"
+                        st.warning(
+                            f"⚠️ Join {i+1} on {kind} is estimated to produce {max(estimate['rows'], estimate['chain_rows']):,.0f} rows "
+                            f"(threshold {JOIN_ROW_WARNING:,}). Key '{estimate['heaviest_key']}' alone yields {estimate['heaviest_key_rows']:,.0f}."
+                        )
+                        aggregate_table = join['left_table'] if estimate['aggregate_side'] == 'left' else join['right_table']
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            if st.button(f"🧮 Aggregate {aggregate_table} first", key=f"join_aggregate_{i}"):
+                                join['safeguard'] = 'aggregate'
+                                join['aggregate_side'] = estimate['aggregate_side']
+                                get_session_manager().save_session_data('join_conditions', st.session_state.join_conditions)
+                                st.rerun()
+                        with col2:
+                            if st.button(f"✂️ Add LIMIT {JOIN_SAFE_LIMIT:,}", key=f"join_limit_{i}"):
+                                join['safeguard'] = 'limit'
+                                get_session_manager().save_session_data('join_conditions', st.session_state.join_conditions)
+                                st.rerun()
+                    elif join.get('safeguard'):
+                        st.caption(f"🛡️ Passed to SQL generation: {describe_join_safeguard(join).strip(' ()')}")
+
         # Join builder interface
         st.markdown("### ➕ Add New Join")
 
@@ -981,7 +4147,7 @@ def display_advanced_join_builder():
                 )
 
                 if left_table:
-                    left_columns = list(st.session_state.uploaded_files[left_table].columns)
+                    left_columns = list(st.session_state.uploaded_files.schema(left_table)[1].columns)
                     left_column = st.selectbox(
                         "Select left column:",
                         options=left_columns,
@@ -1005,7 +4171,7 @@ def display_advanced_join_builder():
                 )
 
                 if right_table:
-                    right_columns = list(st.session_state.uploaded_files[right_table].columns)
+                    right_columns = list(st.session_state.uploaded_files.schema(right_table)[1].columns)
                     right_column = st.selectbox(
                         "Select right column:",
                         options=right_columns,
@@ -1036,6 +4202,16 @@ def display_advanced_join_builder():
 
             st.info(f"ℹ️ {join_type_options[join_type]}")
 
+            # Predict the join's output before it is added
+            if left_table and right_table and left_column and right_column:
+                estimate = estimate_join(
+                    st.session_state.uploaded_files, left_table, left_column, right_table, right_column, join_type
+                )
+                if estimate['rows'] > JOIN_ROW_WARNING:
+                    st.warning(f"⚠️ This join is estimated to produce {estimate['rows']:,.0f} rows, above the {JOIN_ROW_WARNING:,}-row threshold")
+                else:
+                    st.caption(f"Estimated output: {estimate['rows']:,.0f} rows")
+
             # Add join button
             col1, col2, col3 = st.columns([1, 1, 1])
             with col2:
@@ -1154,27 +4330,46 @@ def display_professional_sql_generation():
                 st.checkbox("Include data preview", value=True, key="include_preview")
                 st.checkbox("Add comments to SQL", value=True, key="add_comments")
                 st.checkbox("Optimize for performance", value=True, key="optimize_performance")
+                st.checkbox("Stream SQL as it is generated", value=True, key="stream_sql")
+                st.checkbox(
+                    "Reuse SQL from near-duplicate questions",
+                    value=False,
+                    key="reuse_similar_sql",
+                    help="Identical questions over the same tables always reuse cached SQL. This also reuses SQL for questions that differ only slightly in wording."
+                )
 
             with col2:
                 st.selectbox("SQL Style", ["Standard", "Compact", "Verbose"], key="sql_style")
+                engine_names = list(SQL_ENGINES.keys())
+                # Out-of-core tables exist only in the disk engine's database
+                disk_backed = bool(st.session_state.get('disk_tables'))
+                current_engine = DiskEngine.name if disk_backed else st.session_state.get('sql_engine_name', SQLiteEngine.name)
+                st.session_state.sql_engine_name = st.selectbox(
+                    "Execution Engine",
+                    options=engine_names,
+                    index=engine_names.index(current_engine) if current_engine in engine_names else 0,
+                    key="sql_engine_select",
+                    disabled=disk_backed,
+                    help="SQLite copies tables into a row store; DuckDB queries the uploaded DataFrames in place with a columnar engine; Disk keeps tables and results in an on-disk database. The generated SQL uses the selected engine's dialect."
+                )
                 st.number_input("Limit results to:", min_value=0, max_value=10000, value=1000, key="result_limit")
 
         # Generate SQL button
         col1, col2, col3 = st.columns([1, 1, 1])
+        live_sql_placeholder = st.empty()
         with col2:
             if st.button("🤖 Generate SQL Query", key="generate_sql_btn", type="primary"):
                 if natural_query.strip():
                     with st.spinner("🧠 AI is analyzing your request and generating SQL..."):
-                        # Show progress
-                        progress_bar = st.progress(0)
-                        for i in range(100):
-                            time.sleep(0.01)
-                            progress_bar.progress(i + 1)
-
                         # Prepare table schemas
                         table_schemas = {}
-                        for table_name, df in st.session_state.uploaded_files.items():
-                            schema = ", ".join([f"{col} ({df[col].dtype})" for col in df.columns])
+                        tables = st.session_state.uploaded_files
+                        for table_name in tables:
+                            _, df = tables.schema(table_name)
+                            semantic_types = get_semantic_types(
+                                lambda table_name=table_name: tables[table_name], table_version=tables.fingerprint(table_name)
+                            )['types']
+                            schema = ", ".join([f"{col} ({df[col].dtype}, {semantic_types.get(col, 'text')})" for col in df.columns])
                             table_schemas[table_name] = schema
 
                         # Generate SQL
@@ -1182,14 +4377,28 @@ def display_professional_sql_generation():
                             natural_query,
                             table_schemas,
                             st.session_state.join_conditions,
-                            st.session_state.bedrock_client
+                            st.session_state.bedrock_client,
+                            sql_dialect=get_sql_dialect(),
+                            allow_similar_cached=st.session_state.get('reuse_similar_sql', False),
+                            on_partial_sql=(
+                                (lambda partial_sql: live_sql_placeholder.code(partial_sql, language='sql'))
+                                if st.session_state.get('stream_sql', True) else None
+                            )
                         )
+                        live_sql_placeholder.empty()
 
                         if sql_query:
                             st.session_state.sql_query = sql_query
+                            # Show the new query in the editor below
+                            st.session_state.sql_editor = sql_query
                             st.success("✅ SQL query generated successfully!")
 
-                        progress_bar.empty()
+                            metrics = st.session_state.get('last_generation_metrics')
+                            if metrics:
+                                st.caption(
+                                    f"⏱️ First token: {metrics['time_to_first_token']:.2f}s · "
+                                    f"Total: {metrics['total_latency']:.2f}s"
+                                )
                 else:
                     st.error("❌ Please enter a natural language query!")
 
@@ -1198,10 +4407,11 @@ def display_professional_sql_generation():
             st.markdown("### ✏️ SQL Query Editor")
             st.info("💡 You can edit the generated SQL query below before execution")
 
-            # SQL editor with syntax highlighting
+            # SQL editor with syntax highlighting; its session key alone sets the text
+            if 'sql_editor' not in st.session_state:
+                st.session_state.sql_editor = st.session_state.sql_query
             edited_sql = st.text_area(
                 "📝 SQL Query:",
-                value=st.session_state.sql_query,
                 height=300,
                 key="sql_editor",
                 help="Edit the SQL query if needed. The query will be validated before execution."
@@ -1290,40 +4500,92 @@ def display_professional_results():
         # Query execution section
         st.markdown("### ⚡ Query Execution")
 
+        run_query = st.session_state.pop('run_query_now', False)
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             if st.button("▶️ Execute SQL Query", key="execute_query_btn", type="primary", use_container_width=True):
-                with st.spinner("🔄 Executing query and preparing visualizations..."):
-                    # Execute query
-                    result = execute_sql_query(st.session_state.sql_query, st.session_state.uploaded_files)
+                # Hold back unbounded multi-join queries predicted to explode
+                query_lower = st.session_state.sql_query.lower()
+                risky_joins = []
+                if 'join' in query_lower and 'limit' not in query_lower and 'group by' not in query_lower:
+                    risky_joins = [e for e in query_join_estimates(st.session_state.sql_query) if e['flagged']]
+                st.session_state.risky_join_estimates = (st.session_state.sql_query, risky_joins)
+                run_query = not risky_joins
+
+        # The warning belongs to the query it was raised for
+        risky_query, risky_joins = st.session_state.get('risky_join_estimates') or (None, [])
+        if risky_joins and risky_query == st.session_state.sql_query:
+            predicted_rows = max(max(e['rows'], e['chain_rows']) for e in risky_joins)
+            st.warning(
+                f"⚠️ The joins in this query are estimated to produce {predicted_rows:,.0f} rows, "
+                f"above the {JOIN_ROW_WARNING:,}-row threshold. Limit the output or aggregate before joining."
+            )
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if st.button(f"✂️ Add LIMIT {JOIN_SAFE_LIMIT:,} and run", key="limit_and_run_btn"):
+                    st.session_state.sql_query = add_limit(st.session_state.sql_query)
+                    st.session_state.risky_join_estimates = None
+                    st.session_state.run_query_now = True
+                    st.rerun()
+            with col2:
+                if st.button("🧮 Regenerate with aggregation first", key="aggregate_first_btn"):
+                    for estimate in risky_joins:
+                        estimate['join']['safeguard'] = 'aggregate'
+                        estimate['join']['aggregate_side'] = estimate['aggregate_side']
+                    get_session_manager().save_session_data('join_conditions', st.session_state.join_conditions)
+                    st.session_state.risky_join_estimates = None
+                    st.session_state.sql_query = ""
+                    st.session_state.current_stage = 3
+                    st.rerun()
+            with col3:
+                if st.button("▶️ Run anyway", key="run_anyway_btn"):
+                    st.session_state.risky_join_estimates = None
+                    st.session_state.run_query_now = True
+                    st.rerun()
 
-                    if result is not None and not result.empty:
+        if run_query:
+            with st.spinner("🔄 Executing query and preparing visualizations..."):
+                # Execute query
+                result = execute_sql_query(st.session_state.sql_query, st.session_state.uploaded_files)
+
+                if result is not None and not result.empty:
+                    # A cache hit for the result already on screen needs no re-save
+                    if result is not st.session_state.query_result:
                         st.session_state.query_result = result
+                        table_manager = get_table_manager()
+                        table_manager.track_result(current_session_id(), result)
+                        table_manager.enforce_budget()
 
                         # Save to session
                         session_manager = get_session_manager()
                         session_manager.save_session_data('query_result', result)
 
-                        st.success(f"✅ Query executed successfully! Retrieved {len(result):,} rows")
-                    else:
-                        st.error("❌ Query execution failed or returned no results")
+                    st.success(f"✅ Query executed successfully! Retrieved {get_result_cursor(result).count():,} rows")
+                else:
+                    st.error("❌ Query execution failed or returned no results")
 
         # Display current query
         with st.expander("📝 Current Query", expanded=False):
             st.code(st.session_state.sql_query, language='sql')
+            st.caption(f"Execution engine: {st.session_state.get('sql_engine_name', SQLiteEngine.name)}")
 
         # Results display
         if st.session_state.query_result is not None:
             result_data = st.session_state.query_result
+            # Out-of-core results: result_data is a bounded preview of the on-disk result
+            query_cursor = get_result_cursor(result_data)
+            result_rows = query_cursor.count()
 
             # Results summary
             st.markdown("### 📈 Results Overview")
+            if result_rows > len(result_data):
+                st.caption(f"💽 {result_rows:,} rows stay on disk; visualizations, statistics and quality checks use the first {len(result_data):,}")
 
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 st.markdown(f"""
                 <div class="metric-card">
-                    <div class="metric-value">{len(result_data):,}</div>
+                    <div class="metric-value">{result_rows:,}</div>
                     <div class="metric-label">Total Rows</div>
                 </div>
                 """, unsafe_allow_html=True)
@@ -1355,39 +4617,43 @@ def display_professional_results():
                 """, unsafe_allow_html=True)
 
             # Enhanced Tabs for different views
+            # Tab switches rerun the script, and only the open tab's content is computed
             tab1, tab2, tab3, tab4, tab5 = st.tabs([
                 "📋 Data Table", 
                 "📊 Dynamic Visualizations", 
                 "📈 Statistical Summary", 
                 "🔍 Data Quality",
                 "📥 Export Options"
-            ])
+            ], key="results_tabs", on_change="rerun")
 
             with tab1:
                 st.markdown("### 📋 Query Results Table")
 
                 # Table controls
-                col1, col2, col3 = st.columns([2, 1, 1])
+                col1, col2, col3, col4, col5 = st.columns([2, 1, 1, 1, 1])
                 with col1:
                     search_term = st.text_input("🔍 Search in results:", key="search_results")
                 with col2:
-                    rows_to_show = st.selectbox("Rows to display:", [10, 25, 50, 100, "All"], index=1)
+                    search_column = st.selectbox("Search in:", options=["All columns"] + list(result_data.columns), key="search_column")
+                    search_column = None if search_column == "All columns" else search_column
                 with col3:
+                    rows_to_show = st.selectbox("Rows per page:", [10, 25, 50, 100, 500], index=1)
+                with col4:
                     sort_column = st.selectbox("Sort by:", options=[""] + list(result_data.columns))
-
-                # Filter data based on search
-                display_data = result_data.copy()
-                if search_term:
-                    mask = display_data.astype(str).apply(lambda x: x.str.contains(search_term, case=False, na=False)).any(axis=1)
-                    display_data = display_data[mask]
-
-                # Sort data
-                if sort_column:
-                    display_data = display_data.sort_values(by=sort_column)
-
-                # Limit rows
-                if rows_to_show != "All":
-                    display_data = display_data.head(int(rows_to_show))
+                with col5:
+                    sort_ascending = st.selectbox("Order:", ["Ascending", "Descending"]) == "Ascending"
+
+                # Only the requested page leaves the engine; search, sort and counts run in the cursor
+                matching_rows = query_cursor.count(search_term or None, search_column)
+                page_count = max(1, -(-matching_rows // rows_to_show))
+                if st.session_state.get('result_page', 1) > page_count:
+                    st.session_state.result_page = page_count
+                page = st.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, key="result_page")
+                display_data = query_cursor.page(
+                    (page - 1) * rows_to_show, rows_to_show,
+                    sort_by=sort_column or None, ascending=sort_ascending,
+                    search=search_term or None, search_column=search_column
+                )
 
                 # Display table with enhanced formatting
                 st.dataframe(
@@ -1397,261 +4663,323 @@ def display_professional_results():
                 )
 
                 # Pagination info
-                if len(display_data) < len(result_data):
-                    st.info(f"Showing {len(display_data):,} of {len(result_data):,} rows")
+                if search_term and matching_rows == 0:
+                    st.info(f"No rows match '{search_term}'")
+                elif len(display_data) < result_rows:
+                    first_row = (page - 1) * rows_to_show + 1
+                    matching = f" ({matching_rows:,} matching)" if search_term else ""
+                    st.info(f"Showing rows {first_row:,}-{first_row + len(display_data) - 1:,} of {result_rows:,}{matching}")
 
             with tab2:
-                st.markdown("### 📊 Dynamic Interactive Visualizations")
-
-                # Visualization controls
-                col1, col2 = st.columns([1, 1])
-                with col1:
-                    auto_generate = st.checkbox("🔄 Auto-generate visualizations", value=True)
-                with col2:
-                    show_advanced = st.checkbox("⚙️ Show advanced options", value=False)
-
-                if show_advanced:
-                    with st.expander("🎨 Visualization Settings", expanded=False):
-                        viz_settings = st.session_state.get('visualization_settings', {})
-
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            color_scheme = st.selectbox(
-                                "Color Scheme:",
-                                options=['plotly', 'viridis', 'plasma', 'inferno', 'rainbow'],
-                                index=0
-                            )
-                        with col2:
-                            chart_height = st.slider("Chart Height:", 300, 800, 500)
-
-                        animations = st.checkbox("Enable animations", value=True)
-                        interactive = st.checkbox("Enable interactivity", value=True)
-
-                        # Update settings
-                        viz_settings.update({
-                            'color_scheme': color_scheme,
-                            'chart_height': chart_height,
-                            'animations': animations,
-                            'interactive': interactive
-                        })
-                        st.session_state.visualization_settings = viz_settings
-
-                if auto_generate:
-                    # Generate dynamic visualizations
-                    charts = create_dynamic_visualizations(result_data, "Query Results")
-
-                    if charts:
-                        # Display charts in a grid
-                        chart_cols = st.columns(2)
-
-                        for i, (chart_name, chart_fig) in enumerate(charts):
-                            with chart_cols[i % 2]:
-                                st.markdown(f'<div class="chart-container">', unsafe_allow_html=True)
-                                st.markdown(f"#### {chart_name}")
-                                st.plotly_chart(chart_fig, use_container_width=True, key=f"chart_{i}")
-                                st.markdown('</div>', unsafe_allow_html=True)
-                    else:
-                        st.info("📊 No suitable visualizations available for this data structure.")
-
-                        # Manual chart builder
-                        st.markdown("#### 🛠️ Manual Chart Builder")
-                        chart_type = st.selectbox("Chart Type:", ['bar', 'line', 'scatter', 'pie'])
-
-                        numeric_cols = result_data.select_dtypes(include=[np.number]).columns.tolist()
-                        categorical_cols = result_data.select_dtypes(include=['object', 'category']).columns.tolist()
-
-                        if chart_type in ['bar', 'line', 'scatter'] and numeric_cols and categorical_cols:
-                            x_col = st.selectbox("X-axis:", categorical_cols + numeric_cols)
-                            y_col = st.selectbox("Y-axis:", numeric_cols)
-
-                            if st.button("Generate Chart"):
-                                if chart_type == 'bar':
-                                    fig = px.bar(result_data, x=x_col, y=y_col)
-                                elif chart_type == 'line':
-                                    fig = px.line(result_data, x=x_col, y=y_col)
-                                elif chart_type == 'scatter':
-                                    fig = px.scatter(result_data, x=x_col, y=y_col)
-
-                                st.plotly_chart(fig, use_container_width=True)
+                if tab2.open:
+                    st.markdown("### 📊 Dynamic Interactive Visualizations")
+
+                    # Visualization controls
+                    col1, col2 = st.columns([1, 1])
+                    with col1:
+                        auto_generate = st.checkbox("🔄 Auto-generate visualizations", value=True)
+                    with col2:
+                        show_advanced = st.checkbox("⚙️ Show advanced options", value=False)
+
+                    if show_advanced:
+                        with st.expander("🎨 Visualization Settings", expanded=False):
+                            viz_settings = st.session_state.get('visualization_settings', {})
+
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                color_scheme = st.selectbox(
+                                    "Color Scheme:",
+                                    options=['plotly', 'viridis', 'plasma', 'inferno', 'rainbow'],
+                                    index=0
+                                )
+                            with col2:
+                                chart_height = st.slider("Chart Height:", 300, 800, 500)
+
+                            animations = st.checkbox("Enable animations", value=True)
+                            interactive = st.checkbox("Enable interactivity", value=True)
+
+                            # Update settings
+                            viz_settings.update({
+                                'color_scheme': color_scheme,
+                                'chart_height': chart_height,
+                                'animations': animations,
+                                'interactive': interactive
+                            })
+                            st.session_state.visualization_settings = viz_settings
+
+                    if auto_generate:
+                        chart_names = available_charts(result_data)
+                        if chart_names and len(result_data) > CHART_POINT_LIMIT:
+                            st.caption(f"Charts over {CHART_POINT_LIMIT:,} rows are downsampled or pre-aggregated; each subtitle shows how many points were dropped")
+
+                        if chart_names:
+                            # Display charts in a grid
+                            chart_cols = st.columns(2)
+                            chart_height = st.session_state.get('visualization_settings', {}).get('chart_height', 'content')
+
+                            for i, chart_name in enumerate(chart_names):
+                                with chart_cols[i % 2]:
+                                    # A chart is built only while its expander is open; built figures are cached per result
+                                    chart_expander = st.expander(chart_name, expanded=i < 2, key=f"chart_expander_{i}", on_change="rerun")
+                                    with chart_expander:
+                                        if chart_expander.open:
+                                            chart_options = {}
+                                            if chart_name == "📊 Histogram Analysis":
+                                                chart_options['bins'] = st.slider("Bins:", 10, 100, 30, key="histogram_bins")
+                                            elif chart_name == "🔍 Advanced Scatter Plot":
+                                                chart_options['trendline'] = st.checkbox("Show trendline", value=True, key="scatter_trendline")
+
+                                            st.markdown(f'<div class="chart-container">', unsafe_allow_html=True)
+                                            st.plotly_chart(
+                                                get_chart_figure(result_data, chart_name, chart_options),
+                                                use_container_width=True, height=chart_height, key=f"chart_{i}"
+                                            )
+                                            st.markdown('</div>', unsafe_allow_html=True)
+                        else:
+                            st.info("📊 No suitable visualizations available for this data structure.")
+
+                            # Manual chart builder
+                            st.markdown("#### 🛠️ Manual Chart Builder")
+                            chart_type = st.selectbox("Chart Type:", ['bar', 'line', 'scatter', 'pie'])
+
+                            numeric_cols = result_data.select_dtypes(include=[np.number]).columns.tolist()
+                            categorical_cols = result_data.select_dtypes(include=['object', 'category']).columns.tolist()
+
+                            if chart_type in ['bar', 'line', 'scatter'] and numeric_cols and categorical_cols:
+                                x_col = st.selectbox("X-axis:", categorical_cols + numeric_cols)
+                                y_col = st.selectbox("Y-axis:", numeric_cols)
+
+                                if st.button("Generate Chart"):
+                                    chart_data = result_data
+                                    if len(result_data) > CHART_POINT_LIMIT:
+                                        # Same bounds as the automatic charts: sum bars, downsample lines, sample points
+                                        if chart_type == 'scatter':
+                                            chart_data = result_data.sample(CHART_POINT_LIMIT, random_state=0)
+                                        elif chart_type == 'line' and x_col in numeric_cols:
+                                            x_values, y_values, _ = downsample_series(result_data[x_col], result_data[y_col])
+                                            chart_data = pd.DataFrame({x_col: x_values.to_numpy(), y_col: y_values.to_numpy()})
+                                        else:
+                                            sums = result_data.groupby(x_col, sort=True, observed=True)[y_col].sum()
+                                            chart_data = pd.DataFrame({x_col: sums.index, y_col: sums.to_numpy()})
+                                        st.caption(f"{len(chart_data):,} of {len(result_data):,} points drawn")
+
+                                    if chart_type == 'bar':
+                                        fig = px.bar(chart_data, x=x_col, y=y_col)
+                                    elif chart_type == 'line':
+                                        fig = px.line(chart_data, x=x_col, y=y_col)
+                                    elif chart_type == 'scatter':
+                                        fig = px.scatter(chart_data, x=x_col, y=y_col)
+
+                                    st.plotly_chart(fig, use_container_width=True)
 
             with tab3:
-                st.markdown("### 📈 Statistical Analysis")
-
-                # Numeric statistics
-                numeric_data = result_data.select_dtypes(include=[np.number])
-                if not numeric_data.empty:
-                    st.markdown("#### 🔢 Numeric Columns Summary")
-
-                    stats_df = numeric_data.describe()
-                    st.dataframe(stats_df.round(2), use_container_width=True)
+                if tab3.open:
+                    st.markdown("### 📈 Statistical Analysis")
+
+                    # Numeric statistics
+                    numeric_data = result_data.select_dtypes(include=[np.number])
+                    if not numeric_data.empty:
+                        st.markdown("#### 🔢 Numeric Columns Summary")
+
+                        stats_df = numeric_data.describe()
+                        st.dataframe(stats_df.round(2), use_container_width=True)
+
+                        # Distribution plots
+                        if len(numeric_data.columns) > 0:
+                            selected_col = st.selectbox("Analyze distribution for:", numeric_data.columns)
+
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                # Histogram, binned in NumPy
+                                fig_hist = binned_histogram_figure(result_data[selected_col])
+                                fig_hist.update_layout(title=f"Distribution of {selected_col}", showlegend=False, bargap=0)
+                                st.plotly_chart(fig_hist, use_container_width=True)
+
+                            with col2:
+                                # Box plot from precomputed quartiles
+                                fig_box, outliers = summarized_box_figure(result_data[selected_col])
+                                fig_box.update_layout(
+                                    title=f"Box Plot of {selected_col}<br><sup>{outliers:,} outliers not drawn</sup>",
+                                    showlegend=False
+                                )
+                                st.plotly_chart(fig_box, use_container_width=True)
+
+                    # Categorical statistics
+                    categorical_data = result_data.select_dtypes(include=['object', 'category'])
+                    if not categorical_data.empty:
+                        st.markdown("#### 📊 Categorical Columns Summary")
+
+                        for col in categorical_data.columns[:5]:  # Limit to first 5
+                            st.markdown(f"**{col}:**")
+                            value_counts, overcount = top_values(categorical_data[col])
+
+                            col1, col2 = st.columns([2, 1])
+                            with col1:
+                                st.dataframe(value_counts, use_container_width=True)
+                                if overcount is not None:
+                                    st.caption(f"Space-Saving estimates: each count may be over by up to {overcount:,}")
+                            with col2:
+                                # Pie chart for categorical
+                                if len(value_counts) <= 10:
+                                    fig_pie = px.pie(
+                                        values=value_counts.values,
+                                        names=value_counts.index,
+                                        title=f"{col} Distribution"
+                                    )
+                                    st.plotly_chart(fig_pie, use_container_width=True)
 
-                    # Distribution plots
-                    if len(numeric_data.columns) > 0:
-                        selected_col = st.selectbox("Analyze distribution for:", numeric_data.columns)
+            with tab4:
+                if tab4.open:
+                    st.markdown("### 🔍 Data Quality Assessment")
+
+                    # Missing values analysis
+                    missing_data = result_data.isnull().sum()
+                    missing_pct = (missing_data / len(result_data)) * 100
+
+                    if missing_data.sum() > 0:
+                        st.markdown("#### ⚠️ Missing Values")
+                        missing_df = pd.DataFrame({
+                            'Column': missing_data.index,
+                            'Missing Count': missing_data.values,
+                            'Missing %': missing_pct.values
+                        })
+                        missing_df = missing_df[missing_df['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
 
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            # Histogram
-                            fig_hist = px.histogram(
-                                result_data, 
-                                x=selected_col, 
-                                title=f"Distribution of {selected_col}",
-                                marginal="box"
-                            )
-                            st.plotly_chart(fig_hist, use_container_width=True)
+                        st.dataframe(missing_df, use_container_width=True)
 
-                        with col2:
-                            # Box plot
-                            fig_box = px.box(
-                                result_data, 
-                                y=selected_col, 
-                                title=f"Box Plot of {selected_col}"
+                        # Visualization of missing data
+                        if len(missing_df) > 0:
+                            fig_missing = px.bar(
+                                missing_df, 
+                                x='Column', 
+                                y='Missing %',
+                                title="Missing Data by Column"
                             )
-                            st.plotly_chart(fig_box, use_container_width=True)
-
-                # Categorical statistics
-                categorical_data = result_data.select_dtypes(include=['object', 'category'])
-                if not categorical_data.empty:
-                    st.markdown("#### 📊 Categorical Columns Summary")
-
-                    for col in categorical_data.columns[:5]:  # Limit to first 5
-                        st.markdown(f"**{col}:**")
-                        value_counts = categorical_data[col].value_counts().head(10)
-
-                        col1, col2 = st.columns([2, 1])
-                        with col1:
-                            st.dataframe(value_counts, use_container_width=True)
-                        with col2:
-                            # Pie chart for categorical
-                            if len(value_counts) <= 10:
-                                fig_pie = px.pie(
-                                    values=value_counts.values,
-                                    names=value_counts.index,
-                                    title=f"{col} Distribution"
-                                )
-                                st.plotly_chart(fig_pie, use_container_width=True)
+                            st.plotly_chart(fig_missing, use_container_width=True)
+                    else:
+                        st.success("✅ No missing values detected in the results!")
 
-            with tab4:
-                st.markdown("### 🔍 Data Quality Assessment")
-
-                # Missing values analysis
-                missing_data = result_data.isnull().sum()
-                missing_pct = (missing_data / len(result_data)) * 100
-
-                if missing_data.sum() > 0:
-                    st.markdown("#### ⚠️ Missing Values")
-                    missing_df = pd.DataFrame({
-                        'Column': missing_data.index,
-                        'Missing Count': missing_data.values,
-                        'Missing %': missing_pct.values
+                    # Duplicate analysis
+                    duplicates = result_data.duplicated().sum()
+                    if duplicates > 0:
+                        st.warning(f"⚠️ Found {duplicates} duplicate rows in the results")
+                    else:
+                        st.success("✅ No duplicate rows found!")
+
+                    # Data types info
+                    st.markdown("#### 📋 Data Types Information")
+                    unique_counts, distinct_error = distinct_counts(result_data)
+                    dtypes_df = pd.DataFrame({
+                        'Column': result_data.columns,
+                        'Data Type': result_data.dtypes,
+                        'Unique Values (est.)' if distinct_error else 'Unique Values': unique_counts,
+                        'Sample Value': [str(result_data[col].iloc[0]) if len(result_data) > 0 else 'N/A' for col in result_data.columns]
                     })
-                    missing_df = missing_df[missing_df['Missing Count'] > 0].sort_values('Missing Count', ascending=False)
+                    st.dataframe(dtypes_df, use_container_width=True)
+                    if distinct_error:
+                        st.caption(f"Distinct counts above {SKETCH_ROW_THRESHOLD:,} rows are HyperLogLog estimates, within ±{distinct_error:.1%} at 95% confidence")
 
-                    st.dataframe(missing_df, use_container_width=True)
+            with tab5:
+                if tab5.open:
+                    st.markdown("### 📥 Export and Download Options")
+                    st.caption("Files are generated when a download is clicked, streamed to disk in chunks, and reused for repeat downloads of the same result")
 
-                    # Visualization of missing data
-                    if len(missing_df) > 0:
-                        fig_missing = px.bar(
-                            missing_df, 
-                            x='Column', 
-                            y='Missing %',
-                            title="Missing Data by Column"
-                        )
-                        st.plotly_chart(fig_missing, use_container_width=True)
-                else:
-                    st.success("✅ No missing values detected in the results!")
+                    compress_exports = st.checkbox("🗜️ Gzip-compress CSV and JSON", value=False, key="export_gzip")
 
-                # Duplicate analysis
-                duplicates = result_data.duplicated().sum()
-                if duplicates > 0:
-                    st.warning(f"⚠️ Found {duplicates} duplicate rows in the results")
-                else:
-                    st.success("✅ No duplicate rows found!")
-
-                # Data types info
-                st.markdown("#### 📋 Data Types Information")
-                dtypes_df = pd.DataFrame({
-                    'Column': result_data.columns,
-                    'Data Type': result_data.dtypes,
-                    'Unique Values': result_data.nunique(),
-                    'Sample Value': [str(result_data[col].iloc[0]) if len(result_data) > 0 else 'N/A' for col in result_data.columns]
-                })
-                st.dataframe(dtypes_df, use_container_width=True)
+                    # Export formats
+                    col1, col2, col3 = st.columns(3)
 
-            with tab5:
-                st.markdown("### 📥 Export and Download Options")
+                    with col1:
+                        # CSV Export
+                        st.download_button(
+                            label="📄 Download as CSV",
+                            data=export_generator(query_cursor, 'csv', compress_exports),
+                            file_name=export_file_name('csv', compress_exports),
+                            mime='application/gzip' if compress_exports else EXPORT_FORMATS['csv']['mime'],
+                            key="download_csv",
+                            on_click="ignore",
+                            use_container_width=True
+                        )
 
-                # Export formats
-                col1, col2, col3 = st.columns(3)
+                    with col2:
+                        # Excel Export
+                        excel_note = f"Sheets stop at {EXCEL_MAX_ROWS:,} rows" if result_rows > EXCEL_MAX_ROWS else None
+                        st.download_button(
+                            label="📊 Download as Excel",
+                            data=export_generator(query_cursor, 'xlsx') if openpyxl is not None else b"",
+                            file_name=export_file_name('xlsx', False),
+                            mime=EXPORT_FORMATS['xlsx']['mime'],
+                            key="download_excel",
+                            on_click="ignore",
+                            disabled=openpyxl is None,
+                            help="Requires openpyxl" if openpyxl is None else excel_note,
+                            use_container_width=True
+                        )
 
-                with col1:
-                    # CSV Export
-                    csv_data = result_data.to_csv(index=False)
-                    st.download_button(
-                        label="📄 Download as CSV",
-                        data=csv_data,
-                        file_name=f"query_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv",
-                        key="download_csv",
-                        use_container_width=True
-                    )
+                    with col3:
+                        # JSON Export
+                        st.download_button(
+                            label="📋 Download as JSON",
+                            data=export_generator(query_cursor, 'json', compress_exports),
+                            file_name=export_file_name('json', compress_exports),
+                            mime='application/gzip' if compress_exports else EXPORT_FORMATS['json']['mime'],
+                            key="download_json",
+                            on_click="ignore",
+                            use_container_width=True
+                        )
 
-                with col2:
-                    # Excel Export
-                    excel_buffer = io.BytesIO()
-                    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-                        result_data.to_excel(writer, sheet_name='Query_Results', index=False)
-
-                        # Add summary sheet if numeric data exists
-                        numeric_data = result_data.select_dtypes(include=[np.number])
-                        if not numeric_data.empty:
-                            numeric_data.describe().to_excel(writer, sheet_name='Summary_Statistics')
-
-                    st.download_button(
-                        label="📊 Download as Excel",
-                        data=excel_buffer.getvalue(),
-                        file_name=f"query_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        key="download_excel",
-                        use_container_width=True
-                    )
+                    # Columnar formats keep column types and load back without parsing
+                    col1, col2 = st.columns(2)
 
-                with col3:
-                    # JSON Export
-                    json_data = result_data.to_json(orient='records', indent=2)
-                    st.download_button(
-                        label="📋 Download as JSON",
-                        data=json_data,
-                        file_name=f"query_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                        mime="application/json",
-                        key="download_json",
-                        use_container_width=True
-                    )
+                    with col1:
+                        st.download_button(
+                            label="🧱 Download as Parquet",
+                            data=export_generator(query_cursor, 'parquet') if pa is not None else b"",
+                            file_name=export_file_name('parquet', False),
+                            mime=EXPORT_FORMATS['parquet']['mime'],
+                            key="download_parquet",
+                            on_click="ignore",
+                            disabled=pa is None,
+                            help="Requires pyarrow" if pa is None else None,
+                            use_container_width=True
+                        )
 
-                # Advanced export options
-                with st.expander("⚙️ Advanced Export Options", expanded=False):
-                    export_rows = st.number_input(
-                        "Limit export to rows:", 
-                        min_value=1, 
-                        max_value=len(result_data), 
-                        value=min(1000, len(result_data))
-                    )
+                    with col2:
+                        st.download_button(
+                            label="🏹 Download as Arrow IPC",
+                            data=export_generator(query_cursor, 'arrow') if pa is not None else b"",
+                            file_name=export_file_name('arrow', False),
+                            mime=EXPORT_FORMATS['arrow']['mime'],
+                            key="download_arrow",
+                            on_click="ignore",
+                            disabled=pa is None,
+                            help="Requires pyarrow" if pa is None else None,
+                            use_container_width=True
+                        )
 
-                    selected_columns = st.multiselect(
-                        "Select columns to export:",
-                        options=result_data.columns.tolist(),
-                        default=result_data.columns.tolist()
-                    )
+                    # Advanced export options
+                    with st.expander("⚙️ Advanced Export Options", expanded=False):
+                        export_rows = st.number_input(
+                            "Limit export to rows:", 
+                            min_value=1, 
+                            max_value=result_rows, 
+                            value=min(1000, result_rows)
+                        )
 
-                    if st.button("📦 Generate Custom Export"):
-                        export_data = result_data[selected_columns].head(export_rows)
-                        custom_csv = export_data.to_csv(index=False)
+                        selected_columns = st.multiselect(
+                            "Select columns to export:",
+                            options=result_data.columns.tolist(),
+                            default=result_data.columns.tolist()
+                        )
 
                         st.download_button(
                             label="📥 Download Custom CSV",
-                            data=custom_csv,
-                            file_name=f"custom_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                            mime="text/csv"
+                            data=export_generator(query_cursor, 'csv', compress_exports, selected_columns, int(export_rows)),
+                            file_name=export_file_name('csv', compress_exports, prefix='custom_export'),
+                            mime='application/gzip' if compress_exports else EXPORT_FORMATS['csv']['mime'],
+                            key="download_custom_csv",
+                            on_click="ignore",
+                            disabled=not selected_columns
                         )
 
         # Navigation buttons
@@ -1664,6 +4992,8 @@ def display_professional_results():
         with col2:
             if st.button("🔄 New Analysis", key="restart_analysis"):
                 # Clear all data for new analysis
+                close_sql_engine()
+                discard_out_of_core_tables()
                 keys_to_clear = ['uploaded_files', 'join_conditions', 'sql_query', 'query_result']
                 for key in keys_to_clear:
                     if key in st.session_state:
@@ -1679,7 +5009,7 @@ def display_professional_results():
                     'uploaded_files': list(st.session_state.uploaded_files.keys()),
                     'join_conditions': st.session_state.join_conditions,
                     'sql_query': st.session_state.sql_query,
-                    'result_count': len(st.session_state.query_result) if st.session_state.query_result is not None else 0
+                    'result_count': get_result_cursor(st.session_state.query_result).count() if st.session_state.query_result is not None else 0
                 }
                 session_manager.save_session_data('session_summary', session_data)
                 st.success("✅ Session saved successfully!")
@@ -1774,11 +5104,42 @@ def display_professional_sidebar():
             st.metric("🔗 Joins", len(st.session_state.join_conditions))
 
         if st.session_state.query_result is not None:
-            st.metric("📋 Result Rows", len(st.session_state.query_result))
+            st.metric("📋 Result Rows", get_result_cursor(st.session_state.query_result).count())
 
         if st.session_state.get('query_history'):
             st.metric("📚 Query History", len(st.session_state.query_history))
 
+        compaction = st.session_state.get('memory_compaction', {})
+        compacted = list(compaction.get('tables', {}).values()) + ([compaction['result']] if compaction.get('result') else [])
+        if compacted:
+            memory_before = sum(before for before, _ in compacted)
+            memory_after = sum(after for _, after in compacted)
+            st.metric(
+                "🗜️ Compacted", f"{memory_after / (1024*1024):.1f} MB",
+                delta=f"-{(memory_before - memory_after) / (1024*1024):.1f} MB from {memory_before / (1024*1024):.1f} MB",
+                delta_color="inverse",
+                help="Uploaded tables and the current result after compaction: repeated strings stored as categories, "
+                     "integers in results narrowed to their smallest width and ISO dates in results parsed once."
+            )
+
+        table_manager = get_table_manager()
+        session_bytes = table_manager.session_bytes(current_session_id())
+        if session_bytes:
+            st.metric(
+                "🧠 Memory", f"{session_bytes / (1024*1024):.1f} MB",
+                help=f"Tables and result held in memory by this session. All sessions: "
+                     f"{table_manager.total_bytes() / (1024*1024):.1f} of {TABLE_MEMORY_BUDGET_MB:,} MB "
+                     f"(NLP_SQL_TABLE_MEMORY_MB); least recently used tables beyond that are spilled to disk."
+            )
+
+        result_cache = get_result_cache()
+        if result_cache.hits or result_cache.misses:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("⚡ Cache Hits", result_cache.hits)
+            with col2:
+                st.metric("🐢 Cache Misses", result_cache.misses)
+
         st.markdown("---")
 
         # Help Section
@@ -1821,6 +5182,8 @@ def display_professional_sidebar():
 def main():
     # Initialize session state
     initialize_session_state()
+    if st.session_state.pop('session_expired', False):
+        st.info(f"⏰ This session was idle for over {SESSION_EXPIRE_HOURS} hours and its data was cleared. Please upload your files again.")
 
     # Update last activity
     st.session_state.last_activity = datetime.now().isoformat()
@@ -195,6 +195,10 @@ def load_file(file_obj):
             return pd.read_excel(file_obj)
         elif file_obj.name.lower().endswith('.csv'):
             return pd.read_csv(file_obj)
+        elif file_obj.name.lower().endswith('.parquet'):
+            return pd.read_parquet(file_obj)
+        elif file_obj.name.lower().endswith(('.arrow', '.feather', '.ipc')):
+            return pd.read_feather(file_obj)
         else:
             st.error(f"Unsupported file format: {file_obj.name}")
             return None
@@ -215,25 +219,218 @@ def process_uploaded_files(uploaded_files):
     return processed_files
 
 # Join Functions
-def perform_join(left_df, right_df, left_key, right_key, join_type, left_name, right_name):
+def as_key_list(keys):
+    """Accept a single join key or a list of keys"""
+    return [keys] if isinstance(keys, str) else list(keys)
+
+def column_values(series):
+    """A column's values as a NumPy array, or its extension array for pandas-specific dtypes"""
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+def take_rows(values, positions):
+    """Gather values by row position; None keeps every row in place and -1 gives a missing value"""
+    if positions is None:
+        return values
+    if len(positions) and positions.min() < 0:
+        return pd.api.extensions.take(values, positions, allow_fill=True)
+    return values.take(positions)
+
+def shared_key_codes(left_values, right_values, sort):
+    """
+    Integer codes for one key column on both sides, equal where the keys are equal and in key
+    order when sort is set, plus the number of codes. Missing keys share the last code, so they
+    match each other as in pd.merge.
+    """
+    if isinstance(left_values, pd.Categorical) and isinstance(right_values, pd.Categorical):
+        # Reuse the categorical codes; only the categories are ever hashed
+        if left_values.categories.equals(right_values.categories) and not sort:
+            left_codes, right_codes, n_values = left_values.codes, right_values.codes, len(left_values.categories)
+        else:
+            category_codes, uniques = pd.factorize(left_values.categories.append(right_values.categories), sort=sort)
+            left_map = category_codes[:len(left_values.categories)]
+            right_map = category_codes[len(left_values.categories):]
+            left_codes = left_map[left_values.codes] if len(left_map) else left_values.codes
+            right_codes = right_map[right_values.codes] if len(right_map) else right_values.codes
+            left_codes = np.where(left_values.codes < 0, -1, left_codes)
+            right_codes = np.where(right_values.codes < 0, -1, right_codes)
+            n_values = len(uniques)
+        return (np.where(left_codes < 0, n_values, left_codes), np.where(right_codes < 0, n_values, right_codes), n_values + 1)
+
+    if isinstance(left_values, np.ndarray) and isinstance(right_values, np.ndarray) \
+            and left_values.dtype.kind in 'iu' and right_values.dtype.kind in 'iu' and len(left_values) and len(right_values):
+        # Compact integer keys are their own codes, already in key order
+        low = min(int(left_values.min()), int(right_values.min()))
+        span = max(int(left_values.max()), int(right_values.max())) - low + 1
+        if span <= 4 * (len(left_values) + len(right_values)):
+            return left_values.astype(np.int64) - low, right_values.astype(np.int64) - low, span
+
+    if isinstance(left_values, np.ndarray) and isinstance(right_values, np.ndarray):
+        both = np.concatenate([left_values, right_values])
+    else:
+        both = pd.concat([pd.Series(left_values), pd.Series(right_values)], ignore_index=True)
+    # Factorizing both sides together hashes each key once
+    codes, uniques = pd.factorize(both, sort=sort)
+    codes[codes < 0] = len(uniques)
+    return codes[:len(left_values)], codes[len(left_values):], len(uniques) + 1
+
+def encode_join_keys(left_columns, right_columns, sort=False):
+    """Map one or more key columns from both sides onto shared integer codes"""
+    left_codes, right_codes, n_codes = shared_key_codes(left_columns[0], right_columns[0], sort)
+    for left_values, right_values in zip(left_columns[1:], right_columns[1:]):
+        left_key_codes, right_key_codes, n_key_codes = shared_key_codes(left_values, right_values, sort)
+        # Re-densify the combined codes so further keys cannot overflow; the order is kept
+        combined, uniques = pd.factorize(np.concatenate([
+            left_codes * n_key_codes + left_key_codes, right_codes * n_key_codes + right_key_codes
+        ]), sort=sort)
+        left_codes, right_codes, n_codes = combined[:len(left_codes)], combined[len(left_codes):], len(uniques)
+    return left_codes, right_codes, n_codes
+
+def match_codes(left_codes, right_codes, n_codes, how):
+    """
+    Row positions of a join on integer codes, with -1 for the missing side of outer rows and
+    None for a side whose rows all stay in place. Returns the positions and the bytes of the
+    arrays the match allocated.
+    """
+    right_counts = np.bincount(right_codes, minlength=n_codes)
+    if right_counts.max(initial=0) <= 1:
+        # A unique right key: one lookup per left row, no sort
+        lookup = np.full(n_codes, -1, dtype=np.int64)
+        lookup[right_codes] = np.arange(len(right_codes))
+        right_idx = lookup[left_codes]
+        working = right_counts.nbytes + lookup.nbytes + right_idx.nbytes
+        left_idx = None
+        if how == "inner":
+            matched = right_idx >= 0
+            if not matched.all():
+                left_idx = np.flatnonzero(matched)
+                right_idx = right_idx[left_idx]
+                working += left_idx.nbytes + right_idx.nbytes
+    else:
+        right_order = np.argsort(right_codes, kind='stable')
+        right_starts = np.cumsum(right_counts) - right_counts
+        matches = right_counts[left_codes]
+        per_left = np.maximum(matches, 1) if how in ("left", "outer") else matches
+        left_idx = np.repeat(np.arange(len(left_codes)), per_left)
+        offsets = np.arange(len(left_idx)) - np.repeat(np.cumsum(per_left) - per_left, per_left)
+        matched = np.repeat(matches > 0, per_left)
+        right_idx = np.full(len(left_idx), -1, dtype=np.int64)
+        right_idx[matched] = right_order[np.repeat(right_starts[left_codes], per_left)[matched] + offsets[matched]]
+        working = right_counts.nbytes + right_order.nbytes + 4 * left_idx.nbytes
+        if (per_left == 1).all():
+            left_idx = None
+
+    if how == "outer":
+        left_present = np.bincount(left_codes, minlength=n_codes) > 0
+        unmatched_right = np.flatnonzero(~left_present[right_codes])
+        base = np.arange(len(left_codes)) if left_idx is None else left_idx
+        left_idx = np.concatenate([base, np.full(len(unmatched_right), -1, dtype=np.int64)])
+        right_idx = np.concatenate([right_idx, unmatched_right])
+        # pd.merge returns outer joins in key order
+        out_codes = np.empty(len(left_idx), dtype=np.int64)
+        from_left = left_idx >= 0
+        out_codes[from_left] = left_codes[left_idx[from_left]]
+        out_codes[~from_left] = right_codes[right_idx[~from_left]]
+        if n_codes * len(out_codes) < 2 ** 62:
+            # Unique sort keys let the faster unstable sort keep row order within a key
+            order = np.argsort(out_codes * len(out_codes) + np.arange(len(out_codes)))
+        else:
+            order = np.argsort(out_codes, kind='stable')
+        left_idx, right_idx = left_idx[order], right_idx[order]
+        working += left_present.nbytes + 4 * left_idx.nbytes
+    return left_idx, right_idx, working
+
+def join_tables(tables, joins, columns=None):
+    """
+    Join a chain of tables on shared integer key codes. Each join is a dict with left_table,
+    left_on, right_table, right_on and how; keys may be a column or a list of columns. Only row
+    positions are tracked per table, so no intermediate frame is built. The join keys and the
+    requested columns ('col' or 'table.col') are gathered once at the end. Returns the joined
+    DataFrame and stats with its rows and the peak bytes of the join's own arrays.
+    """
+    first = joins[0]['left_table']
+    # None stands for "every row of the table, in order"
+    row_positions = {first: None}
+    coalesced = []
+    key_columns = set()
+    peak_bytes = 0
+
+    for join in joins:
+        how = join.get('how', 'inner')
+        left_table, right_table = join['left_table'], join['right_table']
+        left_on, right_on = as_key_list(join['left_on']), as_key_list(join['right_on'])
+        if how == "right":
+            raise ValueError("Chain joins take the right join's table as the left side; use a left join instead")
+
+        # Key values of the current chain rows are the only columns gathered mid-chain
+        current = row_positions[left_table]
+        left_keys = [take_rows(column_values(tables[left_table][key]), current) for key in left_on]
+        right_keys = [column_values(tables[right_table][key]) for key in right_on]
+        left_codes, right_codes, n_codes = encode_join_keys(left_keys, right_keys, sort=how == "outer")
+        chain_idx, right_idx, working = match_codes(left_codes, right_codes, n_codes, how)
+
+        if chain_idx is not None:
+            row_positions = {
+                table: chain_idx if positions is None else np.where(chain_idx >= 0, positions[np.maximum(chain_idx, 0)], -1)
+                for table, positions in row_positions.items()
+            }
+        row_positions[right_table] = right_idx
+        key_columns.update((left_table, key) for key in left_on)
+        key_columns.update((right_table, key) for key in right_on)
+        coalesced += [
+            (left_table, left_key, right_table, right_key)
+            for left_key, right_key in zip(left_on, right_on) if left_key == right_key
+        ]
+        tracked = sum(p.nbytes for p in row_positions.values() if p is not None)
+        peak_bytes = max(peak_bytes, tracked + left_codes.nbytes + right_codes.nbytes + working)
+
+    # Same-named keys appear once, as pd.merge(on=...) does
+    dropped = {(right_table, right_key) for _, _, right_table, right_key in coalesced}
+    selected = []
+    for table in row_positions:
+        for col in tables[table].columns:
+            if (table, col) in dropped:
+                continue
+            if columns is None or (table, col) in key_columns or col in columns or f"{table}.{col}" in columns:
+                selected.append((table, col))
+
+    names = [col for _, col in selected]
+    data = {}
+    gathered_bytes = 0
+    for table, col in selected:
+        values, positions = column_values(tables[table][col]), row_positions[table]
+        for left_table, left_key, right_table, right_key in coalesced:
+            right_positions = row_positions[right_table]
+            if (left_table, left_key) == (table, col) and positions is not None and (positions < 0).any():
+                # Outer rows without a left match take the key from the right side
+                from_right = (positions < 0) & (right_positions >= 0)
+                positions = np.where(from_right, len(values) + right_positions, positions)
+                values = column_values(pd.concat([tables[table][col], tables[right_table][right_key]], ignore_index=True))
+        gathered = take_rows(values, positions)
+        if gathered is not values:
+            gathered_bytes += gathered.nbytes
+        name = f"{col}_{table}" if names.count(col) > 1 else col
+        data[name] = pd.Series(gathered, dtype=gathered.dtype, copy=False)
+    # Columns are fresh gathers or unchanged sources that copy-on-write protects
+    result = pd.DataFrame(data, copy=False)
+    tracked = sum(p.nbytes for p in row_positions.values() if p is not None)
+    peak_bytes = max(peak_bytes, tracked + gathered_bytes)
+    return result, {'rows': len(result), 'peak_memory_bytes': peak_bytes}
+
+def perform_join(left_df, right_df, left_key, right_key, join_type, left_name, right_name, columns=None):
     """Perform join operation between two DataFrames"""
     try:
-        # Handle different column names
-        if left_key != right_key:
-            joined_df = pd.merge(
-                left_df, right_df,
-                left_on=left_key, right_on=right_key,
-                how=join_type,
-                suffixes=(f'_{left_name}', f'_{right_name}')
-            )
+        tables = {left_name: left_df, right_name: right_df}
+        join = {'left_table': left_name, 'left_on': left_key, 'right_table': right_name, 'right_on': right_key, 'how': join_type}
+        if join_type == "right":
+            # A right join is the mirrored left join, with the left table's columns kept first
+            join = {'left_table': right_name, 'left_on': right_key, 'right_table': left_name, 'right_on': left_key, 'how': "left"}
+            joined_df, stats = join_tables(tables, [join], columns)
+            left_first = [c for c in joined_df.columns if c in left_df.columns or c.endswith(f"_{left_name}")]
+            joined_df = joined_df[left_first + [c for c in joined_df.columns if c not in left_first]]
         else:
-            joined_df = pd.merge(
-                left_df, right_df,
-                on=left_key,
-                how=join_type,
-                suffixes=(f'_{left_name}', f'_{right_name}')
-            )
-        
+            joined_df, stats = join_tables(tables, [join], columns)
+
+        st.session_state.join_stats = stats
         return joined_df, None
     except Exception as e:
         return None, str(e)
@@ -399,10 +596,10 @@ def main():
         st.markdown("### 📁 Upload Your Data Files")
         
         uploaded_files = st.file_uploader(
-            "Choose Excel or CSV files",
-            type=['csv', 'xlsx', 'xls'],
+            "Choose Excel, CSV, Parquet or Arrow files",
+            type=['csv', 'xlsx', 'xls', 'parquet', 'arrow', 'feather', 'ipc'],
             accept_multiple_files=True,
-            help="You can upload multiple files. Supported formats: CSV, Excel (.xlsx, .xls)"
+            help="You can upload multiple files. Supported formats: CSV, Excel (.xlsx, .xls), Parquet, Arrow IPC (.arrow, .feather, .ipc)"
         )
         
         if uploaded_files:
@@ -515,12 +712,20 @@ def main():
                         st.markdown(f"**Sample values from {right_table}.{right_key}:**")
                         st.write(right_df[right_key].head().tolist())
                 
+                # Gather only the columns later queries need
+                keep_columns = st.multiselect(
+                    "Columns to keep",
+                    [f"{left_table}.{c}" for c in left_df.columns] + [f"{right_table}.{c}" for c in right_df.columns],
+                    help="Join keys are always kept. Leave empty to keep every column"
+                )
+                
                 # Perform join
                 if st.button("🔗 Perform Join", type="primary"):
                     with st.spinner("🔄 Joining datasets..."):
                         joined_df, error = perform_join(
                             left_df, right_df, left_key, right_key, 
-                            join_type, left_table, right_table
+                            join_type, left_table, right_table,
+                            columns=keep_columns or None
                         )
                         
                         if error:
@@ -537,13 +742,15 @@ def main():
                             """, unsafe_allow_html=True)
                             
                             # Show join results
-                            col1, col2, col3 = st.columns(3)
+                            col1, col2, col3, col4 = st.columns(4)
                             with col1:
                                 st.metric("Original Rows", f"{len(left_df):,}")
                             with col2:
                                 st.metric("Joined Rows", f"{len(joined_df):,}")
                             with col3:
                                 st.metric("Total Columns", f"{len(joined_df.columns):,}")
+                            with col4:
+                                st.metric("Peak Join Memory", f"{st.session_state.join_stats['peak_memory_bytes'] / (1024*1024):.1f} MB")
                             
                             st.markdown("### 📊 Joined Dataset Preview")
                             st.dataframe(joined_df.head(10), use_container_width=True)
@@ -6,6 +6,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import json
 import sqlite3
+import hashlib
+import threading
+import weakref
 import io
 from datetime import datetime
 import re
@@ -210,21 +213,64 @@ SQL Query:
         st.error(f"Error generating SQL: {str(e)}")
         return None
 
+# Persistent Per-Session SQL Engine
+def compute_table_fingerprint(df):
+    """Content hash of a table's columns, dtypes and values"""
+    hasher = hashlib.sha1(str(list(zip(df.columns, df.dtypes.astype(str)))).encode('utf-8'))
+    hasher.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return hasher.hexdigest()
+
+class SQLEngine:
+    """Long-lived SQLite connection that keeps uploaded tables loaded between queries"""
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.lock = threading.Lock()
+        self.table_frames = {}
+        self.table_fingerprints = {}
+        # Close the connection when the owning session is garbage collected
+        self._finalizer = weakref.finalize(self, self.conn.close)
+
+    def sync_tables(self, dataframes_dict):
+        """Load new or changed tables and drop tables that are no longer uploaded"""
+        for table_name in list(self.table_fingerprints):
+            if table_name not in dataframes_dict:
+                self.conn.execute('DROP TABLE IF EXISTS "{}"'.format(table_name.replace('"', '""')))
+                self.table_fingerprints.pop(table_name, None)
+                self.table_frames.pop(table_name, None)
+
+        for table_name, df in dataframes_dict.items():
+            if self.table_frames.get(table_name) is df:
+                continue
+
+            fingerprint = compute_table_fingerprint(df)
+            if self.table_fingerprints.get(table_name) != fingerprint:
+                df.to_sql(table_name, self.conn, index=False, if_exists='replace')
+                self.table_fingerprints[table_name] = fingerprint
+            self.table_frames[table_name] = df
+
+    def execute(self, sql_query, dataframes_dict):
+        """Run a query after making sure every uploaded table is loaded"""
+        with self.lock:
+            self.sync_tables(dataframes_dict)
+            return pd.read_sql_query(sql_query, self.conn)
+
+    def close(self):
+        """Release the connection and all loaded tables"""
+        self._finalizer()
+        self.table_frames = {}
+        self.table_fingerprints = {}
+
+def get_sql_engine():
+    """Return this session's SQL engine, creating it on first use"""
+    if st.session_state.get('sql_engine') is None:
+        st.session_state.sql_engine = SQLEngine()
+    return st.session_state.sql_engine
+
 # Enhanced function to execute SQL query on multiple joined tables
 def execute_sql_query(sql_query, dataframes_dict):
     try:
-        # Create an in-memory SQLite database
-        conn = sqlite3.connect(':memory:')
-        
-        # Load all dataframes into SQLite
-        for table_name, df in dataframes_dict.items():
-            df.to_sql(table_name, conn, index=False, if_exists='replace')
-        
-        # Execute the SQL query
-        result = pd.read_sql_query(sql_query, conn)
-        conn.close()
-        
-        return result
+        # Reuse the session's engine so unchanged tables are not reloaded
+        return get_sql_engine().execute(sql_query, dataframes_dict)
     except Exception as e:
         st.error(f"Error executing SQL query: {str(e)}")
         return None
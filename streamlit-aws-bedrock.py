@@ -9,9 +9,15 @@ from botocore.exceptions import ClientError
 import urllib3
 import json
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import hashlib
 import hmac
+import base64
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from dateutil import parser as date_parser
 
 # Configure page
 st.set_page_config(
@@ -77,6 +83,17 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Connection settings for boto3 clients; override with environment variables
+BOTO_CLIENT_SETTINGS = {
+    'max_pool_connections': int(os.environ.get('BEDROCK_MAX_POOL_CONNECTIONS', '50')),
+    'tcp_keepalive': os.environ.get('BEDROCK_TCP_KEEPALIVE', 'true').lower() == 'true',
+    'max_attempts': int(os.environ.get('BEDROCK_MAX_ATTEMPTS', '4')),
+    'retry_mode': os.environ.get('BEDROCK_RETRY_MODE', 'adaptive'),
+    'connect_timeout': int(os.environ.get('BEDROCK_CONNECT_TIMEOUT', '10')),
+    'read_timeout': int(os.environ.get('BEDROCK_READ_TIMEOUT', '120')),
+    'max_pooled_clients': int(os.environ.get('BEDROCK_MAX_POOLED_CLIENTS', '64'))
+}
+
 # Custom Exceptions
 class AWSPortalLoginError(Exception):
     def __init__(self, message):
@@ -93,11 +110,12 @@ class AWSPortalClient:
     """
     Handles AWS Portal authentication and credential management
     """
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, portal_url: str = None):
         self.proxy_host = 'primary-proxy.gslb.intranet.barcapint.com'
         self.proxy_port = '8080'
         self.username = username
         self.password = password
+        self.portal_url = (portal_url or os.environ.get('AWS_PORTAL_URL', 'https://awsportal.barcapint.com')).rstrip('/')
         self.http = urllib3.PoolManager()
         self.proxies = {'https': f'https://{self.username}:{self.password}@{self.proxy_host}:{self.proxy_port}'}
 
@@ -105,7 +123,7 @@ class AWSPortalClient:
         """
         Contacts the AWS portal and exchanges credentials for a session token
         """
-        tokenUrl = "https://awsportal.barcapint.com/v1/jwttoken"
+        tokenUrl = f"{self.portal_url}/v1/jwttoken"
         tokenBody = json.dumps({"username": self.username, "password": self.password})
         
         try:
@@ -116,29 +134,38 @@ class AWSPortalClient:
         except Exception as e:
             raise AWSPortalLoginError(f"Authentication failed: {str(e)}")
 
-    def list_accounts(self, token):
+    def list_roles(self, token):
         """
-        Gets all the AWS account IDs the user has access to
+        Gets the roles (account ID and role ARN) the user has access to
         """
-        rolesUrl = "https://awsportal.barcapint.com/v1/creds-provider/roles?size=200"
+        rolesUrl = f"{self.portal_url}/v1/creds-provider/roles?size=200"
         rolesHeaders = {"authorization": "Bearer " + token}
         
         try:
             rolesResponse = self.http.request("GET", rolesUrl, headers=rolesHeaders)
-            rolesList = json.loads(rolesResponse.data.decode('utf-8'))["items"]
+            return json.loads(rolesResponse.data.decode('utf-8'))["items"]
+        except Exception as e:
+            raise Exception(f"Failed to list roles: {str(e)}")
+
+    def list_accounts(self, token, rolesList=None):
+        """
+        Gets all the AWS account IDs the user has access to
+        """
+        try:
+            if rolesList is None:
+                rolesList = self.list_roles(token)
             return [item["account_id"] for item in rolesList]
         except Exception as e:
             raise Exception(f"Failed to list accounts: {str(e)}")
 
-    def gather_credentials(self, token, accountId):
+    def gather_credentials(self, token, accountId, rolesList=None):
         """
-        Given a valid token and an AWS account ID, fetch the temporary AWS credentials
+        Given a valid token and an AWS account ID, fetch the temporary AWS credentials.
+        Pass an already fetched rolesList to skip downloading it again.
         """
         try:
-            rolesUrl = "https://awsportal.barcapint.com/v1/creds-provider/roles?size=200"
-            rolesHeaders = {"authorization": "Bearer " + token}
-            rolesResponse = self.http.request("GET", rolesUrl, headers=rolesHeaders)
-            rolesList = json.loads(rolesResponse.data.decode('utf-8'))["items"]
+            if rolesList is None:
+                rolesList = self.list_roles(token)
 
             roleArn = None
             for item in rolesList:
@@ -149,7 +176,7 @@ class AWSPortalClient:
             if not roleArn:
                 raise AWSAccountIdError("Account not found in your accessible accounts")
 
-            credentialsUrl = f'https://awsportal.barcapint.com/v1/creds-provider/provide-credentials/{roleArn}'
+            credentialsUrl = f'{self.portal_url}/v1/creds-provider/provide-credentials/{roleArn}'
             credentialsHeaders = {"authorization": "Bearer " + token}
             credentialsResponse = self.http.request("GET", credentialsUrl, headers=credentialsHeaders)
             
@@ -160,22 +187,201 @@ class AWSPortalClient:
         except Exception as e:
             raise Exception(f"Failed to gather credentials: {str(e)}")
 
-    def create_client(self, credentials, service, region):
+    def create_client(self, credentials, service, region, session=None):
         """
-        Create a boto3 client using the gathered credentials
+        Create a boto3 client using the gathered credentials. Passing a shared boto3 session
+        reuses its already loaded service models.
         """
         try:
-            session = boto3.Session(
+            config = botoConfig(
+                proxies=self.proxies,
+                max_pool_connections=BOTO_CLIENT_SETTINGS['max_pool_connections'],
+                tcp_keepalive=BOTO_CLIENT_SETTINGS['tcp_keepalive'],
+                connect_timeout=BOTO_CLIENT_SETTINGS['connect_timeout'],
+                read_timeout=BOTO_CLIENT_SETTINGS['read_timeout'],
+                retries={
+                    'max_attempts': BOTO_CLIENT_SETTINGS['max_attempts'],
+                    'mode': BOTO_CLIENT_SETTINGS['retry_mode']
+                }
+            )
+            if session is None:
+                session = boto3.Session()
+            client = session.client(
+                service,
                 region_name=region,
                 aws_secret_access_key=credentials["SecretAccessKey"],
                 aws_access_key_id=credentials["AccessKeyId"],
-                aws_session_token=credentials["SessionToken"]
+                aws_session_token=credentials["SessionToken"],
+                config=config
             )
-            client = session.client(service, config=botoConfig(proxies=self.proxies))
             return client
         except Exception as e:
             raise Exception(f"Failed to create AWS client: {str(e)}")
 
+# Process-wide boto3 client pool
+class BotoClientPool:
+    """
+    Shares boto3 clients, and the HTTP connection pools inside them, across reruns and sessions.
+    Clients are keyed by account, service, region, credential identity and proxy user, and are
+    dropped once their credentials expire.
+    """
+    def __init__(self, max_clients: int = 64):
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        self.clients = OrderedDict()
+        # boto3 sessions are not thread safe, so client creation is serialized under the lock
+        self.session = boto3.Session()
+
+    def evict_expired(self):
+        now = time.time()
+        with self.lock:
+            for key in [key for key, (_, expires_at) in self.clients.items() if expires_at <= now]:
+                del self.clients[key]
+
+    def get_client(self, portal_client, account_id, service, region, credentials, expires_at):
+        self.evict_expired()
+        key = (account_id, service, region, credentials["AccessKeyId"], portal_client.username)
+        with self.lock:
+            cached = self.clients.get(key)
+            if cached is not None:
+                self.clients.move_to_end(key)
+                return cached[0]
+
+            client = portal_client.create_client(credentials, service, region, session=self.session)
+            self.clients[key] = (client, expires_at)
+            while len(self.clients) > self.max_clients:
+                self.clients.popitem(last=False)
+            return client
+
+@st.cache_resource
+def get_client_pool():
+    return BotoClientPool(max_clients=BOTO_CLIENT_SETTINGS['max_pooled_clients'])
+
+# Credential caching and proactive refresh
+def _parse_expiration(value, default_seconds):
+    """Turn an expiry given as ISO-8601 text or epoch seconds/milliseconds into epoch seconds"""
+    try:
+        if isinstance(value, (int, float)):
+            return value / 1000 if value > 1e12 else float(value)
+        if isinstance(value, datetime):
+            expires_at = value
+        else:
+            expires_at = date_parser.isoparse(str(value))
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at.timestamp()
+    except (TypeError, ValueError):
+        return time.time() + default_seconds
+
+def _token_expiration(token, default_seconds):
+    """Read the exp claim of a JWT without verifying it; the portal is the verifier"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + default_seconds
+
+def _refresh_loop(manager_ref, stop_event, interval):
+    """Background worker; holds only a weak reference so an abandoned manager can be collected"""
+    while not stop_event.wait(interval):
+        manager = manager_ref()
+        if manager is None:
+            return
+        manager.refresh_expiring()
+        del manager
+
+class AWSCredentialManager:
+    """
+    Caches the portal token, role list, per-account credentials and the boto3 clients built
+    from them. A background thread renews anything about to expire so callers never have to
+    log in again while the portal password is still valid.
+    """
+    def __init__(self, portal_client: AWSPortalClient, client_pool: BotoClientPool = None,
+                 refresh_margin: int = 300, roles_ttl: int = 900, default_token_ttl: int = 1800,
+                 default_credentials_ttl: int = 3600, check_interval: int = 60):
+        self.portal_client = portal_client
+        self.client_pool = client_pool or BotoClientPool()
+        self.refresh_margin = refresh_margin
+        self.roles_ttl = roles_ttl
+        self.default_token_ttl = default_token_ttl
+        self.default_credentials_ttl = default_credentials_ttl
+        self.lock = threading.RLock()
+        self.token = None
+        self.token_expires_at = 0.0
+        self.roles = None
+        self.roles_expires_at = 0.0
+        self.credentials = {}
+        self.client_keys = set()
+        self._stop_event = threading.Event()
+        self._refresh_thread = threading.Thread(
+            target=_refresh_loop,
+            args=(weakref.ref(self), self._stop_event, check_interval),
+            daemon=True
+        )
+        self._refresh_thread.start()
+        weakref.finalize(self, self._stop_event.set)
+
+    def _is_fresh(self, expires_at):
+        return time.time() < expires_at - self.refresh_margin
+
+    def get_token(self, force_refresh=False):
+        with self.lock:
+            if force_refresh or self.token is None or not self._is_fresh(self.token_expires_at):
+                self.token = self.portal_client.gather_token()
+                self.token_expires_at = _token_expiration(self.token, self.default_token_ttl)
+            return self.token
+
+    def get_roles(self, force_refresh=False):
+        with self.lock:
+            if force_refresh or self.roles is None or time.time() >= self.roles_expires_at:
+                self.roles = self.portal_client.list_roles(self.get_token())
+                self.roles_expires_at = time.time() + self.roles_ttl
+            return self.roles
+
+    def list_accounts(self):
+        return self.portal_client.list_accounts(self.get_token(), rolesList=self.get_roles())
+
+    def get_credentials(self, account_id, force_refresh=False):
+        with self.lock:
+            cached = self.credentials.get(account_id)
+            if force_refresh or cached is None or not self._is_fresh(cached[1]):
+                credentials = self.portal_client.gather_credentials(
+                    self.get_token(), account_id, rolesList=self.get_roles()
+                )
+                expires_at = _parse_expiration(credentials.get("Expiration"), self.default_credentials_ttl)
+                cached = (credentials, expires_at)
+                self.credentials[account_id] = cached
+            return cached[0]
+
+    def get_client(self, account_id, service, region):
+        """Return a pooled client for the account; renewed credentials map to a new client"""
+        with self.lock:
+            credentials = self.get_credentials(account_id)
+            expires_at = self.credentials[account_id][1]
+            self.client_keys.add((account_id, service, region))
+        return self.client_pool.get_client(self.portal_client, account_id, service, region,
+                                           credentials, expires_at)
+
+    def refresh_expiring(self):
+        """Renew the token and any credentials that expire within the refresh margin"""
+        try:
+            with self.lock:
+                if self.token is not None and not self._is_fresh(self.token_expires_at):
+                    self.get_token(force_refresh=True)
+                for account_id, (_, expires_at) in list(self.credentials.items()):
+                    if not self._is_fresh(expires_at):
+                        self.get_credentials(account_id, force_refresh=True)
+                        for (client_account, service, region) in list(self.client_keys):
+                            if client_account == account_id:
+                                self.get_client(client_account, service, region)
+        except Exception:
+            # Try again on the next tick; a request will refresh on demand if this keeps failing
+            pass
+
+    def stop(self):
+        self._stop_event.set()
+
 # Initialize session state
 def initialize_session_state():
     """Initialize all session state variables"""
@@ -191,6 +397,8 @@ def initialize_session_state():
         st.session_state.credentials = None
     if 'token' not in st.session_state:
         st.session_state.token = None
+    if 'credential_manager' not in st.session_state:
+        st.session_state.credential_manager = None
 
 # Authentication functions
 def authenticate_user(username, password, account_id, region):
@@ -198,16 +406,22 @@ def authenticate_user(username, password, account_id, region):
     try:
         with st.spinner("Authenticating with AWS Portal..."):
             aws_client = AWSPortalClient(username, password)
-            token = aws_client.gather_token()
-            credentials = aws_client.gather_credentials(token, account_id)
-            bedrock_client = aws_client.create_client(credentials, 'bedrock-runtime', region)
+            credential_manager = AWSCredentialManager(aws_client, client_pool=get_client_pool())
+            try:
+                bedrock_client = credential_manager.get_client(account_id, 'bedrock-runtime', region)
+            except Exception:
+                credential_manager.stop()
+                raise
             
             # Store in session state
+            if st.session_state.get('credential_manager') is not None:
+                st.session_state.credential_manager.stop()
             st.session_state.authenticated = True
             st.session_state.aws_client = aws_client
+            st.session_state.credential_manager = credential_manager
             st.session_state.bedrock_client = bedrock_client
-            st.session_state.credentials = credentials
-            st.session_state.token = token
+            st.session_state.credentials = credential_manager.get_credentials(account_id)
+            st.session_state.token = credential_manager.get_token()
             st.session_state.current_account = account_id
             st.session_state.current_region = region
             
@@ -220,8 +434,20 @@ def authenticate_user(username, password, account_id, region):
     except Exception as e:
         return False, f"Connection error: {str(e)}"
 
+def get_bedrock_client():
+    """Current Bedrock client; the credential manager swaps in a new one after credentials rotate"""
+    credential_manager = st.session_state.get('credential_manager')
+    if credential_manager is not None:
+        st.session_state.bedrock_client = credential_manager.get_client(
+            st.session_state.current_account, 'bedrock-runtime', st.session_state.current_region
+        )
+    return st.session_state.bedrock_client
+
 def disconnect_user():
     """Disconnect user and clear session"""
+    if st.session_state.get('credential_manager') is not None:
+        st.session_state.credential_manager.stop()
+    st.session_state.credential_manager = None
     st.session_state.authenticated = False
     st.session_state.aws_client = None
     st.session_state.bedrock_client = None
@@ -239,7 +465,7 @@ def call_bedrock_converse(prompt, model_id, max_tokens=4000):
     try:
         message = [{"role": "user", "content": [{"text": prompt}]}]
         
-        response = st.session_state.bedrock_client.converse(
+        response = get_bedrock_client().converse(
             modelId=model_id,
             messages=message,
             inferenceConfig={
@@ -259,6 +485,45 @@ def call_bedrock_converse(prompt, model_id, max_tokens=4000):
     except Exception as e:
         return False, f"Bedrock API call failed: {str(e)}"
 
+def call_bedrock_converse_stream(prompt, model_id, max_tokens=4000, on_text=None):
+    """Call AWS Bedrock using the ConverseStream API, passing the growing response to on_text"""
+    try:
+        message = [{"role": "user", "content": [{"text": prompt}]}]
+        start_time = time.perf_counter()
+        first_token_time = None
+        
+        response = get_bedrock_client().converse_stream(
+            modelId=model_id,
+            messages=message,
+            inferenceConfig={
+                'maxTokens': max_tokens,
+                'temperature': st.session_state.get('temperature', 0.7),
+                'topP': st.session_state.get('top_p', 0.9)
+            }
+        )
+        
+        full_text = ''
+        for event in response['stream']:
+            delta = event.get('contentBlockDelta', {}).get('delta', {})
+            if 'text' not in delta:
+                continue
+            if first_token_time is None:
+                first_token_time = time.perf_counter()
+            full_text += delta['text']
+            if on_text is not None:
+                on_text(full_text)
+        
+        end_time = time.perf_counter()
+        st.session_state.last_response_metrics = {
+            'time_to_first_token': (first_token_time or end_time) - start_time,
+            'total_latency': end_time - start_time
+        }
+        
+        return True, full_text
+        
+    except Exception as e:
+        return False, f"Bedrock API call failed: {str(e)}"
+
 def call_bedrock_invoke(prompt, model_id, max_tokens=4000):
     """Call AWS Bedrock using the Invoke Model API"""
     try:
@@ -271,7 +536,7 @@ def call_bedrock_invoke(prompt, model_id, max_tokens=4000):
             "top_p": st.session_state.get('top_p', 0.9)
         })
         
-        response = st.session_state.bedrock_client.invoke_model(
+        response = get_bedrock_client().invoke_model(
             modelId=model_id,
             body=body,
             accept="application/json",
@@ -380,7 +645,7 @@ def render_main_interface():
             
             api_method = st.selectbox(
                 "API Method",
-                ["Converse API", "Invoke Model API"],
+                ["Converse Stream API", "Converse API", "Invoke Model API"],
                 index=0
             )
             
@@ -398,6 +663,12 @@ def render_main_interface():
                 st.markdown(f'<div class="chat-message-user"><strong>You:</strong><br>{message["content"]}</div>', unsafe_allow_html=True)
             else:
                 st.markdown(f'<div class="chat-message-assistant"><strong>AI Assistant:</strong><br>{message["content"]}</div>', unsafe_allow_html=True)
+                metrics = message.get('metrics')
+                if metrics:
+                    if metrics.get('time_to_first_token') is not None:
+                        st.caption(f"⏱️ First token: {metrics['time_to_first_token']:.2f}s · Total: {metrics['total_latency']:.2f}s")
+                    else:
+                        st.caption(f"⏱️ Total: {metrics['total_latency']:.2f}s")
     
     # Chat input
     with st.form("chat_form", clear_on_submit=True):
@@ -436,18 +707,37 @@ def render_main_interface():
         })
         
         # Call Bedrock API
-        with st.spinner("🤔 AI is thinking..."):
-            if api_method == "Converse API":
-                success, response = call_bedrock_converse(prompt, model_id, max_tokens)
-            else:
-                success, response = call_bedrock_invoke(prompt, model_id, max_tokens)
+        if api_method == "Converse Stream API":
+            # Render the reply into the chat container as tokens arrive
+            with chat_container:
+                st.markdown(f'<div class="chat-message-user"><strong>You:</strong><br>{prompt}</div>', unsafe_allow_html=True)
+                stream_placeholder = st.empty()
+            success, response = call_bedrock_converse_stream(
+                prompt, model_id, max_tokens,
+                on_text=lambda text: stream_placeholder.markdown(
+                    f'<div class="chat-message-assistant"><strong>AI Assistant:</strong><br>{text}</div>',
+                    unsafe_allow_html=True
+                )
+            )
+        else:
+            with st.spinner("🤔 AI is thinking..."):
+                start_time = time.perf_counter()
+                if api_method == "Converse API":
+                    success, response = call_bedrock_converse(prompt, model_id, max_tokens)
+                else:
+                    success, response = call_bedrock_invoke(prompt, model_id, max_tokens)
+                st.session_state.last_response_metrics = {
+                    'time_to_first_token': None,
+                    'total_latency': time.perf_counter() - start_time
+                }
         
         if success:
             # Add assistant response to history
             st.session_state.chat_history.append({
                 "role": "assistant", 
                 "content": response,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now().isoformat(),
+                "metrics": st.session_state.last_response_metrics
             })
             st.success("Response received!")
         else:
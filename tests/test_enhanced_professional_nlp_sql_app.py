@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pytest.importorskip("streamlit")
+pytest.importorskip("enhanced_aws_login")
+
+import enhanced_professional_nlp_sql_app as app
+
+
+def test_search_index_matches_duckdb_list_and_struct_columns():
+    duckdb = pytest.importorskip("duckdb")
+    df = duckdb.sql(
+        "SELECT i, [i, i + 1] AS pair, {'id': i, 'name': 'item' || i} AS item, "
+        "CASE WHEN i = 2 THEN NULL ELSE [i] END AS maybe "
+        "FROM range(5) t(i)"
+    ).df()
+    index = app.SearchIndex(df)
+
+    assert index.search("item3").nonzero()[0].tolist() == [3]
+    assert index.search("[2", "pair").nonzero()[0].tolist() == [2]
+    # Missing values stay unmatched rather than matching their text
+    assert index.search("none", "maybe").nonzero()[0].tolist() == []
+    assert app.FrameResult(df).positions(search="item4").tolist() == [4]
+
+
+@pytest.fixture
+def generation_cache(tmp_path):
+    cache = app.SQLGenerationCache(str(tmp_path / "generations.db"))
+    cache.put("Show total sales by region", "schema", "SELECT region, SUM(sales) FROM t GROUP BY region")
+    cache.put("Top 5 customers by revenue", "schema", "SELECT customer FROM t ORDER BY revenue DESC LIMIT 5")
+    cache.put("Customers with orders over 100", "schema", "SELECT * FROM t WHERE orders > 100")
+    return cache
+
+
+@pytest.mark.parametrize("question", [
+    "Show the total sales by region",
+    "show me total sales by region?",
+    "What is the total sales by region",
+    "Please list the top 5 customers by revenue",
+    "customers with orders over 100.",
+])
+def test_generation_cache_reuses_paraphrases(generation_cache, question):
+    assert generation_cache.get(question, "schema", allow_similar=True) is not None
+
+
+@pytest.mark.parametrize("question", [
+    "Show total sales by country",
+    "Show total sales by region and month",
+    "Top 10 customers by revenue",
+    "Customers without orders over 100",
+    "Customers with orders under 100",
+    "Customers with orders over 1000",
+])
+def test_generation_cache_misses_different_questions(generation_cache, question):
+    assert generation_cache.get(question, "schema", allow_similar=True) is None
+
+
+def test_generation_cache_matches_paraphrases_only_when_allowed(generation_cache):
+    assert generation_cache.get("Show the total sales by region", "schema") is None
+    assert generation_cache.get("show  TOTAL sales by region", "schema") is not None
+    assert generation_cache.get("Show the total sales by region", "other schema", allow_similar=True) is None